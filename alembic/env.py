@@ -1,4 +1,5 @@
 import asyncio
+import os
 from logging.config import fileConfig
 
 from sqlalchemy import pool
@@ -20,9 +21,18 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
-from lisette.core import models
+from lisette.core import database, models
 target_metadata = models.Base.metadata
 
+# Use the same database as the bot if its url is set in the environment
+if os.getenv("LISETTE_DB_URL"):
+    config.set_main_option(
+        "sqlalchemy.url",
+        database.make_url(os.environ["LISETTE_DB_URL"]).render_as_string(
+            hide_password=False
+        ),
+    )
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -0,0 +1,56 @@
+"""use bigint for discord ids
+
+Revision ID: c1b2f462b153
+Revises: 633a2e56faff
+Create Date: 2026-10-16 10:12:31.504417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c1b2f462b153"
+down_revision = "633a2e56faff"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # SQLite integers are always 64 bit, other backends need the wider type to
+    # hold Discord ids.
+    if op.get_context().dialect.name == "sqlite":
+        return
+    op.alter_column(
+        "task_list",
+        "guild_id",
+        existing_type=sa.Integer(),
+        type_=sa.BigInteger(),
+        existing_nullable=False,
+    )
+    op.alter_column(
+        "task_list",
+        "msg_id",
+        existing_type=sa.Integer(),
+        type_=sa.BigInteger(),
+        existing_nullable=False,
+    )
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == "sqlite":
+        return
+    op.alter_column(
+        "task_list",
+        "msg_id",
+        existing_type=sa.BigInteger(),
+        type_=sa.Integer(),
+        existing_nullable=False,
+    )
+    op.alter_column(
+        "task_list",
+        "guild_id",
+        existing_type=sa.BigInteger(),
+        type_=sa.Integer(),
+        existing_nullable=False,
+    )
@@ -0,0 +1,6 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Benchmarks for Lisette.
+
+Run the suite with `python -m benchmarks`, see `python -m benchmarks --help`.
+"""
@@ -0,0 +1,123 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Run the benchmark suite and write a JSON report.
+
+Each benchmark runs against an in memory SQLite database. Reports from two runs
+can be compared with --compare, eg. between releases:
+
+    python -m benchmarks -o new.json --compare old.json
+"""
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import json
+import logging
+import platform
+import subprocess
+import sys
+from importlib import metadata
+from typing import Any
+
+import sqlalchemy
+
+from benchmarks import bench_helpers, bench_models  # noqa: F401  # register cases
+from benchmarks.harness import CASES, Result, run_case
+
+
+def git_revision() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def lisette_version() -> str | None:
+    try:
+        return metadata.version("lisette")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+async def run_all(args: argparse.Namespace) -> list[Result]:
+    results: list[Result] = []
+    for case in CASES:
+        if args.filter and not any(f in case.name for f in args.filter):
+            continue
+        for params in case.params:
+            result = await run_case(case, params, args.min_time, args.max_iterations)
+            results.append(result)
+            if result.skipped:
+                print(f"{result.key:<60} skipped: {result.skipped}")
+            else:
+                print(
+                    f"{result.key:<60} {result.median * 1e6:>12.1f} us"
+                    f"  (n={result.iterations})"
+                )
+    return results
+
+
+def compare(results: list[Result], old_report: dict[str, Any]) -> None:
+    """Print median time of each result relative to an older report."""
+    old = {
+        Result(r["name"], r["params"]).key: r
+        for r in old_report["results"]
+        if not r["skipped"]
+    }
+    print(f"\nCompared to {old_report['meta'].get('revision')}:")
+    for result in results:
+        prev = old.get(result.key)
+        if result.skipped or prev is None:
+            continue
+        ratio = result.median / prev["median"]
+        print(f"{result.key:<60} {ratio:>8.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-o", "--output", help="Path to write JSON report to.")
+    parser.add_argument("--compare", help="Path of a report to compare against.")
+    parser.add_argument(
+        "-k",
+        "--filter",
+        action="append",
+        help="Only run cases with names containing this.",
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="Seconds to time each case for."
+    )
+    parser.add_argument(
+        "--max-iterations", type=int, default=1000, help="Most times to run each case."
+    )
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    results = asyncio.run(run_all(args))
+    report = {
+        "meta": {
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "lisette": lisette_version(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+        },
+        "results": [dataclasses.asdict(result) for result in results],
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Benchmarks for the helpers behind each command"""
+import contextlib
+import itertools
+from typing import Any, AsyncIterator
+
+import sqlalchemy as sql
+
+from benchmarks import data
+from benchmarks.harness import Bench, Skip, bench
+from lisette.cogs import helpers
+from lisette.core import cache, models
+from lisette.core.database import SESSION
+
+NAME = "bench"
+
+
+async def list_of(size: int) -> None:
+    await data.fresh_db()
+    await data.seed_list(NAME, size)
+
+
+async def drop_list_cache() -> None:
+    cache.LISTS.clear()
+
+
+class FakeAutocompleteCtx:
+    """Stands in for discord.AutocompleteContext"""
+
+    def __init__(self, guild_id: int, value: str) -> None:
+        guild = type("Guild", (), {"id": guild_id})
+        self.interaction: Any = type("Interaction", (), {"guild": guild})
+        self.value = value
+
+
+async def read_pages(pages: AsyncIterator[str], first: bool = False) -> None:
+    """Read all pages, or only the first, from a paginated helper."""
+    async with contextlib.aclosing(pages):
+        async for _page in pages:
+            if first:
+                break
+
+
+@bench("helpers.get_lists_info", lists=data.GUILD_SIZES, first=[True, False])
+async def get_lists_info(lists: int, first: bool) -> Bench:
+    """Time to the first page, sent while rest are read, or to all pages."""
+    await data.fresh_db()
+    await data.seed_guild(lists)
+    return Bench(
+        lambda: read_pages(helpers.get_lists_info(data.GUILD_ID, "guild"), first)
+    )
+
+
+@bench("helpers.get_list_names", lists=data.GUILD_SIZES, cached=[True, False])
+async def get_list_names(lists: int, cached: bool) -> Bench:
+    await data.fresh_db()
+    await data.seed_guild(lists)
+    ctx = FakeAutocompleteCtx(data.GUILD_ID, "list 00")
+
+    async def drop_index() -> None:
+        cache.NAMES.clear()
+
+    return Bench(
+        lambda: helpers.get_list_names(ctx),  # type: ignore
+        setup=None if cached else drop_index,
+    )
+
+
+@bench("helpers.mk_list", lists=data.GUILD_SIZES)
+async def mk_list(lists: int) -> Bench:
+    await data.fresh_db()
+    await data.seed_guild(lists)
+    counter = itertools.count()
+    return Bench(lambda: helpers.mk_list(data.GUILD_ID, f"new {next(counter)}", 0))
+
+
+@bench("helpers.del_list", lists=data.GUILD_SIZES)
+async def del_list(lists: int) -> Bench:
+    await data.fresh_db()
+    await data.seed_guild(lists)
+
+    async def add() -> None:
+        await data.seed_list("doomed", 10)
+
+    return Bench(lambda: helpers.del_list(data.GUILD_ID, "doomed"), setup=add)
+
+
+@bench("helpers.put_list_edit", lists=data.GUILD_SIZES)
+async def put_list_edit(lists: int) -> Bench:
+    await data.fresh_db()
+    await data.seed_guild(lists)
+    await data.seed_list("a", 10)
+    names = itertools.cycle((("a", "b"), ("b", "a")))
+
+    async def rename() -> None:
+        old, new = next(names)
+        await helpers.put_list_edit(data.GUILD_ID, old, new)
+
+    return Bench(rename)
+
+
+@bench("helpers.get_tasks_info", size=data.LIST_SIZES, cached=[True, False])
+async def get_tasks_info(size: int, cached: bool) -> Bench:
+    await list_of(size)
+    return Bench(
+        lambda: read_pages(helpers.get_tasks_info(data.GUILD_ID, NAME)),
+        setup=None if cached else drop_list_cache,
+    )
+
+
+@bench("helpers.get_edit_txt", size=data.LIST_SIZES, cached=[True, False])
+async def get_edit_txt(size: int, cached: bool) -> Bench:
+    await list_of(size)
+    return Bench(
+        lambda: helpers.get_edit_txt(data.GUILD_ID, NAME),
+        setup=None if cached else drop_list_cache,
+    )
+
+
+@bench("helpers.mk_task", size=data.LIST_SIZES)
+async def mk_task(size: int) -> Bench:
+    await list_of(size - 1)
+    try:
+        await helpers.mk_task(data.GUILD_ID, NAME, "new task")
+    except ValueError as err:
+        raise Skip(str(err)) from err
+
+    async def remove_new() -> None:
+        await helpers.del_tasks(data.GUILD_ID, NAME, size - 1)
+
+    return Bench(
+        lambda: helpers.mk_task(data.GUILD_ID, NAME, "new task"), setup=remove_new
+    )
+
+
+@bench("helpers.check_tasks", size=data.LIST_SIZES)
+async def check_tasks(size: int) -> Bench:
+    await list_of(size)
+    return Bench(lambda: helpers.check_tasks(data.GUILD_ID, NAME, 0, size // 2))
+
+
+@bench("helpers.del_tasks", size=data.LIST_SIZES)
+async def del_tasks(size: int) -> Bench:
+    await list_of(size)
+    # Delete a tenth of the list, spread out so most tasks are renumbered
+    positions = list(range(0, size, 10))
+    return Bench(
+        lambda: helpers.del_tasks(data.GUILD_ID, NAME, *positions),
+        setup=lambda: data.top_up(NAME, size),
+    )
+
+
+@bench("helpers.del_checked", size=data.LIST_SIZES)
+async def del_checked(size: int) -> Bench:
+    await list_of(size)
+
+    async def refill() -> None:
+        await data.top_up(NAME, size)
+        async with SESSION() as session:
+            await session.execute(
+                sql.update(models.Task)
+                .where(models.Task.local_id % 10 == 0)
+                .values(checked=True)
+            )
+            await session.commit()
+
+    return Bench(lambda: helpers.del_checked(data.GUILD_ID, NAME), setup=refill)
+
+
+@bench("helpers.put_edit", size=data.LIST_SIZES)
+async def put_edit(size: int) -> Bench:
+    await list_of(size)
+    lines = (await helpers.get_edit_txt(data.GUILD_ID, NAME)).splitlines()
+    edited = list(lines)
+    edited[size // 2] = "edited task"
+    texts = itertools.cycle(("\n".join(edited), "\n".join(lines)))
+    try:
+        await helpers.put_edit(data.GUILD_ID, NAME, next(texts))
+    except ValueError as err:
+        raise Skip(str(err)) from err
+
+    return Bench(lambda: helpers.put_edit(data.GUILD_ID, NAME, next(texts)))
@@ -0,0 +1,122 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Benchmarks for models: encoding, rendering, and lookups"""
+import io
+import logging
+
+import sqlalchemy.orm as sqlorm
+
+from benchmarks import data
+from benchmarks.harness import Bench, bench
+from lisette.core import codec, models, views
+from lisette.core.database import SESSION
+
+
+def mk_tasks(size: int) -> list[models.Task]:
+    return [
+        models.Task(f"task {i}", checked=i % 3 == 0, indents=i % 2) for i in range(size)
+    ]
+
+
+def mk_list(size: int) -> models.TaskList:
+    """Return a transient list of size tasks, bypassing length validation."""
+    lst = models.TaskList("bench", data.GUILD_ID, msg_id=0)
+    sqlorm.attributes.set_committed_value(lst, "tasks", mk_tasks(size))
+    return lst
+
+
+@bench("Task.encode", size=data.LIST_SIZES)
+async def task_encode(size: int) -> Bench:
+    tasks = mk_tasks(size)
+    return Bench(lambda: [task.encode() for task in tasks])
+
+
+@bench("Task.decode_many", size=data.LIST_SIZES)
+async def task_decode_many(size: int) -> Bench:
+    txt = mk_list(size).encode_tasks()
+    return Bench(lambda: models.Task.decode_many(txt))
+
+
+@bench("codec.decode_many", size=data.LIST_SIZES)
+async def codec_decode_many(size: int) -> Bench:
+    txt = mk_list(size).encode_tasks()
+    return Bench(lambda: codec.decode_many(txt))
+
+
+@bench("TaskList.pretty_print", size=data.LIST_SIZES, cached=[True, False])
+async def list_pretty_print(size: int, cached: bool) -> Bench:
+    lst = mk_list(size)
+
+    async def drop_cache() -> None:
+        for task in lst.tasks:
+            task.__dict__.pop("_pretty", None)
+
+    return Bench(lst.pretty_print, setup=None if cached else drop_cache)
+
+
+@bench("TaskList.pretty_print logging", size=data.LIST_SIZES, level=["off", "INFO"])
+async def list_pretty_print_logging(size: int, level: str) -> Bench:
+    """Cold render with logging disabled, or at INFO with a handler attached.
+
+    Debug logging on the render path is guarded, so both should cost the same.
+    """
+    lst = mk_list(size)
+    pkg_log = logging.getLogger("lisette")
+    handler = logging.StreamHandler(io.StringIO())
+
+    async def setup() -> None:
+        for task in lst.tasks:
+            task.__dict__.pop("_pretty", None)
+        if level != "off":
+            logging.disable(logging.NOTSET)
+            pkg_log.setLevel(level)
+            pkg_log.addHandler(handler)
+
+    async def teardown() -> None:
+        pkg_log.removeHandler(handler)
+        pkg_log.setLevel(logging.NOTSET)
+        logging.disable(logging.CRITICAL)
+
+    return Bench(lst.pretty_print, setup=setup, teardown=teardown)
+
+
+@bench("len(TaskList)", size=data.LIST_SIZES)
+async def list_len(size: int) -> Bench:
+    lst = mk_list(size)
+    return Bench(lambda: len(lst))
+
+
+@bench("TaskList.lookup", size=data.LIST_SIZES)
+async def list_lookup(size: int) -> Bench:
+    await data.fresh_db()
+    await data.seed_list("bench", size)
+
+    async def lookup() -> None:
+        async with SESSION() as session:
+            await models.TaskList.lookup(session, data.GUILD_ID, "bench")
+
+    return Bench(lookup)
+
+
+@bench("ListView.lookup", size=data.LIST_SIZES)
+async def view_lookup(size: int) -> Bench:
+    await data.fresh_db()
+    await data.seed_list("bench", size)
+
+    async def lookup() -> None:
+        async with SESSION() as session:
+            await views.ListView.lookup(session, data.GUILD_ID, "bench")
+
+    return Bench(lookup)
+
+
+@bench("TaskList.lookup names", lists=data.GUILD_SIZES)
+async def list_lookup_names(lists: int) -> Bench:
+    await data.fresh_db()
+    await data.seed_guild(lists)
+
+    async def lookup() -> None:
+        async with SESSION() as session:
+            await models.TaskList.lookup(session, data.GUILD_ID, attr="name")
+
+    return Bench(lookup)
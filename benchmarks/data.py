@@ -0,0 +1,79 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Database setup for benchmarks"""
+import sqlalchemy as sql
+
+from lisette.core import database, models
+from lisette.core.database import SESSION
+
+LIST_SIZES = [10, 100, 1000]
+GUILD_SIZES = [10, 100, 1000, 10000]
+GUILD_ID = 1
+
+
+async def fresh_db() -> None:
+    """Replace the database with an empty in memory one."""
+    if database.ENGINE is not None:
+        await database.ENGINE.dispose()
+    await database.initalize("")
+
+
+async def seed_list(name: str, size: int, guild_id: int = GUILD_ID) -> None:
+    """Insert a list with size tasks, bypassing length validation."""
+    async with SESSION() as session:
+        list_id = await session.scalar(
+            sql.insert(models.TaskList)
+            .values(name=name, guild_id=guild_id, msg_id=0)
+            .returning(models.TaskList.id)
+        )
+        if size:
+            await session.execute(
+                sql.insert(models.Task),
+                [
+                    {
+                        "content": f"task {i}",
+                        "parent_list_id": list_id,
+                        "local_id": i,
+                        "checked": i % 3 == 0,
+                        "indents": i % 2,
+                    }
+                    for i in range(size)
+                ],
+            )
+        await session.commit()
+
+
+async def seed_guild(n_lists: int, guild_id: int = GUILD_ID) -> None:
+    """Insert n_lists empty lists into a guild."""
+    async with SESSION() as session:
+        await session.execute(
+            sql.insert(models.TaskList),
+            [
+                {"name": f"list {i:05}", "guild_id": guild_id, "msg_id": i}
+                for i in range(n_lists)
+            ],
+        )
+        await session.commit()
+
+
+def fits_list(size: int) -> bool:
+    """Whether a seeded list of size tasks fits in a list, across its messages."""
+    lst = models.TaskList("bench", GUILD_ID, msg_id=0)
+    longest = models.Task(f"task {size}", checked=True, indents=1)
+    return len(lst) + size * len(longest) <= models.LIST_MAX_CHARS
+
+
+async def top_up(name: str, size: int, guild_id: int = GUILD_ID) -> None:
+    """Append tasks to a seeded list until it has size tasks again."""
+    async with SESSION() as session:
+        lst = await models.TaskList.lookup(session, guild_id, name)
+        count = len(lst.tasks)
+        if count < size:
+            await session.execute(
+                sql.insert(models.Task),
+                [
+                    {"content": f"task {i}", "parent_list_id": lst.id, "local_id": i}
+                    for i in range(count, size)
+                ],
+            )
+        await session.commit()
@@ -0,0 +1,123 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Minimal benchmark harness producing JSON-serializable results"""
+import dataclasses
+import inspect
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+Timed = Callable[[], Any] | Callable[[], Awaitable[Any]]
+Setup = Optional[Callable[[], Awaitable[Any]]]
+
+# Registered benchmark cases, added to by the bench decorator
+CASES: list["Case"] = []
+
+
+class Skip(Exception):
+    """Raised by a benchmark that can't run with the given parameters."""
+
+
+@dataclasses.dataclass
+class Result:
+    """Timing of one benchmark with one set of parameters."""
+
+    name: str
+    params: dict[str, Any]
+    iterations: int = 0
+    mean: float = 0.0
+    median: float = 0.0
+    minimum: float = 0.0
+    stdev: float = 0.0
+    skipped: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """Name and parameters, unique in a report."""
+        params = ",".join(f"{k}={v}" for k, v in sorted(self.params.items()))
+        return f"{self.name}[{params}]"
+
+
+@dataclasses.dataclass
+class Case:
+    """A registered benchmark function and the parameter sets to run it with.
+
+    The function is given the parameters as keyword arguments and returns a
+    Bench describing what to time.
+    """
+
+    name: str
+    fn: Callable[..., Awaitable["Bench"]]
+    params: list[dict[str, Any]]
+
+
+@dataclasses.dataclass
+class Bench:
+    """What to time: fn, called repeatedly, after each untimed setup call."""
+
+    fn: Timed
+    setup: Setup = None
+    teardown: Setup = None
+
+
+def bench(name: str, **param_lists: list[Any]) -> Callable[..., Any]:
+    """Register a benchmark, run with every combination of param_lists."""
+    combos: list[dict[str, Any]] = [{}]
+    for key, vals in param_lists.items():
+        combos = [{**combo, key: val} for combo in combos for val in vals]
+
+    def decorator(fn: Callable[..., Awaitable[Bench]]) -> Callable[..., Any]:
+        CASES.append(Case(name, fn, combos))
+        return fn
+
+    return decorator
+
+
+async def _call(fn: Timed) -> None:
+    res = fn()
+    if inspect.isawaitable(res):
+        await res
+
+
+async def measure(
+    bench_: Bench, min_time: float = 0.2, max_iterations: int = 1000
+) -> list[float]:
+    """Return durations of repeated calls, stopping after min_time seconds.
+
+    One untimed call is made first to warm up caches.
+    """
+    times: list[float] = []
+    total = 0.0
+    if bench_.setup is not None:
+        await bench_.setup()
+    await _call(bench_.fn)
+    while total < min_time and len(times) < max_iterations:
+        if bench_.setup is not None:
+            await bench_.setup()
+        start = time.perf_counter()
+        await _call(bench_.fn)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+    if bench_.teardown is not None:
+        await bench_.teardown()
+    return times
+
+
+async def run_case(
+    case: Case, params: dict[str, Any], min_time: float, max_iterations: int
+) -> Result:
+    """Run one benchmark case with one set of parameters."""
+    result = Result(case.name, params)
+    try:
+        bench_ = await case.fn(**params)
+        times = await measure(bench_, min_time, max_iterations)
+    except Skip as err:
+        result.skipped = str(err)
+        return result
+    result.iterations = len(times)
+    result.mean = statistics.fmean(times)
+    result.median = statistics.median(times)
+    result.minimum = min(times)
+    result.stdev = statistics.stdev(times) if len(times) > 1 else 0.0
+    return result
@@ -0,0 +1,436 @@
+#!/usr/bin/env python
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Load test TasksCog commands without connecting to Discord.
+
+Concurrent workers invoke the callbacks of the /tasks slash commands with fake
+contexts and messages, against a SQLite database in a temporary directory.
+Latency percentiles, SQL statement counts, and the ratio of statements whose
+compiled form was found in SQLAlchemy's cache are reported per command.
+
+All commands target the same few lists, so eg. the contention between /tasks
+chk and /tasks edit submissions on one list can be reproduced with:
+
+    python -m benchmarks.loadtest --lists 1 --mix chk=1,edit=1
+"""
+import argparse
+import asyncio
+import contextvars
+import dataclasses
+import json
+import logging
+import math
+import os
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Optional
+
+import discord
+import sqlalchemy as sql
+from sqlalchemy.engine import default as sqldefault
+
+from lisette.cogs import helpers
+from lisette.cogs.tasks import TasksCog
+from lisette.core import bot, database, edits, models, ui
+
+GUILD_ID = 1
+DEFAULT_MIX = "new=4,chk=4,edit=2,del=2,delchk=1,info=1"
+PERCENTILES = (50, 95, 99)
+
+
+class FakeMessage:
+    """Stands in for a discord.Message, recording edits made to it."""
+
+    def __init__(self, id_: int, content: str = "") -> None:
+        self.id = id_
+        self.content = content
+        self.edits = 0
+
+    async def edit(self, *, content: Optional[str] = None, **_kwargs: Any) -> None:
+        self.edits += 1
+        if content is not None:
+            self.content = content
+
+    async def delete(self, **_kwargs: Any) -> None:
+        pass
+
+
+class FakeChannel(discord.TextChannel):
+    """Channel holding FakeMessages.
+
+    This subclasses TextChannel, without its state, to pass the isinstance
+    check in TasksEdit.callback.
+    """
+
+    def __init__(self) -> None:  # pylint: disable=super-init-not-called
+        self.id = 1
+        self.messages: dict[int, FakeMessage] = {}
+        self.fetches = 0
+
+    async def fetch_message(self, id: int) -> FakeMessage:  # type: ignore[override]
+        # pylint: disable=redefined-builtin
+        self.fetches += 1
+        if id not in self.messages:
+            raise discord.NotFound(SimpleNamespace(status=404, reason=""), "")
+        return self.messages[id]
+
+    def get_partial_message(self, message_id: int, /) -> FakeMessage:  # type: ignore[override]
+        return self.messages[message_id]
+
+    async def send(self, content: str = "", **_kwargs: Any) -> FakeMessage:  # type: ignore[override]
+        msg = FakeMessage(len(self.messages) + 1, content)
+        self.messages[msg.id] = msg
+        return msg
+
+    def can_send(self, *_objects: Any) -> bool:
+        return True
+
+
+class FakeContext:
+    """Stands in for a discord.ApplicationContext, recording responses."""
+
+    def __init__(self, channel: FakeChannel) -> None:
+        self.guild_id = GUILD_ID
+        self.guild = SimpleNamespace(id=GUILD_ID, name="load test")
+        self.channel = channel
+        self.channel_id = channel.id
+        self.command = None
+        self.responses: list[str] = []
+        self.modal: Optional[ui.TasksEdit] = None
+
+    async def defer(self, **_kwargs: Any) -> None:
+        pass
+
+    async def respond(self, content: str = "", **_kwargs: Any) -> None:
+        self.responses.append(content)
+
+    async def send(self, content: str = "", **kwargs: Any) -> FakeMessage:
+        return await self.channel.send(content, **kwargs)
+
+    async def send_modal(self, modal: ui.TasksEdit) -> None:
+        self.modal = modal
+
+    async def fetch_message(self, id_: int) -> FakeMessage:
+        return await self.channel.fetch_message(id_)
+
+
+class FakeInteraction:
+    """Stands in for the discord.Interaction of a modal submission."""
+
+    def __init__(self, ctx: FakeContext) -> None:
+        self.guild = ctx.guild
+        self.channel = ctx.channel
+        self.channel_id = ctx.channel_id
+        self.response = SimpleNamespace(send_message=ctx.respond)
+
+
+@dataclasses.dataclass
+class Stats:
+    """Timings and statement counts of one kind of command."""
+
+    latencies: list[float] = dataclasses.field(default_factory=list)
+    queries: list[int] = dataclasses.field(default_factory=list)
+    # Statements compiled from a cache key, and those found in the cache
+    compiled: int = 0
+    cache_hits: int = 0
+    errors: dict[str, int] = dataclasses.field(default_factory=dict)
+
+    def count_error(self, err: Exception) -> None:
+        name = type(err).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self) -> dict[str, Any]:
+        out: dict[str, Any] = {"count": len(self.latencies)}
+        if self.latencies:
+            ordered = sorted(self.latencies)
+            for p in PERCENTILES:
+                out[f"p{p}_ms"] = percentile(ordered, p) * 1e3
+            out["queries_mean"] = sum(self.queries) / len(self.queries)
+            out["queries_max"] = max(self.queries)
+        if self.compiled:
+            out["cache_hit_ratio"] = self.cache_hits / self.compiled
+        out["errors"] = self.errors
+        return out
+
+
+def percentile(ordered: list[float], p: float) -> float:
+    """Return the pth percentile of sorted values, by nearest rank."""
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+# Statement counters of the command running in the current task: statements,
+# statements compiled from a cache key, and compiled cache hits
+_QUERIES: contextvars.ContextVar[Optional[list[int]]] = contextvars.ContextVar(
+    "_QUERIES", default=None
+)
+_CACHED = (sqldefault.CACHE_HIT, sqldefault.CACHE_MISS)
+
+
+def _count_statement(*args: Any) -> None:
+    counter = _QUERIES.get()
+    if counter is None:
+        return
+    counter[0] += 1
+    # Driver SQL, eg. BEGIN, has no cache key to look up
+    context = args[4]
+    if context.cache_hit in _CACHED:
+        counter[1] += 1
+        counter[2] += context.cache_hit == sqldefault.CACHE_HIT
+
+
+Command = Callable[[], Awaitable[None]]
+
+
+class LoadTest:
+    """Runs a mix of commands against a few lists.
+
+    Args:
+        cog: Cog to invoke commands of.
+        channel: Channel the lists' messages are in.
+        names: Names of the lists commands target.
+        mix: Relative weight of each command, by name.
+        seed: Seed for choosing commands and their arguments.
+    """
+
+    def __init__(
+        self,
+        cog: TasksCog,
+        channel: FakeChannel,
+        names: list[str],
+        mix: dict[str, int],
+        seed: Optional[int] = None,
+    ) -> None:
+        self.cog = cog
+        self.channel = channel
+        self.names = names
+        self.kinds = list(mix)
+        self.weights = list(mix.values())
+        self.rng = random.Random(seed)
+        self.stats: dict[str, Stats] = {}
+        self.made = 0
+
+    async def _positions(self, name: str) -> Optional[str]:
+        """Return a random valid position in a list, or None if it's empty."""
+        lst = await helpers.get_list(GUILD_ID, name)
+        if not lst.tasks:
+            return None
+        return str(self.rng.randrange(len(lst.tasks)))
+
+    async def prepare(self, kind: str, ctx: FakeContext) -> list[tuple[str, Command]]:
+        """Return the steps of running a command, each to be timed separately.
+
+        Arguments are chosen from the cached state of a list before any step
+        runs, so they may be stale by the time a step does, as they can be for
+        a user.
+        """
+        cog = self.cog
+        name = self.rng.choice(self.names)
+        if kind == "new":
+            self.made += 1
+            content = f"task {self.made}"
+            return [("new", lambda: TasksCog.new.callback(cog, ctx, name, content))]
+        if kind == "info":
+            return [("info", lambda: TasksCog.info.callback(cog, ctx, name))]
+        if kind == "delchk":
+            return [("delchk", lambda: TasksCog.delchk.callback(cog, ctx, name))]
+        if kind in ("chk", "del"):
+            positions = await self._positions(name)
+            if positions is None:
+                return []
+            callback = (TasksCog.chk if kind == "chk" else TasksCog.del_).callback
+            return [(kind, lambda: callback(cog, ctx, name, positions))]
+        if kind == "edit":
+            return [
+                ("edit", lambda: TasksCog.edit.callback(cog, ctx, name)),
+                ("edit-submit", lambda: self._submit_edit(ctx)),
+            ]
+        raise ValueError(f"Unknown command {kind}")
+
+    async def _submit_edit(self, ctx: FakeContext) -> None:
+        """Submit the modal opened by /tasks edit, toggling one line."""
+        modal = ctx.modal
+        assert modal is not None
+        field = modal.children[0]
+        lines = (field.value or "").splitlines()
+        if lines:
+            i = self.rng.randrange(len(lines))
+            task = models.Task.decode(lines[i])
+            task.checked = not task.checked
+            lines[i] = task.encode()
+        else:
+            lines.append("edited task")
+        field.value = "\n".join(lines)
+        await modal.callback(FakeInteraction(ctx))  # type: ignore[arg-type]
+
+    async def run_command(self) -> None:
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        ctx = FakeContext(self.channel)
+        try:
+            steps = await self.prepare(kind, ctx)
+        except Exception as err:  # pylint: disable=broad-except
+            self._stats(kind).count_error(err)
+            return
+        for step, command in steps:
+            stats = self._stats(step)
+            counter = [0, 0, 0]
+            token = _QUERIES.set(counter)
+            start = time.perf_counter()
+            try:
+                await command()
+            except Exception as err:  # pylint: disable=broad-except
+                stats.count_error(err)
+                return
+            finally:
+                stats.latencies.append(time.perf_counter() - start)
+                stats.queries.append(counter[0])
+                stats.compiled += counter[1]
+                stats.cache_hits += counter[2]
+                _QUERIES.reset(token)
+
+    def _stats(self, step: str) -> Stats:
+        return self.stats.setdefault(step, Stats())
+
+    async def run(self, n_commands: int, concurrency: int) -> float:
+        """Run n_commands over concurrent workers, returning seconds taken."""
+        remaining = n_commands
+
+        async def worker() -> None:
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await self.run_command()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def parse_mix(txt: str) -> dict[str, int]:
+    """Parse a command mix of the style 'new=4,chk=2'."""
+    mix: dict[str, int] = {}
+    for item in txt.split(","):
+        kind, _, weight = item.partition("=")
+        mix[kind.strip()] = int(weight) if weight else 1
+    return mix
+
+
+async def setup(
+    url: str, n_lists: int, n_tasks: int, options: dict[str, Any]
+) -> tuple[FakeChannel, list[str]]:
+    """Initalize the database and make lists, returning their channel and names."""
+    engine = await database.initalize(url, **options)
+    sql.event.listen(engine.sync_engine, "before_cursor_execute", _count_statement)
+    channel = FakeChannel()
+    names = [f"list {i}" for i in range(n_lists)]
+    for name in names:
+        msg = await channel.send("Making list...")
+        await helpers.mk_list(GUILD_ID, name, msg.id, channel.id)
+        for i in range(n_tasks):
+            await helpers.mk_task(GUILD_ID, name, f"seed task {i}")
+    return channel, names
+
+
+async def main(args: argparse.Namespace) -> dict[str, Any]:
+    options: dict[str, Any] = {"pool_size": args.pool_size}
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.db_url or "/" + os.path.join(tmp, "loadtest.sqlite")
+        channel, names = await setup(url, args.lists, args.tasks, options)
+        edits.EDITS.delay = args.edit_delay
+        if args.write_behind:
+            writes = asyncio.create_task(database.WRITES.run(args.write_behind / 1000))
+        cog = TasksCog(bot.Bot())
+        test = LoadTest(cog, channel, names, parse_mix(args.mix), args.seed)
+        elapsed = await test.run(args.commands, args.concurrency)
+        await edits.EDITS.flush()
+        if args.write_behind:
+            writes.cancel()
+            await asyncio.gather(writes, return_exceptions=True)
+        assert database.ENGINE is not None
+        await database.ENGINE.dispose()
+
+    n_done = sum(len(s.latencies) for s in test.stats.values())
+    compiled = sum(s.compiled for s in test.stats.values())
+    cache_hits = sum(s.cache_hits for s in test.stats.values())
+    return {
+        "commands": args.commands,
+        "concurrency": args.concurrency,
+        "lists": args.lists,
+        "mix": args.mix,
+        "seconds": elapsed,
+        "steps_per_second": n_done / elapsed,
+        "message_edits": sum(msg.edits for msg in channel.messages.values()),
+        "message_fetches": channel.fetches,
+        "cache_hit_ratio": cache_hits / compiled if compiled else None,
+        "steps": {step: s.summary() for step, s in sorted(test.stats.items())},
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f"{report['commands']} commands, concurrency {report['concurrency']},"
+        f" {report['lists']} list(s): {report['seconds']:.2f} s,"
+        f" {report['steps_per_second']:.1f} steps/s,"
+        f" {report['message_edits']} message edits,"
+        f" {report['message_fetches']} message fetches"
+    )
+    if report["cache_hit_ratio"] is not None:
+        print(f"Compiled statement cache hits: {report['cache_hit_ratio']:.1%}")
+    header = "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES)
+    print(f"{'step':<12}{'count':>7}{header}{'queries':>9}{'hits':>8}  errors")
+    for step, s in report["steps"].items():
+        times = "".join(f"{s.get(f'p{p}_ms', 0):>10.2f}" for p in PERCENTILES)
+        hits = f"{s['cache_hit_ratio']:.0%}" if "cache_hit_ratio" in s else ""
+        print(
+            f"{step:<12}{s['count']:>7}{times}{s.get('queries_mean', 0):>9.1f}"
+            f"{hits:>8}  {s['errors'] or ''}"
+        )
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-n", "--commands", type=int, default=1000)
+    parser.add_argument("-c", "--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--lists", type=int, default=1, help="Number of lists commands target."
+    )
+    parser.add_argument(
+        "--tasks", type=int, default=20, help="Tasks to put in each list first."
+    )
+    parser.add_argument(
+        "--mix", default=DEFAULT_MIX, help="Relative weights of commands to run."
+    )
+    parser.add_argument("--seed", type=int, help="Seed for choosing commands.")
+    parser.add_argument(
+        "--edit-delay",
+        type=float,
+        default=edits.DEFAULT_DELAY,
+        help="Seconds to coalesce message edits for.",
+    )
+    parser.add_argument(
+        "--write-behind",
+        type=int,
+        default=0,
+        help="Milliseconds to group commit writes for, 0 to commit each.",
+    )
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument(
+        "--db-url", help="Database to use instead of a temporary SQLite file."
+    )
+    parser.add_argument("-o", "--output", help="Path to write JSON report to.")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    report = asyncio.run(main(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Benchmark concurrent mk_task throughput with different engine settings.
+
+Run from the repository root with `python -m benchmarks.sqlite_concurrency`.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any
+
+from lisette.cogs import helpers
+from lisette.core import database
+
+# Engine settings as they were before engine options existed.
+BASELINE: dict[str, Any] = {"wal": False, "synchronous": "FULL"}
+TUNED: dict[str, Any] = {"wal": True, "synchronous": "NORMAL", "pool_size": 10}
+
+
+async def run(
+    path: str, options: dict[str, Any], n_tasks: int, concurrency: int
+) -> float:
+    """Return mk_task calls per second made by concurrent workers."""
+    engine = await database.initalize("/" + path, **options)
+    names = [f"list {i}" for i in range(concurrency)]
+    for i, name in enumerate(names):
+        await helpers.mk_list(0, name, i)
+
+    async def worker(name: str) -> None:
+        for i in range(n_tasks // concurrency):
+            await helpers.mk_task(0, name, f"task {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(name) for name in names))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    return n_tasks / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    for label, options in (("baseline", BASELINE), ("tuned", TUNED)):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.sqlite")
+            rate = await run(path, options, args.tasks, args.concurrency)
+        print(f"{label:>8}: {rate:8.1f} mk_task/s  {options}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,60 +1,105 @@
 #!/usr/bin/env python
 # Copyright (c) 2023 Amelia Froemming
 # SPDX-License-Identifier: MIT
-"""Entrypoint module for Lisette bot."""
+"""Entrypoint module for Lisette bot.
+
+Besides running the bot, lists can be exported from and imported into the
+database without connecting to Discord:
+
+    python -m lisette export GUILD_ID [--output PATH]
+    python -m lisette import PATH
+"""
+import argparse
 import asyncio
-import functools
 import logging
 import os
-import signal
 import sys
-from types import FrameType
+from typing import TextIO
 
-import sqlalchemy.ext.asyncio as sqlaio
-
-import lisette.cogs.tasks
-import lisette.cogs.util
 import lisette.lib.logging
-from lisette.core import bot, database, options
+from lisette.core import archive, options, runner
+from lisette.core.database import SESSION
 from lisette.lib import config
 
+ARCHIVE_COMMANDS = ("export", "import")
 
-def exit_handler(signum: int, tasks: set[asyncio.Task]) -> None:  # type: ignore
-    global log
-    signame = signal.Signals(signum).name
-    log.info(f"Signal handler called with signal {signame} ({signum})")
-    if signal.SIGINT or signal.SIGTERM:
-        log.info("Cancelling background tasks. .  .")
-        for task in tasks:
-            task.cancel()
 
-
-async def main() -> None:
+def main(debug: bool) -> int:
     global log
-    bot_ = bot.Bot()
     cfg = config.get_cfg(options.lis_options, env_prefix="LISETTE")
-    log = lisette.lib.logging.initalize(cfg, "lisette", DEBUG)
+    log = lisette.lib.logging.initalize(cfg, "lisette", debug)
+
+    n_workers: int = cfg.get("shard_processes", 1)
+    if n_workers > 1:
+        return runner.supervise(cfg, n_workers, debug)
+    asyncio.run(runner.run(cfg))
+    return 0
+
 
-    bot_.add_cog(lisette.cogs.tasks.TasksCog(bot_))
-    bot_.add_cog(lisette.cogs.util.UtilCog(bot_))
+async def export_lists(cfg: config.Cfg, guild_id: int, out: TextIO) -> None:
+    engine = await runner.init_database(cfg)
+    try:
+        async with SESSION() as session:
+            async for line in archive.export_guild(session, guild_id):
+                out.write(line + "\n")
+    finally:
+        await engine.dispose()
+
+
+async def import_lists(cfg: config.Cfg, lists: archive.Archive) -> None:
+    engine = await runner.init_database(cfg)
+    try:
+        async with SESSION() as session, session.begin():
+            await archive.import_guild(session, lists.guild_id, lists.lists)
+    finally:
+        await engine.dispose()
+
+
+def main_archive(debug: bool) -> int:
+    """Export or import a guild's lists, as 'python -m lisette export/import'.
+
+    Imported lists keep their messages, which only the bot that sent them can
+    edit. Lists are imported into the guild they were exported from. A running
+    bot's caches aren't updated, so it won't suggest their names until it's
+    restarted.
+    """
+    global log
+    parser = argparse.ArgumentParser(
+        prog="python -m lisette", description="Export or import a guild's lists."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Write a guild's lists to a file.")
+    export.add_argument("guild_id", type=int)
+    export.add_argument("--output", help="Path to write to, instead of stdout.")
+    import_ = commands.add_parser(
+        "import", help="Add lists from an export, while the bot is stopped."
+    )
+    import_.add_argument("path")
+    # Other args are database options, read with the config below
+    args, _unknown = parser.parse_known_args()
 
-    engine = await database.initalize(cfg.db_path)
-    tasks: set[asyncio.Task] = set()  # type: ignore
+    # Only the database is used, so no token is needed
+    db_options = [opt for opt in options.lis_options if opt.name != "token"]
+    cfg = config.get_cfg(db_options, env_prefix="LISETTE")
+    log = lisette.lib.logging.initalize(cfg, "lisette", debug)
 
-    async with asyncio.TaskGroup() as tg:
-        # Add signal handlers
-        loop = asyncio.get_running_loop()
-        loop.add_signal_handler(
-            signal.SIGINT, functools.partial(exit_handler, signal.SIGINT, tasks)
-        )
-        loop.add_signal_handler(
-            signal.SIGTERM, functools.partial(exit_handler, signal.SIGTERM, tasks)
-        )
-        tasks.add(tg.create_task(bot_.begin(cfg.token)))
+    if args.command == "export":
+        if args.output is None:
+            asyncio.run(export_lists(cfg, args.guild_id, sys.stdout))
+        else:
+            with open(args.output, "w", encoding="utf-8") as f:
+                asyncio.run(export_lists(cfg, args.guild_id, f))
+        return 0
 
-    log.info("Closing database engine.")
-    await engine.dispose()
-    log.info("Shutdown complete")
+    try:
+        with open(args.path, encoding="utf-8") as f:
+            lists = archive.read(f)
+        asyncio.run(import_lists(cfg, lists))
+    except ValueError as err:
+        log.critical("Couldn't import lists: %s", err)
+        return 1
+    log.info("Imported %s lists into guild %s", len(lists.lists), lists.guild_id)
+    return 0
 
 
 if __name__ == "__main__":
@@ -68,4 +113,6 @@ if __name__ == "__main__":
         log = lisette.lib.logging.fallback_logger("lisette")
         log.warning("DEBUG MODE")
 
-    asyncio.run(main())
+    if len(sys.argv) > 1 and sys.argv[1] in ARCHIVE_COMMANDS:
+        sys.exit(main_archive(DEBUG))
+    sys.exit(main(DEBUG))
@@ -1,126 +1,457 @@
 """Helper functions for cogs"""
+import contextlib
 import logging
-from typing import Sequence
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    NamedTuple,
+    Optional,
+    Protocol,
+    Self,
+    Sequence,
+    runtime_checkable,
+)
 
 import discord as dis
+import sqlalchemy as sql
 import sqlalchemy.exc as sqlexc
 import sqlalchemy.ext.asyncio as sqlaio
+import sqlalchemy.orm as sqlorm
 
-from lisette.core import models
+from lisette.core import archive, cache, database, edits, locks, models, views
 from lisette.core.database import SESSION
 from lisette.lib import util
 
 log = logging.getLogger(__name__)
 
 CHECKED_PREFIX = "!"
+STREAM_ROWS = 500  # Rows to fetch at a time when streaming results
 
+# Where a command or modal was used, which lists' messages are reached from
+Origin = dis.ApplicationContext | dis.Interaction
 
-async def respond_all(ctx: dis.ApplicationContext, msgs: list[str]) -> None:
-    """Respond with a list of messages"""
-    for msg in msgs:
-        await ctx.respond(content=msg, ephemeral=True)
 
+@runtime_checkable
+class ListChannel(cache.MessageChannel, Protocol):
+    """A channel list messages can be sent to, eg. discord.TextChannel"""
 
-async def get_lists_info(guild_id: int, guild_name: str) -> list[str]:
-    """Return list of strs that are msgs describing lists in a guild"""
-    msgs: list[str] = [f"Lists in guild {guild_name}:"]
-    async with SESSION() as session:
-        lsts: Sequence[models.TaskList] = await models.TaskList.lookup(
-            session, guild_id
-        )
-        if len(lsts) == 0:
-            msgs.append("None")
-            return ["/n".join(msgs)]
-        for lst in lsts:
-            msgs.append(f"{lst.id}: '{lst.name}'")
-    return util.split_len("\n".join(msgs))
+    async def send(self, content: str) -> dis.Message:
+        ...
+
+
+async def respond_all(ctx: dis.ApplicationContext, msgs: AsyncIterable[str]) -> None:
+    """Respond with messages as they are ready"""
+    async for msg in msgs:
+        await ctx.respond(content=msg, ephemeral=True)
 
 
-async def mk_list(guild_id: int, name: str, msg_id: int) -> str:
+async def get_lists_info(guild_id: int, guild_name: str) -> AsyncIterator[str]:
+    """Yield msgs describing lists in a guild, as rows are read"""
+    stmt = (
+        sql.select(models.TaskList.id, models.TaskList.name)
+        .where(models.TaskList.guild_id == guild_id)
+        .order_by(models.TaskList.name)
+        .execution_options(yield_per=STREAM_ROWS)
+    )
+
+    async def lines() -> AsyncIterator[str]:
+        yield f"Lists in guild {guild_name}:"
+        found = False
+        # Reads in other sessions only see committed writes
+        await database.WRITES.commit()
+        async with SESSION() as session:
+            result = await session.stream(stmt)
+            # Iterating rows one at a time costs an await each
+            async for rows in result.partitions():
+                found = True
+                for list_id, name in rows:
+                    yield f"{list_id}: '{name}'"
+        if not found:
+            yield "None"
+
+    async for page in util.apaginate(lines()):
+        yield page
+
+
+async def get_list(guild_id: int, name: str) -> views.ListView:
+    """Return a view of a list for reading, from the cache if possible.
+
+    Raises:
+        sqlalchemy.exc.NoResultFound
+    """
+    lst = cache.LISTS.get(guild_id, name)
+    if lst is not None:
+        return lst
+    # Writes put their views under the list's lock, so a view read meanwhile
+    # can't replace a newer one
+    async with locks.LISTS.hold((guild_id, name)):
+        lst = cache.LISTS.get(guild_id, name)
+        if lst is not None:
+            return lst
+        await database.WRITES.commit()
+        async with SESSION() as session:
+            lst = await views.ListView.lookup(session, guild_id, name)
+        cache.LISTS.put(lst)
+    return lst
+
+
+async def mk_list(
+    guild_id: int, name: str, msg_id: int, channel_id: Optional[int] = None
+) -> str:
     """Make a new list"""
-    async with SESSION() as session:
-        if await is_name_in_guild(session, guild_id, name):
-            raise ValueError("Name is already used for a list in this guild.")
-        lst = models.TaskList(name=name, guild_id=guild_id, msg_id=msg_id)
-        session.add(lst)
-        msg = lst.pretty_print()
-        await session.commit()
+    async with locks.LISTS.hold((guild_id, name)):
+        async with _txn() as session:
+            if await is_name_in_guild(session, guild_id, name):
+                raise ValueError("Name is already used for a list in this guild.")
+            lst = models.TaskList(
+                name=name, guild_id=guild_id, msg_id=msg_id, channel_id=channel_id
+            )
+            session.add(lst)
+            msg = lst.pretty_print()
+        cache.LISTS.put(views.ListView.from_model(lst))
+        cache.NAMES.add(guild_id, name)
     return msg
 
 
-async def del_list(guild_id: int, name: str) -> int:
-    """Delete a list"""
-    async with SESSION() as session:
-        lst = await models.TaskList.lookup(session, guild_id, name)
-        msg_id = lst.msg_id
-        await session.delete(lst)
-        await session.commit()
-    return msg_id
+class ListMsgs(NamedTuple):
+    """Messages a list is output to.
 
+    Attributes:
+        channel_id: Discord id of their channel, None if not known.
+        msg_ids: Discord ids of the messages, by page.
+    """
+
+    channel_id: Optional[int]
+    msg_ids: tuple[int, ...]
 
-async def get_tasks_info(guild_id: int, name: str) -> list[str]:
-    """Returns formatted list info."""
-    msgs: list[str] = [f"Tasks in {name}:"]
-    async with SESSION() as sess:
-        lst = await models.TaskList.lookup(sess, guild_id, name)
-        tasks: Sequence[models.Task] = lst.tasks
-        for task in tasks:
-            msgs.append(f"{task.local_id}: '{task.content}', checked={task.checked}")
 
-    return util.split_len("\n".join(msgs))
+async def del_list(guild_id: int, name: str) -> ListMsgs:
+    """Delete a list, returning the messages it was output to"""
+    async with locks.LISTS.hold((guild_id, name)):
+        async with _txn() as session:
+            lst = await models.TaskList.lookup(session, guild_id, name)
+            msgs = ListMsgs(lst.channel_id, tuple(lst.msg_ids()))
+            await session.delete(lst)
+        cache.LISTS.invalidate(guild_id, name)
+        cache.NAMES.remove(guild_id, name)
+    return msgs
 
 
-async def mk_task(guild_id: int, list_name: str, content: str) -> str:
+async def export_lists(guild_id: int) -> AsyncIterator[str]:
+    """Yield the lines of an archive of a guild's lists, as rows are read"""
+    await database.WRITES.commit()
+    async with SESSION() as session:
+        async for line in archive.export_guild(session, guild_id):
+            yield line
+
+
+async def import_lists(origin: Origin, lists: archive.Archive) -> int:
+    """Import lists into the origin's guild, returning how many there were.
+
+    Lists exported from this guild keep their messages, which are edited to
+    show them. Those from another guild, or whose messages were deleted since,
+    are sent to the origin's channel instead.
+
+    Raises:
+        ValueError: If a list's name is already used in the guild.
+    """
+    assert origin.guild_id is not None
+    guild_id = origin.guild_id
+    records = lists.lists
+    keys = [(guild_id, lst.name) for lst in records]
+    resize: list[str] = []
+    async with locks.LISTS.hold(*keys):
+        sent: list[int] = []
+        try:
+            if lists.guild_id != guild_id:
+                # Check first, to not send messages for lists that can't be made
+                await database.WRITES.commit()
+                async with SESSION() as session:
+                    await archive.check_names(session, guild_id, records)
+                records = [await _send_list(origin, lst, sent) for lst in records]
+            async with _txn() as session:
+                await archive.import_guild(session, guild_id, records)
+        except Exception:
+            await delete_msgs(origin, ListMsgs(origin.channel_id, tuple(sent)))
+            raise
+        for lst in records:
+            cache.NAMES.add(guild_id, lst.name)
+            if not sent and not await _show_list(origin, guild_id, lst):
+                resize.append(lst.name)
+    for name in resize:
+        await resize_list_msgs(origin, guild_id, name)
+    return len(records)
+
+
+async def _send_list(
+    origin: Origin, lst: archive.ListRecord, sent: list[int]
+) -> archive.ListRecord:
+    """Send a list to the origin's channel, returning it with its new messages.
+
+    Ids of the messages are also added to sent as they're sent.
+    """
+    channel = list_channel(origin, None)
+    msg_ids: list[int] = []
+    for page in lst.pages():
+        msg_ids.append((await channel.send(page)).id)
+        sent.append(msg_ids[-1])
+    return lst._replace(channel_id=origin.channel_id, msg_ids=tuple(msg_ids))
+
+
+async def _show_list(origin: Origin, guild_id: int, lst: archive.ListRecord) -> bool:
+    """Edit an imported list's messages to show it, under the list's lock.
+
+    If they were deleted, it's sent to the origin's channel instead. Returns
+    whether the list has a message for each page it has.
+    """
+    pages = lst.pages()
+    try:
+        for msg_id, page in zip(lst.msg_ids, pages):
+            await list_msg(origin, lst.channel_id, msg_id).edit(content=page)
+    except dis.NotFound:
+        new = await _send_list(origin, lst, [])
+        async with _list_txn(guild_id, lst.name) as (session, lst_):
+            lst_.channel_id = new.channel_id
+            lst_.msg_id = new.msg_ids[0]
+            # Flushed first, as the new messages have the same pages
+            lst_.messages.clear()
+            await session.flush()
+            lst_.messages.extend(
+                models.ListMessage(page, msg_id)
+                for page, msg_id in enumerate(new.msg_ids[1:], start=1)
+            )
+        # Any of its old messages still there are replaced too
+        await delete_msgs(origin, ListMsgs(lst.channel_id, lst.msg_ids))
+        return True
+    except dis.HTTPException as err:
+        log.warning("Couldn't show imported list '%s': %s", lst.name, err)
+    return len(pages) == len(lst.msg_ids)
+
+
+async def get_tasks_info(guild_id: int, name: str) -> AsyncIterator[str]:
+    """Yield msgs describing a list's tasks, as rows are read if not cached.
+
+    Raises:
+        sqlalchemy.exc.NoResultFound
+    """
+    stmt = (
+        sql.select(models.Task.local_id, models.Task.content, models.Task.checked)
+        .select_from(models.TaskList)
+        .outerjoin(models.Task, models.Task.parent_list_id == models.TaskList.id)
+        .where(models.TaskList.guild_id == guild_id, models.TaskList.name == name)
+        .order_by(models.Task.local_id)
+        .execution_options(yield_per=STREAM_ROWS)
+    )
+
+    async def tasks() -> AsyncIterator[tuple[int, str, bool]]:
+        lst = cache.LISTS.get(guild_id, name)
+        if lst is not None:
+            for task in lst.tasks:
+                yield task.local_id, task.content, task.checked
+            return
+        found = False
+        await database.WRITES.commit()
+        async with SESSION() as session:
+            result = await session.stream(stmt)
+            async for rows in result.partitions():
+                found = True
+                for local_id, content, checked in rows:
+                    # A list without tasks is one row of NULL task columns
+                    if content is not None:
+                        yield local_id, content, checked
+        if not found:
+            raise sqlexc.NoResultFound("No list found when one was required")
+
+    async def lines() -> AsyncIterator[str]:
+        yield f"Tasks in {name}:"
+        async for local_id, content, checked in tasks():
+            yield f"{local_id}: '{content}', checked={checked}"
+
+    async for page in util.apaginate(lines()):
+        yield page
+
+
+class ListUpdate(NamedTuple):
+    """Result of an operation that changes a list's messages.
+
+    Attributes:
+        guild_id: Of the list.
+        name: Of the list.
+        channel_id: Discord id of the channel the list is in, None if not known.
+        msg_ids: Discord ids of the messages the list is output to, by page.
+        pages: New text for each page. If the list grew or shrank, there are
+            more or fewer of these than msg_ids.
+        changed: Positions of pages whose text changed.
+    """
+
+    guild_id: int
+    name: str
+    channel_id: Optional[int]
+    msg_ids: tuple[int, ...]
+    pages: tuple[str, ...]
+    changed: tuple[int, ...]
+
+    @property
+    def msg_id(self) -> int:
+        """Discord id of the message the list's first page is output to."""
+        return self.msg_ids[0]
+
+    @property
+    def content(self) -> str:
+        """New text of the whole list."""
+        return "".join(self.pages)
+
+    @classmethod
+    def diff(cls, lst: models.TaskList, shown: Sequence[str]) -> Self:
+        """Return update to a list's messages, which show the pages shown."""
+        pages = lst.pages()
+        changed = tuple(
+            i for i, page in enumerate(pages) if i >= len(shown) or page != shown[i]
+        )
+        return cls(
+            lst.guild_id,
+            lst.name,
+            lst.channel_id,
+            tuple(lst.msg_ids()),
+            tuple(pages),
+            changed,
+        )
+
+
+@contextlib.asynccontextmanager
+async def list_txn(
+    guild_id: int, name: str, *lock_names: str
+) -> AsyncIterator[tuple[sqlaio.AsyncSession, models.TaskList]]:
+    """Open a transaction on a single list.
+
+    The list's lock, and those of any lock_names in the same guild, are held
+    for the whole transaction, so changes to a list are made one at a time.
+    The list is looked up once and the transaction is committed when the block
+    exits without error, after which a view of the committed list is written
+    through to the cache.
+
+    Raises:
+        sqlalchemy.exc.NoResultFound
+    """
+    keys = [(guild_id, key) for key in (name, *lock_names)]
+    async with locks.LISTS.hold(*keys):
+        async with _list_txn(guild_id, name) as (session, lst):
+            yield session, lst
+
+
+@contextlib.asynccontextmanager
+async def _list_txn(
+    guild_id: int, name: str
+) -> AsyncIterator[tuple[sqlaio.AsyncSession, models.TaskList]]:
+    """As list_txn, for a caller already holding the list's lock."""
+    async with _txn() as session:
+        lst = await models.TaskList.lookup(session, guild_id, name)
+        try:
+            yield session, lst
+        except BaseException:
+            # Rolling back doesn't undo state set as committed, eg. by
+            # _delete_positions, which a shared session would keep
+            for obj in (lst, *lst.__dict__.get("tasks", ())):
+                if sql.inspect(obj).persistent:
+                    session.expire(obj)
+            raise
+    cache.LISTS.put(views.ListView.from_model(lst))
+
+
+@contextlib.asynccontextmanager
+async def _txn() -> AsyncIterator[sqlaio.AsyncSession]:
+    """Open a transaction, committed when the block exits without error.
+
+    If writes are group committed, this is a unit of work in the current batch
+    instead, see database.WriteBehind.
+    """
+    if database.WRITES.running:
+        async with database.WRITES.session() as session:
+            yield session
+        return
+    async with SESSION() as session, session.begin():
+        yield session
+
+
+async def mk_task(guild_id: int, list_name: str, content: str) -> ListUpdate:
     """Make new task, returning list msg id and new list txt"""
-    async with SESSION() as sess:
-        lst: models.TaskList = await models.TaskList.lookup(sess, guild_id, list_name)
+    async with list_txn(guild_id, list_name) as (_sess, lst):
+        shown = lst.pages()
         tsk: models.Task = models.Task(content=content)
         lst.insert(tsk)
-        out = lst.pretty_print()
-        await sess.commit()
+        out = ListUpdate.diff(lst, shown)
     return out
 
 
 async def del_tasks(
     guild_id: int, list_name: str, *positions: int
-) -> tuple[list[int], list[int], str]:
+) -> tuple[list[int], list[int], ListUpdate]:
     """Delete a task."""
     if min(positions) < 0:
         raise ValueError(f"Invalid minimum position {min(positions)}. Must be > 0.")
-    async with SESSION() as sess:
-        lst: models.TaskList = await models.TaskList.lookup(sess, guild_id, list_name)
+    async with list_txn(guild_id, list_name) as (sess, lst):
+        shown = lst.pages()
         deleted: list[int] = []
         ignored: list[int] = []
-        # Delete each task[pos] for pos is positions
         # convert to set to avoid duplicates
         for pos in sorted(set(positions), reverse=True):
-            log.debug("del task pos: %s", pos)
-            try:
-                del lst.tasks[pos]
-            except IndexError:
+            if pos < len(lst.tasks):
+                deleted.append(pos)
+            else:
                 ignored.append(pos)
-                continue
-            deleted.append(pos)
-            lst.renumber()
-
-        await sess.commit()
-        await sess.refresh(lst)
-        update = lst.pretty_print()
-        out = (deleted, ignored, update)
-        await sess.commit()
+        log.debug("del task positions: %s", deleted)
+        await _delete_positions(sess, lst, deleted)
+
+        out = (deleted, ignored, ListUpdate.diff(lst, shown))
     return out
 
 
-async def check_tasks(guild_id: int, list_name: str, *positions: int) -> str:
+async def _delete_positions(
+    session: sqlaio.AsyncSession, lst: models.TaskList, positions: Sequence[int]
+) -> None:
+    """Delete tasks at positions in a list and renumber the rest.
+
+    This issues one DELETE and at most one UPDATE, then sets the in memory
+    list to match without marking anything changed in the session.
+    """
+    if not positions:
+        return
+    drop = set(positions)
+    tasks = list(lst.tasks)
+    doomed = [task for i, task in enumerate(tasks) if i in drop]
+    kept = [task for i, task in enumerate(tasks) if i not in drop]
+
+    await session.execute(
+        sql.delete(models.Task)
+        .where(models.Task.id.in_([task.id for task in doomed]))
+        .execution_options(synchronize_session=False)
+    )
+    renumbered = {task.id: i for i, task in enumerate(kept) if task.local_id != i}
+    if renumbered:
+        await session.execute(
+            sql.update(models.Task)
+            .where(models.Task.id.in_(renumbered))
+            .values(local_id=sql.case(renumbered, value=models.Task.id))
+            .execution_options(synchronize_session=False)
+        )
+
+    for task in doomed:
+        session.expunge(task)
+    for task in kept:
+        sqlorm.attributes.set_committed_value(
+            task, "local_id", renumbered.get(task.id, task.local_id)
+        )
+    sqlorm.attributes.set_committed_value(lst, "tasks", kept)
+
+
+async def check_tasks(guild_id: int, list_name: str, *positions: int) -> ListUpdate:
     """Set tasks as checked."""
     log.debug("got positions: %r", positions)
     if min(positions) < 0:
         raise ValueError(f"Invalid minimum position {min(positions)}. Must be > 0.")
-    async with SESSION() as session:
-        lst: models.TaskList = await models.TaskList.lookup(
-            session, guild_id, list_name
-        )
-        tasks: Sequence[models.Task] = await lst.awaitable_attrs.tasks
+    async with list_txn(guild_id, list_name) as (_session, lst):
+        shown = lst.pages()
+        tasks: Sequence[models.Task] = lst.tasks
         max_pos = len(tasks) - 1
         if max(positions) > max_pos:
             raise ValueError(
@@ -129,46 +460,44 @@ async def check_tasks(guild_id: int, list_name: str, *positions: int) -> str:
         # Invert checked for tasks with pos in positions
         # convert to set to avoid duplicates
         for pos in set(positions):
-            log.debug("inverting %r.checked", tasks[pos])
             tasks[pos].checked = not tasks[pos].checked
-            log.debug("now %r", tasks[pos])
+        log.debug("inverted checked of positions %s in %s", positions, list_name)
 
-        out = lst.pretty_print()
-        log.debug("sess changes %s", session.dirty)
-        await session.commit()
+        out = ListUpdate.diff(lst, shown)
     return out
 
 
 async def get_edit_txt(guild_id: int, list_name: str) -> str:
-    async with SESSION() as session:
-        lst = await models.TaskList.lookup(session, guild_id, list_name)
-        full_txt = lst.encode_tasks()
-        return full_txt
+    lst = await get_list(guild_id, list_name)
+    return lst.encode_tasks()
 
 
-async def put_edit(guild_id: int, list_name: str, full_txt: str) -> str:
-    async with SESSION() as session:
-        tasks = models.Task.decode_many(full_txt)
-        lst = await models.TaskList.lookup(session, guild_id, list_name)
-        lst.tasks = tasks
-        update_msg = lst.pretty_print()
-        await session.commit()
-    return update_msg
+async def put_edit(guild_id: int, list_name: str, full_txt: str) -> ListUpdate:
+    """Replace a list's tasks with those encoded in full_txt.
+
+    Only tasks on lines that changed are updated, inserted, or deleted.
+    """
+    async with list_txn(guild_id, list_name) as (session, lst):
+        shown = lst.pages()
+        for task in lst.apply_edit(full_txt):
+            await session.delete(task)
+        update = ListUpdate.diff(lst, shown)
+    return update
 
 
-async def put_list_edit(guild_id: int, name: str, new_name: str) -> str:
+async def put_list_edit(guild_id: int, name: str, new_name: str) -> ListUpdate:
     """Edit a list name, returning new list text."""
-    async with SESSION() as session:
-        names: Sequence[str] = await models.TaskList.lookup(
-            session, guild_id, attr="name"
-        )
-        if new_name in names:
+    # Also lock new_name, so a list can't be made with it meanwhile
+    async with list_txn(guild_id, name, new_name) as (session, lst):
+        if await is_name_in_guild(session, guild_id, new_name):
             raise ValueError("New name is already used.")
-        lst = await models.TaskList.lookup(session, guild_id, name)
+        shown = lst.pages()
         lst.name = new_name
-        await session.commit()
-        update_msg = lst.pretty_print()
-    return update_msg
+        update = ListUpdate.diff(lst, shown)
+    cache.LISTS.invalidate(guild_id, name)
+    cache.NAMES.remove(guild_id, name)
+    cache.NAMES.add(guild_id, new_name)
+    return update
 
 
 async def is_name_in_guild(
@@ -179,32 +508,107 @@ async def is_name_in_guild(
 
 
 async def get_list_names(ctx: dis.AutocompleteContext) -> list[str]:
+    """Return names of lists in guild matching the value being typed."""
     assert ctx.interaction.guild is not None
     guild_id = ctx.interaction.guild.id
-    async with SESSION() as session:
-        names: list[str] = list(
-            await models.TaskList.lookup(session, guild_id, attr="name")
-        )
-        return names
-
-
-async def del_checked(guild_id: int, name: str) -> str:
-    async with SESSION() as session:
-        lst = await models.TaskList.lookup(session, guild_id, name)
-        lst.tasks = [t for t in lst.tasks if not t.checked]
-
-        lst.renumber()
-        await session.commit()
-        update = lst.pretty_print()
-        return update
+    if not cache.NAMES.loaded(guild_id):
+        cache.NAMES.begin_load(guild_id)
+        await database.WRITES.commit()
+        async with SESSION() as session:
+            names: Sequence[str] = await models.TaskList.lookup(
+                session, guild_id, attr="name"
+            )
+        # Another read may have loaded them, and kept them in sync since
+        if not cache.NAMES.loaded(guild_id):
+            cache.NAMES.load(guild_id, names)
+    return cache.NAMES.search(guild_id, ctx.value or "")
+
+
+async def del_checked(guild_id: int, name: str) -> ListUpdate:
+    async with list_txn(guild_id, name) as (session, lst):
+        shown = lst.pages()
+        checked = [i for i, task in enumerate(lst.tasks) if task.checked]
+        await _delete_positions(session, lst, checked)
+        update = ListUpdate.diff(lst, shown)
+    return update
+
+
+def list_channel(origin: Origin, channel_id: Optional[int]) -> ListChannel:
+    """Return the channel a list's messages are in, without fetching it.
+
+    Lists whose channel isn't known are taken to be in the origin's channel.
+    """
+    if channel_id is None or channel_id == origin.channel_id:
+        channel = origin.channel
+        # Commands aren't used from forum or category channels themselves
+        assert isinstance(channel, ListChannel)
+        return channel
+    client = origin.client if isinstance(origin, dis.Interaction) else origin.bot
+    return client.get_partial_messageable(channel_id)
+
+
+def list_msg(
+    origin: Origin, channel_id: Optional[int], msg_id: int
+) -> cache.MessageHandle:
+    """Return a handle to a list's message, for editing or deleting it.
+
+    Handles are cached and made without fetching the message, so this makes no
+    requests to Discord.
+    """
+    return cache.MESSAGES.get(list_channel(origin, channel_id), msg_id)
+
+
+async def edit_list_msg(origin: Origin, update: ListUpdate) -> None:
+    """Schedule editing a list's messages to show an update.
+
+    Only messages showing pages that changed are edited. Edits are coalesced
+    with other edits of the same message, so this returns before they are
+    published. If the list now spans more or fewer messages, messages are sent
+    or deleted to match.
+    """
+    for page in update.changed:
+        if page < len(update.msg_ids):
+            msg = list_msg(origin, update.channel_id, update.msg_ids[page])
+            edits.EDITS.submit(msg, update.pages[page])
+    if len(update.pages) != len(update.msg_ids):
+        await resize_list_msgs(origin, update.guild_id, update.name)
+
+
+async def resize_list_msgs(origin: Origin, guild_id: int, name: str) -> None:
+    """Send or delete messages so a list has one for each page it has now.
+
+    This re-renders the list under its lock, so updates racing to grow or
+    shrink it don't both send messages for the same pages. New messages are
+    sent between two transactions, so none is held open over the requests.
+    """
+    async with locks.LISTS.hold((guild_id, name)):
+        async with _list_txn(guild_id, name) as (_session, lst):
+            pages = lst.pages()
+            channel_id = lst.channel_id
+            first_new = len(lst.messages) + 1
+        channel = list_channel(origin, channel_id)
+        sent = [
+            await channel.send(pages[page]) for page in range(first_new, len(pages))
+        ]
+        async with _list_txn(guild_id, name) as (_session, lst):
+            msgs = lst.messages
+            msgs.extend(
+                models.ListMessage(page, msg.id)
+                for page, msg in enumerate(sent, start=first_new)
+            )
+            extra = ListMsgs(
+                channel_id, tuple(msg.msg_id for msg in msgs[len(pages) - 1 :])
+            )
+            del msgs[len(pages) - 1 :]
+    await delete_msgs(origin, extra)
 
 
-async def get_list_msg(ctx: dis.ApplicationContext, name: str) -> dis.Message:
-    async with SESSION() as session:
-        id: int = await models.TaskList.lookup(
-            session, ctx.guild_id, name, attr="msg_id"
-        )
-    return await ctx.fetch_message(id)
+async def delete_msgs(origin: Origin, msgs: ListMsgs) -> None:
+    """Delete a list's messages, ignoring any that are already gone."""
+    for msg_id in msgs.msg_ids:
+        with contextlib.suppress(dis.NotFound):
+            await list_msg(origin, msgs.channel_id, msg_id).delete()
+        cache.MESSAGES.invalidate(msg_id)
 
 
-autocomplete_list = autocomplete = dis.utils.basic_autocomplete(get_list_names)
+autocomplete_list = autocomplete = get_list_names
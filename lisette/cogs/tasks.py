@@ -1,6 +1,7 @@
 # Copyright (c) 2023 Amelia Froemming
 # SPDX-License-Identifier: MIT
 """Module with commands for manipulating lists."""
+import io
 import logging
 from typing import Any, Coroutine, NoReturn
 
@@ -9,7 +10,7 @@ import sqlalchemy.exc as sqlexc
 from discord.commands import ApplicationContext
 
 from lisette.cogs import helpers
-from lisette.core import models, ui
+from lisette.core import archive, models, ui
 from lisette.core.bot import Bot
 from lisette.core.database import SESSION
 from lisette.lib import util
@@ -66,10 +67,12 @@ class TasksCog(discord.Cog):
         """Edit all of a list tasks in a pop-up dialog"""
         assert ctx.guild_id is not None
 
-        msg = await helpers.get_list_msg(ctx, name)
         txt = await helpers.get_edit_txt(ctx.guild_id, name)
+        if len(txt) > ui.MODAL_MAX_CHARS:
+            await ui.ephm_respond(ctx, "List is too long to edit in a pop-up :-(")
+            return
 
-        modal = ui.TasksEdit(name, txt, msg, title=f"Edit '{name}'")
+        modal = ui.TasksEdit(name, txt, title=f"Edit '{name}'")
         await ctx.send_modal(modal)
         await ui.ephm_respond(ctx, "All done :-)")
 
@@ -80,8 +83,7 @@ class TasksCog(discord.Cog):
         """Print info about a list and it's tasks."""
         assert ctx.guild_id is not None
 
-        msgs: list[str] = await helpers.get_tasks_info(ctx.guild.id, name)
-        for msg in msgs:
+        async for msg in helpers.get_tasks_info(ctx.guild.id, name):
             await ui.ephm_respond(ctx, msg)
 
     @tasks.command(description="Add a new task to a list")
@@ -95,10 +97,9 @@ class TasksCog(discord.Cog):
         assert ctx.guild_id is not None
         await ctx.defer(ephemeral=True)
 
-        msg = await helpers.get_list_msg(ctx, name)
-        update: str = await helpers.mk_task(ctx.guild_id, name, content)
+        update = await helpers.mk_task(ctx.guild_id, name, content)
 
-        await msg.edit(content=update)
+        await helpers.edit_list_msg(ctx, update)
         await ui.ephm_respond(ctx, "Task added :-)")
 
     @tasks.command(name="del")
@@ -116,12 +117,10 @@ class TasksCog(discord.Cog):
         assert ctx.guild_id is not None
         await ctx.defer(ephemeral=True)
 
-        msg = await helpers.get_list_msg(ctx, name)
         local_ids: list[int] = util.split_int(positions)
         status = await helpers.del_tasks(ctx.guild.id, name, *local_ids)
-        update: str = status[2]
 
-        await msg.edit(content=update)
+        await helpers.edit_list_msg(ctx, status[2])
         await ui.ephm_respond(
             ctx, f"Tasks {status[0]} deleted. Positions {status[1]} ignored :-)"
         )
@@ -141,7 +140,6 @@ class TasksCog(discord.Cog):
         assert ctx.guild_id is not None
         await ctx.defer(ephemeral=True)
 
-        msg = await helpers.get_list_msg(ctx, name)
         # Parse args
         try:
             local_ids: list[int] = util.split_int(positions)
@@ -150,9 +148,9 @@ class TasksCog(discord.Cog):
             return
 
         # Check tasks
-        msg_update: str = await helpers.check_tasks(ctx.guild.id, name, *local_ids)
+        update = await helpers.check_tasks(ctx.guild.id, name, *local_ids)
 
-        await msg.edit(content=msg_update)
+        await helpers.edit_list_msg(ctx, update)
         await ui.ephm_respond(ctx, "List updated :-)")
 
     @tasks.command(
@@ -163,10 +161,8 @@ class TasksCog(discord.Cog):
         assert ctx.guild_id is not None
         await ctx.defer()
 
-        msg = await helpers.get_list_msg(ctx, name)
-
         update = await helpers.del_checked(ctx.guild.id, name)
-        await msg.edit(content=update)
+        await helpers.edit_list_msg(ctx, update)
         await ui.ephm_respond(ctx, "All done :-)")
 
     @lists.command(name="info")
@@ -175,7 +171,7 @@ class TasksCog(discord.Cog):
         """List all lists in this guild."""
         if ctx.guild is None:
             raise TypeError("Couldn't get guild info.")
-        msgs: list[str] = await helpers.get_lists_info(ctx.guild.id, ctx.guild.name)
+        msgs = helpers.get_lists_info(ctx.guild.id, ctx.guild.name)
         await helpers.respond_all(ctx, msgs)
 
     @lists.command(name="new")
@@ -191,7 +187,7 @@ class TasksCog(discord.Cog):
             )
             return
         msg: discord.Message = await ctx.send("Making list...")
-        txt: str = await helpers.mk_list(ctx.guild.id, name, msg.id)
+        txt: str = await helpers.mk_list(ctx.guild.id, name, msg.id, msg.channel.id)
         await msg.edit(content=txt)
         await ui.ephm_respond(ctx, "Made list :-)")
 
@@ -212,21 +208,60 @@ class TasksCog(discord.Cog):
         if not conf:
             return
 
-        try:
-            msg = await helpers.get_list_msg(ctx, name)
-        except discord.NotFound:
-            msg = None
-            cont = await ui.confirm(
-                ctx, "Couldn't get message! Delete from database anyways?"
-            )
-            if not conf:
-                return
+        # Messages that are already gone are skipped
+        msgs = await helpers.del_list(ctx.guild_id, name)
+        await helpers.delete_msgs(ctx, msgs)
+        await ui.ephm_respond(ctx, f"Deleted '{name}'.")
 
-        await helpers.del_list(ctx.guild_id, name)
+    @lists.command(name="export")
+    @discord.guild_only()
+    async def list_export(self, ctx: discord.ApplicationContext) -> None:
+        """Export all lists in this guild to a file."""
+        assert ctx.guild_id is not None
+        await ctx.defer(ephemeral=True)
+        buf = io.BytesIO()
+        async for line in helpers.export_lists(ctx.guild_id):
+            buf.write(line.encode() + b"\n")
+        buf.seek(0)
+        await ctx.respond(
+            "Exported lists :-)",
+            file=discord.File(buf, f"lists-{ctx.guild_id}.jsonl"),
+            ephemeral=True,
+        )
 
-        if msg:
-            await msg.delete()
-        await ui.ephm_respond(ctx, f"Deleted '{name}'.")
+    @lists.command(name="import")
+    @discord.option(
+        "file",
+        discord.Attachment,
+        description="File made by /tasks lists export.",
+    )  # type: ignore
+    @discord.guild_only()
+    async def list_import(
+        self, ctx: discord.ApplicationContext, file: discord.Attachment
+    ) -> None:
+        """Import lists from a file into this guild."""
+        assert ctx.guild_id is not None
+        await ctx.defer(ephemeral=True)
+        try:
+            lists = archive.read((await file.read()).decode().splitlines())
+        except (UnicodeDecodeError, ValueError) as err:
+            await ui.ephm_respond(ctx, f"Couldn't read lists: {err} :-(")
+            return
+        channel = ctx.channel
+        if lists.guild_id != ctx.guild_id and not (
+            isinstance(channel, discord.abc.Messageable)
+            and channel.can_send(discord.Message)
+        ):
+            await ui.ephm_respond(
+                ctx, "Sorry, I can't send messages in this channel :-("
+            )
+            return
+        try:
+            n_lists = await helpers.import_lists(ctx, lists)
+        except ValueError as err:
+            await ui.ephm_respond(ctx, f"{err} :-(")
+            return
+        await ui.ephm_respond(ctx, f"Imported {n_lists} lists :-)")
 
     @lists.command(name="edit")
     @discord.guild_only()
@@ -241,7 +276,6 @@ class TasksCog(discord.Cog):
         self, ctx: discord.ApplicationContext, name: str, new_name: str
     ) -> None:
         assert ctx.guild_id is not None
-        msg = await helpers.get_list_msg(ctx, name)
         try:
             update = await helpers.put_list_edit(ctx.guild_id, name, new_name)
         except ValueError:
@@ -251,5 +285,5 @@ class TasksCog(discord.Cog):
             )
             return
 
-        await msg.edit(content=update)
+        await helpers.edit_list_msg(ctx, update)
         await ctx.respond("Name updated :-)", ephemeral=True)
@@ -1,7 +1,9 @@
+import io
 import logging
 from importlib import metadata
 import discord
 
+from lisette.core import metrics
 from lisette.core.bot import Bot
 
 PKG = "lisette"
@@ -15,7 +17,7 @@ class UtilCog(discord.Cog):
         self.bot = bot_
 
     @discord.slash_command()
-    async def version(self, ctx: discord.ApplicationCommand):
+    async def version(self, ctx: discord.ApplicationContext):
         """Print application version."""
         await ctx.respond(
             f"lisette {metadata.version(PKG)}\n"
@@ -23,3 +25,24 @@ class UtilCog(discord.Cog):
             f"License {metadata.metadata(PKG)['license']}",
             ephemeral=True,
         )
+
+    @discord.slash_command()
+    @discord.default_permissions(administrator=True)
+    @discord.option(
+        "format",
+        str,
+        description="Format to dump metrics in.",
+        choices=["json", "prometheus"],
+        default="json",
+        parameter_name="fmt",
+    )  # type: ignore
+    async def metrics(self, ctx: discord.ApplicationContext, fmt: str) -> None:
+        """Dump per-command latency and database metrics as a file."""
+        if fmt == "prometheus":
+            txt, fname = metrics.REGISTRY.to_prometheus(), "metrics.prom"
+        else:
+            txt, fname = metrics.REGISTRY.to_json(), "metrics.json"
+        await ctx.respond(
+            file=discord.File(io.BytesIO(txt.encode()), filename=fname),
+            ephemeral=True,
+        )
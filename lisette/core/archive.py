@@ -0,0 +1,314 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Export and import of all lists in a guild, as JSON Lines.
+
+An archive is a header line, followed by a line for each list:
+
+    {"lisette_archive":1,"guild_id":1234}
+    {"name":"chores","channel_id":56,"msg_ids":[78],"tasks":["!sweep","-mop"]}
+
+Tasks are lines of the markup in codec, in order. msg_ids are the list's
+messages by page, so a list imported into the same guild keeps them.
+
+Exports stream rows as they are read, and imports insert rows in chunks with
+bulk INSERTs, rather than building ORM objects for every list and task.
+"""
+import collections
+import json
+from typing import (
+    Any,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Self,
+    Sequence,
+)
+
+import sqlalchemy as sql
+import sqlalchemy.ext.asyncio as sqlaio
+
+from lisette.core import codec, models
+
+VERSION = 1
+STREAM_ROWS = 500  # Rows to fetch at a time when exporting
+CHUNK_ROWS = 500  # Rows to insert per statement when importing
+
+
+def _dumps(obj: dict[str, Any]) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _id(val: Any, what: str) -> int:
+    # bool is an int, but never a Discord id
+    if not isinstance(val, int) or isinstance(val, bool):
+        raise ValueError(f"Invalid {what} {val!r}")
+    return val
+
+
+class ListRecord(NamedTuple):
+    """A list as it's archived.
+
+    Attributes:
+        name: Of the list.
+        channel_id: Discord id of the channel the list's messages are in, None
+            if not known.
+        msg_ids: Discord ids of the messages the list is output to, by page.
+        tasks: The list's tasks, each encoded as a line of markup.
+    """
+
+    name: str
+    channel_id: Optional[int]
+    msg_ids: tuple[int, ...]
+    tasks: tuple[str, ...] = ()
+
+    def dumps(self) -> str:
+        """Return this list as a line of an archive."""
+        return _dumps(
+            {
+                "name": self.name,
+                "channel_id": self.channel_id,
+                "msg_ids": self.msg_ids,
+                "tasks": self.tasks,
+            }
+        )
+
+    def pages(self) -> list[str]:
+        """Return this list formatted for display, split into messages."""
+        lines = (models.format_task(*codec.decode(line)) for line in self.tasks)
+        return models.paginate([models.TaskList.NAME_FRMT.format(self.name), *lines])
+
+    @classmethod
+    def loads(cls, line: str) -> Self:
+        """Return list in a line of an archive, checking it would fit in lists.
+
+        Raises:
+            ValueError
+        """
+        obj = json.loads(line)
+        if not isinstance(obj, dict):
+            raise ValueError("List is not a JSON object")
+        name = obj.get("name")
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"Invalid list name {name!r}")
+        if len(name) > models.LIST_NAME_MAX:
+            raise ValueError(f"Name of list '{name}' is too long")
+        channel_id = obj.get("channel_id")
+        if channel_id is not None:
+            channel_id = _id(channel_id, "channel id")
+        msg_ids = obj.get("msg_ids")
+        if not isinstance(msg_ids, list) or not msg_ids:
+            raise ValueError(f"List '{name}' has no messages")
+        tasks = obj.get("tasks", [])
+        if not isinstance(tasks, list) or not all(isinstance(t, str) for t in tasks):
+            raise ValueError(f"Invalid tasks in list '{name}'")
+
+        length = len(models.TaskList.NAME_FRMT.format(name))
+        for line_ in tasks:
+            content, _checked, indents = codec.decode(line_)
+            # As Task.__len__, the length of the task when checked
+            task_length = len(models.format_task(content, True, indents))
+            if task_length > models.DISCORD_MAX_CHARS:
+                raise ValueError(f"Task in list '{name}' is too long for a message")
+            length += task_length
+        if length > models.LIST_MAX_CHARS:
+            raise ValueError(f"List '{name}' is too long")
+        return cls(
+            name,
+            channel_id,
+            tuple(_id(msg_id, "message id") for msg_id in msg_ids),
+            tuple(tasks),
+        )
+
+
+class Archive(NamedTuple):
+    """Lists read from an archive.
+
+    Attributes:
+        guild_id: Discord id of the guild the lists were exported from.
+        lists: The lists.
+    """
+
+    guild_id: int
+    lists: list[ListRecord]
+
+
+def read(lines: Iterable[str]) -> Archive:
+    """Return lists in the lines of an archive.
+
+    Raises:
+        ValueError: If the archive isn't one, or a list in it is invalid.
+    """
+    it = iter(lines)
+    try:
+        header = json.loads(next(it))
+    except (StopIteration, ValueError) as err:
+        raise ValueError("Not a list archive") from err
+    if not isinstance(header, dict) or "lisette_archive" not in header:
+        raise ValueError("Not a list archive")
+    if header["lisette_archive"] != VERSION:
+        raise ValueError(f"Unsupported archive version {header['lisette_archive']}")
+    guild_id = _id(header.get("guild_id"), "guild id")
+    lists: list[ListRecord] = []
+    for n, line in enumerate(it, start=2):
+        if not line.strip():
+            continue
+        try:
+            lists.append(ListRecord.loads(line))
+        except ValueError as err:
+            raise ValueError(f"Line {n}: {err}") from err
+    return Archive(guild_id, lists)
+
+
+async def export_guild(
+    session: sqlaio.AsyncSession, guild_id: int
+) -> AsyncIterator[str]:
+    """Yield the lines of an archive of a guild's lists, as rows are read."""
+    TaskList, Task, ListMessage = models.TaskList, models.Task, models.ListMessage
+    yield _dumps({"lisette_archive": VERSION, "guild_id": guild_id})
+
+    # Few lists span more than one message, so these are read up front
+    extra_msgs: dict[int, list[int]] = collections.defaultdict(list)
+    pages = await session.execute(
+        sql.select(ListMessage.list_id, ListMessage.msg_id)
+        .join(TaskList, TaskList.id == ListMessage.list_id)
+        .where(TaskList.guild_id == guild_id)
+        .order_by(ListMessage.list_id, ListMessage.page)
+    )
+    for list_id, msg_id in pages:
+        extra_msgs[list_id].append(msg_id)
+
+    stmt = (
+        sql.select(
+            TaskList.id,
+            TaskList.name,
+            TaskList.channel_id,
+            TaskList.msg_id,
+            Task.content,
+            Task.checked,
+            Task.indents,
+        )
+        .outerjoin(Task, Task.parent_list_id == TaskList.id)
+        .where(TaskList.guild_id == guild_id)
+        .order_by(TaskList.name, Task.local_id)
+        .execution_options(yield_per=STREAM_ROWS)
+    )
+    current: Optional[ListRecord] = None
+    current_id = None
+    tasks: list[str] = []
+    result = await session.stream(stmt)
+    async for rows in result.partitions():
+        for list_id, name, channel_id, msg_id, content, checked, indents in rows:
+            if list_id != current_id:
+                if current is not None:
+                    yield current._replace(tasks=tuple(tasks)).dumps()
+                current_id = list_id
+                msg_ids = (msg_id, *extra_msgs.get(list_id, ()))
+                current = ListRecord(name, channel_id, msg_ids)
+                tasks = []
+            # A list without tasks is one row of NULL task columns
+            if content is not None:
+                tasks.append(codec.encode(content, checked, indents))
+    if current is not None:
+        yield current._replace(tasks=tuple(tasks)).dumps()
+
+
+def _chunks(
+    rows: Sequence[dict[str, Any]], size: int
+) -> Iterator[Sequence[dict[str, Any]]]:
+    for i in range(0, len(rows), size):
+        yield rows[i : i + size]
+
+
+async def check_names(
+    session: sqlaio.AsyncSession, guild_id: int, lists: Sequence[ListRecord]
+) -> None:
+    """Check lists can be added to a guild without their names clashing.
+
+    Raises:
+        ValueError: If a list's name is already used in the guild, or by
+            another of the lists.
+    """
+    names = collections.Counter(lst.name for lst in lists)
+    taken: Sequence[str] = await models.TaskList.lookup(session, guild_id, attr="name")
+    clashes = {name for name, n in names.items() if n > 1}
+    clashes.update(name for name in taken if name in names)
+    if clashes:
+        raise ValueError(f"List names already used: {', '.join(sorted(clashes))}")
+
+
+async def _insert_lists(
+    session: sqlaio.AsyncSession,
+    guild_id: int,
+    rows: Sequence[dict[str, Any]],
+    chunk_rows: int,
+) -> list[int]:
+    """Insert lists, returning their ids in order."""
+    TaskList = models.TaskList
+    list_ids: list[int] = []
+    conn = await session.connection()
+    if conn.dialect.insert_executemany_returning_sort_by_parameter_order:
+        stmt = sql.insert(TaskList).returning(TaskList.id, sort_by_parameter_order=True)
+        for chunk in _chunks(rows, chunk_rows):
+            list_ids.extend((await session.scalars(stmt, chunk)).all())
+        return list_ids
+
+    # eg. MySQL can't return ids from a multi-row INSERT, so they're read after
+    for chunk in _chunks(rows, chunk_rows):
+        await session.execute(sql.insert(TaskList), chunk)
+    ids: dict[str, int] = {}
+    for chunk in _chunks(rows, chunk_rows):
+        result = await session.execute(
+            sql.select(TaskList.name, TaskList.id)
+            .where(TaskList.guild_id == guild_id)
+            .where(TaskList.name.in_([row["name"] for row in chunk]))
+        )
+        ids.update(result.tuples().all())
+    return [ids[row["name"]] for row in rows]
+
+
+async def import_guild(
+    session: sqlaio.AsyncSession,
+    guild_id: int,
+    lists: Sequence[ListRecord],
+    chunk_rows: int = CHUNK_ROWS,
+) -> None:
+    """Add lists to a guild, with a few bulk INSERTs per chunk_rows rows.
+
+    Raises:
+        ValueError: As check_names.
+    """
+    await check_names(session, guild_id, lists)
+
+    list_rows = [
+        {
+            "name": lst.name,
+            "guild_id": guild_id,
+            "msg_id": lst.msg_ids[0],
+            "channel_id": lst.channel_id,
+        }
+        for lst in lists
+    ]
+    list_ids = await _insert_lists(session, guild_id, list_rows, chunk_rows)
+
+    task_rows: list[dict[str, Any]] = []
+    msg_rows: list[dict[str, Any]] = []
+    for list_id, lst in zip(list_ids, lists):
+        for local_id, line in enumerate(lst.tasks):
+            content, checked, indents = codec.decode(line)
+            task_rows.append(
+                {
+                    "parent_list_id": list_id,
+                    "local_id": local_id,
+                    "content": content,
+                    "checked": checked,
+                    "indents": indents,
+                }
+            )
+        for page, msg_id in enumerate(lst.msg_ids[1:], start=1):
+            msg_rows.append({"list_id": list_id, "page": page, "msg_id": msg_id})
+    for chunk in _chunks(task_rows, chunk_rows):
+        await session.execute(sql.insert(models.Task), chunk)
+    for chunk in _chunks(msg_rows, chunk_rows):
+        await session.execute(sql.insert(models.ListMessage), chunk)
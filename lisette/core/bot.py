@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 # Copyright (c) 2023 Amelia Froemming
 # SPDX-License-Identifier: MIT
-"""Module contains subclass definition for pycord Bot"""
+"""Module contains subclass definitions for pycord Bot"""
 import asyncio
 import logging
-from typing import Any
+from typing import Any, Optional
 
 import discord
+import discord.webhook.async_
+
+from lisette.core import edits, metrics
 
 log = logging.getLogger(__name__)
 
@@ -15,12 +18,26 @@ class Bot(discord.Bot):
     """pycord.Bot subclass for lisette"""
 
     def __init__(self, *args: Any, **options: Any) -> None:
-        discord.Bot.__init__(self, *args, **options)  # type: ignore
+        super().__init__(*args, **options)  # type: ignore
+        # Interaction responses go through the webhook adapter, the rest http.
+        metrics.instrument_requests(self.http)
+        metrics.instrument_requests(discord.webhook.async_.async_context.get())
+
+    async def invoke_application_command(self, ctx: discord.ApplicationContext) -> None:
+        """Invoke a command, recording its metrics."""
+        # Unset if the command used is one this bot no longer has
+        name = ctx.command.qualified_name if ctx.command is not None else "unknown"
+        async with metrics.REGISTRY.measure(name) as sample:
+            await super().invoke_application_command(ctx)
+            # Errors are handled by dispatching them, not raised
+            sample.failed = getattr(ctx, "command_failed", False)
 
     async def begin(self, token: str) -> None:
         try:
             await self.start(token)
         except asyncio.CancelledError:
+            log.info("Publishing pending message edits.")
+            await edits.EDITS.flush()
             log.info("Closing bot task.")
             await self.close()
             raise
@@ -34,3 +51,53 @@ class Bot(discord.Bot):
         log.info(self.user.name)
         log.info(self.user.id)
         log.info("------")
+
+
+class ShardedBot(Bot, discord.AutoShardedBot):
+    """Bot that runs several gateway shards in one process.
+
+    Each guild's events all arrive on the shard that owns it, so running only
+    some shards in a process (see shard_ids) keeps per guild caches coherent.
+    """
+
+    @property
+    def _bot(self) -> "ShardedBot":
+        # Both bases define this, each returning its own type
+        return self
+
+    async def on_shard_ready(self, shard_id: int) -> None:
+        log.info("Shard %s ready.", shard_id)
+
+
+def make_bot(
+    shard_count: Optional[int] = None, shard_ids: Optional[list[int]] = None
+) -> Bot:
+    """Return a bot, sharded if shard_count or shard_ids is given.
+
+    Arguments:
+        shard_count: Total number of shards. 0 lets Discord recommend a count.
+        shard_ids: Shards for this bot to run, all of them if None.
+    """
+    if shard_count is None and shard_ids is None:
+        return Bot()
+    return ShardedBot(shard_count=shard_count or None, shard_ids=shard_ids)
+
+
+def shard_ranges(shard_count: int, n_workers: int) -> list[list[int]]:
+    """Split shard ids 0 to shard_count into contiguous ranges for n_workers.
+
+    Raises:
+        ValueError
+    """
+    if not 0 < n_workers <= shard_count:
+        raise ValueError(
+            f"Can't split {shard_count} shards between {n_workers} workers"
+        )
+    size, extra = divmod(shard_count, n_workers)
+    ranges: list[list[int]] = []
+    start = 0
+    for i in range(n_workers):
+        stop = start + size + (i < extra)
+        ranges.append(list(range(start, stop)))
+        start = stop
+    return ranges
@@ -0,0 +1,267 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""In-memory caches sitting in front of the database"""
+import bisect
+import collections
+import logging
+from typing import Iterable, Optional, Protocol
+
+import discord
+
+from lisette.core import views
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 4 * 1024 * 1024  # bytes
+MAX_CHOICES = 25  # Most autocomplete choices Discord will show
+DEFAULT_MAX_MESSAGES = 1024
+# Rough per-object costs used to estimate the memory used by an entry.
+LIST_OVERHEAD = 512
+TASK_OVERHEAD = 256
+
+Key = tuple[int, str]
+
+
+def entry_size(lst: views.ListView) -> int:
+    """Return an estimate of the memory, in bytes, held by a cached list."""
+    size = LIST_OVERHEAD + len(lst.name)
+    for task in lst.tasks:
+        size += TASK_OVERHEAD + len(task.content)
+    return size
+
+
+class ListCache:
+    """Write-through LRU cache of loaded task lists.
+
+    Entries are keyed by (guild_id, name) and hold immutable ListViews. Helpers
+    that change a list do so in their own session, then put a view of the
+    committed list back or invalidate its entry.
+
+    Args:
+        max_size: Approximate memory cap in bytes. Least recently used entries
+            are evicted to stay under it.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self.max_size = max_size
+        self.size = 0
+        self._entries: collections.OrderedDict[
+            Key, tuple[views.ListView, int]
+        ] = collections.OrderedDict()
+
+    def get(self, guild_id: int, name: str) -> Optional[views.ListView]:
+        """Return cached list or None if not cached."""
+        key = (guild_id, name)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, lst: views.ListView) -> None:
+        """Cache a list, replacing any entry under the same key."""
+        key = (lst.guild_id, lst.name)
+        self._pop(key)
+        size = entry_size(lst)
+        if size > self.max_size:
+            log.debug("not caching %s, too large (%s bytes)", key, size)
+            return
+        self._entries[key] = (lst, size)
+        self.size += size
+        self._evict()
+
+    def invalidate(self, guild_id: int, name: str) -> None:
+        """Drop entry for a list, if any."""
+        self._pop((guild_id, name))
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+        self.size = 0
+
+    def resize(self, max_size: int) -> None:
+        """Set a new memory cap, evicting entries as needed."""
+        self.max_size = max_size
+        self._evict()
+
+    def _pop(self, key: Key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def _evict(self) -> None:
+        while self.size > self.max_size:
+            key, (_lst, size) = self._entries.popitem(last=False)
+            self.size -= size
+            log.debug("evicted %s from list cache", key)
+
+    def __contains__(self, key: Key) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class NameIndex:
+    """Per-guild sorted index of list names, for autocomplete.
+
+    A guild's names are loaded once, then kept in sync by the helpers that make,
+    delete, or rename lists. Matching is case insensitive.
+    """
+
+    def __init__(self) -> None:
+        # Sorted (folded name, name) pairs for each loaded guild
+        self._guilds: dict[int, list[tuple[str, str]]] = {}
+        # Names added (True) or removed (False) while a guild's are being read
+        self._changes: dict[int, list[tuple[bool, str]]] = {}
+
+    def loaded(self, guild_id: int) -> bool:
+        """Return whether names for a guild are loaded."""
+        return guild_id in self._guilds
+
+    def begin_load(self, guild_id: int) -> None:
+        """Start recording changes to a guild's names, before reading them.
+
+        Names changed while they're read are then changed in those passed to
+        load, which may have been read before or after the change.
+        """
+        self._changes.setdefault(guild_id, [])
+
+    def load(self, guild_id: int, names: Iterable[str]) -> None:
+        """Set all names in a guild, with any changes since begin_load."""
+        entries = sorted((name.casefold(), name) for name in names)
+        self._guilds[guild_id] = entries
+        for added, name in self._changes.pop(guild_id, ()):
+            if added:
+                self._add(entries, name)
+            else:
+                self._remove(entries, name)
+
+    def add(self, guild_id: int, name: str) -> None:
+        """Add a name to a guild, if its names are loaded or being read."""
+        entries = self._guilds.get(guild_id)
+        if entries is not None:
+            self._add(entries, name)
+        elif guild_id in self._changes:
+            self._changes[guild_id].append((True, name))
+
+    def remove(self, guild_id: int, name: str) -> None:
+        """Remove a name from a guild, if its names are loaded or being read."""
+        entries = self._guilds.get(guild_id)
+        if entries is not None:
+            self._remove(entries, name)
+        elif guild_id in self._changes:
+            self._changes[guild_id].append((False, name))
+
+    @staticmethod
+    def _add(entries: list[tuple[str, str]], name: str) -> None:
+        entry = (name.casefold(), name)
+        i = bisect.bisect_left(entries, entry)
+        if i == len(entries) or entries[i] != entry:
+            entries.insert(i, entry)
+
+    @staticmethod
+    def _remove(entries: list[tuple[str, str]], name: str) -> None:
+        entry = (name.casefold(), name)
+        i = bisect.bisect_left(entries, entry)
+        if i < len(entries) and entries[i] == entry:
+            del entries[i]
+
+    def search(self, guild_id: int, query: str, limit: int = MAX_CHOICES) -> list[str]:
+        """Return up to limit names in a guild matching query.
+
+        Names starting with query come first, in order, followed by names that
+        contain it elsewhere.
+        """
+        entries = self._guilds.get(guild_id, [])
+        key = query.casefold()
+        out: list[str] = []
+        i = bisect.bisect_left(entries, (key,))
+        while i < len(entries) and len(out) < limit:
+            folded, name = entries[i]
+            if not folded.startswith(key):
+                break
+            out.append(name)
+            i += 1
+        if len(out) < limit and key:
+            for folded, name in entries:
+                if key in folded and not folded.startswith(key):
+                    out.append(name)
+                    if len(out) >= limit:
+                        break
+        return out
+
+    def clear(self) -> None:
+        """Drop all guilds."""
+        self._guilds.clear()
+        self._changes.clear()
+
+
+class MessageHandle(Protocol):
+    """A message that can be used without fetching it, eg. discord.PartialMessage"""
+
+    id: int
+
+    async def edit(self, *, content: Optional[str] = ...) -> object:
+        ...
+
+    async def delete(self) -> None:
+        ...
+
+    async def fetch(self) -> discord.Message:
+        ...
+
+
+class MessageChannel(Protocol):
+    """A channel messages can be got from without fetching them"""
+
+    def get_partial_message(self, message_id: int, /) -> MessageHandle:
+        ...
+
+
+class MessageCache:
+    """LRU cache of handles to list messages, keyed by message id.
+
+    Handles are eg. PartialMessages, made from the channel without fetching the
+    message, so editing or deleting a list message takes only that request.
+
+    Args:
+        max_entries: Most handles to keep.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_MESSAGES) -> None:
+        self.max_entries = max_entries
+        self._entries: collections.OrderedDict[
+            int, MessageHandle
+        ] = collections.OrderedDict()
+
+    def get(self, channel: MessageChannel, msg_id: int) -> MessageHandle:
+        """Return handle to a message in channel, making one if not cached."""
+        msg = self._entries.get(msg_id)
+        if msg is not None:
+            self._entries.move_to_end(msg_id)
+            return msg
+        msg = channel.get_partial_message(msg_id)
+        self._entries[msg_id] = msg
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return msg
+
+    def invalidate(self, msg_id: int) -> None:
+        """Drop handle to a message, if any."""
+        self._entries.pop(msg_id, None)
+
+    def clear(self) -> None:
+        """Drop all handles."""
+        self._entries.clear()
+
+    def __contains__(self, msg_id: int) -> bool:
+        return msg_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+LISTS = ListCache()
+NAMES = NameIndex()
+MESSAGES = MessageCache()
@@ -0,0 +1,56 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Encoding of tasks as lines of markup text, for editing lists in bulk.
+
+A task is encoded as a prefix of meta chars followed by its content: CHECKED_CHAR
+if it's checked, then INDENT_CHAR once per indent, then META_END_CHAR if the
+content starts with a char that would otherwise be read as part of the prefix.
+
+Decoding returns plain tuples of task fields, so a large edit can be compared
+with a list before any Task objects are made for the lines that changed.
+"""
+from typing import NamedTuple
+
+CHECKED_CHAR = "!"
+INDENT_CHAR = "-"
+META_END_CHAR = "\\"
+META_CHARS = (CHECKED_CHAR, INDENT_CHAR)
+
+_PREFIX_CHARS = "".join(META_CHARS)
+# Content starting with these needs META_END_CHAR before it
+_ESCAPED = frozenset((*META_CHARS, META_END_CHAR))
+
+
+class TaskFields(NamedTuple):
+    """Fields of a task encoded in a line."""
+
+    content: str
+    checked: bool = False
+    indents: int = 0
+
+
+def encode(content: str, checked: bool = False, indents: int = 0) -> str:
+    """Return task fields as a line of markup text."""
+    prefix = CHECKED_CHAR if checked else ""
+    if indents > 0:
+        prefix += INDENT_CHAR * indents
+    if content[:1] in _ESCAPED:
+        prefix += META_END_CHAR
+    return prefix + content
+
+
+def decode(line: str) -> TaskFields:
+    """Return task fields encoded in a line of markup text."""
+    content = line.lstrip(_PREFIX_CHARS)
+    n_meta = len(line) - len(content)
+    if content[:1] == META_END_CHAR:
+        content = content[1:]
+    if not n_meta:
+        return TaskFields(content)
+    meta = line[:n_meta]
+    return TaskFields(content, CHECKED_CHAR in meta, meta.count(INDENT_CHAR))
+
+
+def decode_many(txt: str) -> list[TaskFields]:
+    """Return fields of the tasks encoded in txt, one per line."""
+    return list(map(decode, txt.splitlines()))
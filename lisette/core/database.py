@@ -1,11 +1,16 @@
 # Copyright (c) 2023 Amelia Froemming
 # SPDX-License-Identifier: MIT
 """Provides database setup and access helper functions"""
+import asyncio
+import contextlib
 import logging
+from typing import Any, AsyncIterator, Optional
 
+import sqlalchemy as sql
 import sqlalchemy.ext.asyncio as sqlaio
 
-from lisette.core import models
+from lisette.core import cache, metrics, models
+from lisette.lib import config
 
 log = logging.getLogger(__name__)
 
@@ -14,21 +19,282 @@ SESSION: sqlaio.async_sessionmaker[sqlaio.AsyncSession] = sqlaio.async_sessionma
 )
 ENGINE: sqlaio.AsyncEngine | None = None
 
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+# Async drivers to use for URLs that only name a database backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+    "mariadb": "mariadb+aiomysql",
+}
+# Map of option names to initalize keyword arguments
+ENGINE_OPTIONS = {
+    "db_pool_size": "pool_size",
+    "db_max_overflow": "max_overflow",
+    "db_pool_recycle": "pool_recycle",
+    "db_wal": "wal",
+    "db_synchronous": "synchronous",
+    "db_busy_timeout": "busy_timeout",
+    "db_mmap_size": "mmap_size",
+    "db_cache_size": "cache_size",
+}
 
-async def initalize(path: str, debug: bool = False) -> sqlaio.AsyncEngine:
-    """Make connection manager to database at a path.
 
-    Path is of the style ('/path'), that is, prefixed with a /.
+class WriteBehind:
+    """Group commits writes, taking commits off the path of each command.
+
+    While running, units of work share one connection and session. Each unit
+    runs in a savepoint, so if it fails only its own changes are rolled back.
+    Its changes are flushed when it exits, where they're seen by later units
+    but not by other sessions, and committed together with those of other
+    units once interval seconds have passed since the first of them.
+
+    Writes made in the last interval before a crash can be lost. Anything
+    pending is committed when run is cancelled, ie. on shutdown.
+
+    This only batches writes to SQLite, which commits one transaction at a
+    time anyway. Database servers commit concurrent transactions from their
+    own connections, which sharing one would make wait on each other.
+    """
+
+    def __init__(self) -> None:
+        self.interval = 0.0
+        self._conn: Optional[sqlaio.AsyncConnection] = None
+        self._session: Optional[sqlaio.AsyncSession] = None
+        self._lock = asyncio.Lock()
+        self._pending = asyncio.Event()
+        self._in_batch = False
+
+    @property
+    def running(self) -> bool:
+        return self._session is not None
+
+    async def start(self, interval: float) -> None:
+        """Start batching units of work, to be committed every interval."""
+        if ENGINE is None:
+            raise RuntimeError("Database is not initalized")
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._pending = asyncio.Event()
+        if ENGINE.dialect.name != "sqlite":
+            log.info("Not group committing writes, database isn't SQLite")
+            return
+        await self._open()
+        log.info("Group committing writes every %s s", interval)
+
+    async def run(self, interval: float) -> None:
+        """Start, then commit batches of writes until cancelled."""
+        await self.start(interval)
+        try:
+            while True:
+                await self._pending.wait()
+                await asyncio.sleep(self.interval)
+                # Being cancelled mid commit mustn't drop the batch
+                await asyncio.shield(self.commit())
+        finally:
+            await self.stop()
+
+    @contextlib.asynccontextmanager
+    async def session(self) -> AsyncIterator[sqlaio.AsyncSession]:
+        """Hold the shared session for a unit of work.
+
+        Raises:
+            RuntimeError: If not running.
+        """
+        if not self.running:
+            raise RuntimeError("Write-behind is not running")
+        async with self._lock:
+            if self._session is None or self._conn is None:
+                # Stopped while waiting, so this unit commits by itself
+                async with SESSION() as session, session.begin():
+                    yield session
+                return
+            try:
+                if not self._in_batch:
+                    await self._conn.exec_driver_sql("BEGIN IMMEDIATE")
+                    self._in_batch = True
+                async with self._session.begin_nested():
+                    yield self._session
+            except BaseException:
+                # Cancelling a query invalidates its connection, and with it
+                # the whole batch
+                if self._conn.invalidated:
+                    log.error("Unit of work interrupted, pending writes are lost")
+                    await self._reset()
+                elif not self._pending.is_set():
+                    # The batch is empty, so end it rather than hold the lock
+                    # on the database until another unit succeeds
+                    await self._commit()
+                raise
+            self._pending.set()
+
+    async def commit(self) -> None:
+        """Commit pending writes now, if there are any."""
+        async with self._lock:
+            await self._commit()
+
+    async def stop(self) -> None:
+        """Commit pending writes and stop batching."""
+        if not self.running:
+            return
+        async with self._lock:
+            await self._commit()
+            await self._close()
+        log.info("Stopped group committing writes")
+
+    async def _commit(self) -> None:
+        if not self._in_batch:
+            return
+        assert self._session is not None and self._conn is not None
+        self._pending.clear()
+        try:
+            await self._session.commit()
+            await self._conn.exec_driver_sql("COMMIT")
+            await self._conn.commit()
+        except Exception:
+            log.exception("Couldn't commit batch, its writes are lost")
+            await self._reset()
+        self._in_batch = False
+
+    async def _open(self) -> None:
+        assert ENGINE is not None
+        # Transactions are begun and committed explicitly, as SQLite drivers
+        # otherwise commit each outermost savepoint as it's released.
+        conn = await ENGINE.connect()
+        self._conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        self._session = SESSION(bind=self._conn)
+
+    async def _close(self) -> None:
+        """Close the connection, rolling back anything uncommitted."""
+        if self._session is not None:
+            await self._session.close()
+        if self._conn is not None:
+            with contextlib.suppress(sql.exc.SQLAlchemyError):
+                await self._conn.close()
+        self._session = self._conn = None
+        self._in_batch = False
+
+    async def _reset(self) -> None:
+        """Replace the connection, dropping the current batch."""
+        await self._close()
+        await self._open()
+        # Cached lists may show writes from the batch
+        cache.LISTS.clear()
+        cache.NAMES.clear()
+
+
+WRITES = WriteBehind()
+
+
+def make_url(url: str) -> sql.URL:
+    """Return an async SQLAlchemy URL from a URL or SQLite path.
+
+    A str without a scheme is taken to be a path to a SQLite database, of the
+    style ('/path'), that is, prefixed with a /. An empty str is an in memory
+    SQLite database. URLs without a driver get the default async one for their
+    backend, eg. 'postgresql://...' uses asyncpg.
+
+    Raises:
+        sqlalchemy.exc.ArgumentError
+    """
+    if "://" not in url:
+        url = "".join(("sqlite+aiosqlite://", url))
+    sql_url = sql.make_url(url)
+    if sql_url.drivername in ASYNC_DRIVERS:
+        sql_url = sql_url.set(drivername=ASYNC_DRIVERS[sql_url.drivername])
+    return sql_url
+
+
+async def initalize(
+    url: str,
+    debug: bool = False,
+    *,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_recycle: int = 3600,
+    wal: bool = True,
+    synchronous: str = "NORMAL",
+    busy_timeout: int = 5000,
+    mmap_size: int = 0,
+    cache_size: int = 2000,
+) -> sqlaio.AsyncEngine:
+    """Make connection manager to database at a URL.
+
+    Arguments:
+        url: SQLAlchemy URL or SQLite path, as accepted by make_url.
+        debug: Whether to log all SQL statements.
+        pool_size: Number of connections to keep open (not in memory SQLite).
+        max_overflow: Connections to open past pool_size under load (not SQLite).
+        pool_recycle: Seconds after which to replace a connection (not SQLite).
+        wal: Whether to use write-ahead logging instead of a rollback journal.
+        synchronous: SQLite synchronous level, one of SYNCHRONOUS_LEVELS.
+        busy_timeout: Milliseconds to wait for a lock held by another
+            connection before failing.
+        mmap_size: Bytes of the database file to memory map.
+        cache_size: KiB of page cache per connection.
+
+    Options after pool_recycle only apply to SQLite.
+
+    Raises:
+        ValueError
+        sqlalchemy.exc.ArgumentError
     """
     if debug:
         sql_log = logging.getLogger("sqlalchemy.engine")
         sql_log.setLevel(logging.DEBUG)
-    url = "".join(("sqlite+aiosqlite://", path))
+    sql_url = make_url(url)
+    engine_args: dict[str, Any] = {}
+    pragmas: dict[str, Any] = {}
+    if sql_url.get_backend_name() == "sqlite":
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Invalid synchronous level {synchronous}")
+        pragmas = {
+            "journal_mode": "WAL" if wal else "DELETE",
+            "synchronous": synchronous,
+            "busy_timeout": busy_timeout,
+            "mmap_size": mmap_size,
+            "cache_size": -cache_size,  # Negative values are in KiB
+        }
+        if sql_url.database:
+            # In memory databases use a single static connection.
+            engine_args["pool_size"] = pool_size
+    else:
+        engine_args["pool_size"] = pool_size
+        engine_args["max_overflow"] = max_overflow
+        engine_args["pool_recycle"] = pool_recycle
+        # Server connections can be dropped while idle in the pool
+        engine_args["pool_pre_ping"] = True
+
     global ENGINE  # pylint: disable=global-statement
-    ENGINE = sqlaio.create_async_engine(url)
+    ENGINE = sqlaio.create_async_engine(sql_url, **engine_args)
+    if pragmas:
+        sql.event.listen(
+            ENGINE.sync_engine,
+            "connect",
+            lambda conn, _rec: _set_pragmas(conn, pragmas),
+        )
+    metrics.instrument_engine(ENGINE)
     SESSION.configure(bind=ENGINE)
+    # Anything cached came from a different database.
+    cache.LISTS.clear()
+    cache.NAMES.clear()
 
     async with ENGINE.begin() as conn:
         await conn.run_sync(models.Base.metadata.create_all)
 
     return ENGINE
+
+
+def _set_pragmas(dbapi_conn: Any, pragmas: dict[str, Any]) -> None:
+    """Apply pragmas to a new SQLite connection."""
+    cursor = dbapi_conn.cursor()
+    for name, val in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={val}")
+    cursor.close()
+    log.debug("set pragmas %s", pragmas)
+
+
+def engine_options(cfg: config.Cfg) -> dict[str, Any]:
+    """Return initalize keyword arguments for engine options set in cfg."""
+    return {arg: cfg.get(name) for name, arg in ENGINE_OPTIONS.items() if name in cfg}
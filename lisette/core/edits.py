@@ -0,0 +1,78 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Provides coalescing of Discord message edits"""
+import asyncio
+import logging
+from typing import Optional, Protocol
+
+import discord
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DELAY = 1.0  # seconds
+
+
+class Editable(Protocol):
+    """A message that can be edited, eg. discord.Message"""
+
+    id: int
+
+    async def edit(self, *, content: Optional[str] = ...) -> object:
+        ...
+
+
+class EditCoalescer:
+    """Coalesces edits of the same message made within a short window.
+
+    The first edit submitted for a message starts a timer; edits submitted for
+    it before the timer runs out replace the pending content. When it runs out,
+    the message is edited once with the latest content.
+
+    Args:
+        delay: Seconds to wait before publishing an edit.
+    """
+
+    def __init__(self, delay: float = DEFAULT_DELAY) -> None:
+        self.delay = delay
+        self._pending: dict[int, tuple[Editable, str]] = {}
+        self._tasks: dict[int, asyncio.Task[None]] = {}
+        self._flushing = asyncio.Event()
+
+    def submit(self, msg: Editable, content: str) -> None:
+        """Schedule editing msg to show content, returning immediately."""
+        self._pending[msg.id] = (msg, content)
+        if msg.id not in self._tasks:
+            task = asyncio.create_task(self._publish(msg.id))
+            self._tasks[msg.id] = task
+
+    async def flush(self) -> None:
+        """Publish all pending edits now."""
+        self._flushing.set()
+        try:
+            while self._tasks:
+                await asyncio.gather(*self._tasks.values())
+        finally:
+            self._flushing.clear()
+
+    async def _publish(self, msg_id: int) -> None:
+        try:
+            await asyncio.wait_for(self._flushing.wait(), self.delay)
+        except TimeoutError:
+            pass
+        # Edits submitted from here on get a new timer
+        del self._tasks[msg_id]
+        msg, content = self._pending.pop(msg_id)
+        await self._edit(msg, content)
+
+    @staticmethod
+    async def _edit(msg: Editable, content: str) -> None:
+        try:
+            await msg.edit(content=content)
+        except discord.HTTPException as err:
+            log.warning("Couldn't edit message %s: %s", msg.id, err)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+EDITS = EditCoalescer()
@@ -0,0 +1,48 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Provides per-list locks serializing changes to the same list"""
+import asyncio
+import contextlib
+import weakref
+from typing import AsyncIterator, Hashable
+
+
+class KeyedLocks:
+    """Async locks made on demand for each key.
+
+    A key's lock is kept only while something references it, ie. while it is
+    held or waited on, so keys don't accumulate.
+    """
+
+    def __init__(self) -> None:
+        self._locks: weakref.WeakValueDictionary[
+            Hashable, asyncio.Lock
+        ] = weakref.WeakValueDictionary()
+
+    def get(self, key: Hashable) -> asyncio.Lock:
+        """Return the lock for key."""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    @contextlib.asynccontextmanager
+    async def hold(self, *keys: Hashable) -> AsyncIterator[None]:
+        """Hold the locks for keys for the duration of the block.
+
+        Locks are acquired in sorted order, so blocks holding overlapping sets
+        of keys can't deadlock.
+        """
+        async with contextlib.AsyncExitStack() as stack:
+            for key in sorted(set(keys)):  # type: ignore[type-var]
+                await stack.enter_async_context(self.get(key))
+            yield
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+# Keyed by (guild_id, list name). Locks are per process; each guild is only
+# handled by the process running its shard.
+LISTS = KeyedLocks()
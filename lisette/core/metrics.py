@@ -0,0 +1,205 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""In-process metrics of application command performance.
+
+Each command invocation is measured as a Sample, held in a context variable
+so that SQL statements and Discord API requests made while it runs are
+attributed to it. Samples are aggregated per command in a Registry, which can
+be dumped as JSON or Prometheus text.
+"""
+import bisect
+import contextlib
+import contextvars
+import dataclasses
+import functools
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+import sqlalchemy as sql
+import sqlalchemy.ext.asyncio as sqlaio
+
+log = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of command wall time histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "lisette_command"
+
+
+@dataclasses.dataclass
+class Sample:
+    """Measurements of a single command invocation."""
+
+    statements: int = 0
+    db_seconds: float = 0.0
+    api_requests: int = 0
+    api_seconds: float = 0.0
+    failed: bool = False
+
+
+@dataclasses.dataclass
+class CommandStats:
+    """Aggregated measurements of a command."""
+
+    count: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    db_seconds: float = 0.0
+    api_seconds: float = 0.0
+    statements: int = 0
+    api_requests: int = 0
+    # Counts of invocations by wall time, one more than BUCKETS for > the last
+    buckets: list[int] = dataclasses.field(
+        default_factory=lambda: [0] * (len(BUCKETS) + 1)
+    )
+
+    def add(self, sample: Sample, seconds: float, failed: bool) -> None:
+        self.count += 1
+        self.errors += failed
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.db_seconds += sample.db_seconds
+        self.api_seconds += sample.api_seconds
+        self.statements += sample.statements
+        self.api_requests += sample.api_requests
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+
+_SAMPLE: contextvars.ContextVar[Optional[Sample]] = contextvars.ContextVar(
+    "_SAMPLE", default=None
+)
+
+
+def current() -> Optional[Sample]:
+    """Return the sample of the command running in this context, if any."""
+    return _SAMPLE.get()
+
+
+class Registry:
+    """Per-command metrics, keyed by qualified command name."""
+
+    def __init__(self) -> None:
+        self.commands: dict[str, CommandStats] = {}
+
+    @contextlib.asynccontextmanager
+    async def measure(self, command: str) -> AsyncIterator[Sample]:
+        """Measure the block as an invocation of command.
+
+        The invocation is counted as an error if the block raises, or if it
+        sets .failed on the yielded sample.
+        """
+        sample = Sample()
+        token = _SAMPLE.set(sample)
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield sample
+            failed = sample.failed
+        finally:
+            seconds = time.perf_counter() - start
+            _SAMPLE.reset(token)
+            self.commands.setdefault(command, CommandStats()).add(
+                sample, seconds, failed
+            )
+
+    def reset(self) -> None:
+        self.commands.clear()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            name: dataclasses.asdict(stats)
+            for name, stats in sorted(self.commands.items())
+        }
+
+    def to_json(self) -> str:
+        return json.dumps({"buckets": BUCKETS, "commands": self.to_dict()}, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Return metrics in the Prometheus text exposition format."""
+        lines: list[str] = []
+        items = sorted(self.commands.items())
+
+        lines.append(f"# HELP {PREFIX}_seconds Wall time of commands.")
+        lines.append(f"# TYPE {PREFIX}_seconds histogram")
+        for name, stats in items:
+            label = _label(name)
+            total = 0
+            for bound, n in zip(BUCKETS, stats.buckets):
+                total += n
+                lines.append(
+                    f'{PREFIX}_seconds_bucket{{command="{label}",le="{bound}"}} {total}'
+                )
+            lines.append(
+                f'{PREFIX}_seconds_bucket{{command="{label}",le="+Inf"}} {stats.count}'
+            )
+            lines.append(f'{PREFIX}_seconds_sum{{command="{label}"}} {stats.seconds}')
+            lines.append(f'{PREFIX}_seconds_count{{command="{label}"}} {stats.count}')
+
+        counters = (
+            ("errors", "Commands that failed."),
+            ("db_seconds", "Time spent executing SQL statements."),
+            ("statements", "SQL statements executed."),
+            ("api_seconds", "Time spent in Discord API requests."),
+            ("api_requests", "Discord API requests made."),
+        )
+        for attr, help_ in counters:
+            lines.append(f"# HELP {PREFIX}_{attr}_total {help_}")
+            lines.append(f"# TYPE {PREFIX}_{attr}_total counter")
+            for name, stats in items:
+                lines.append(
+                    f'{PREFIX}_{attr}_total{{command="{_label(name)}"}}'
+                    f" {getattr(stats, attr)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def instrument_engine(engine: sqlaio.AsyncEngine) -> None:
+    """Count statements run by engine, and time them, in the current sample."""
+    sync_engine = engine.sync_engine
+
+    @sql.event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, params, context, executemany) -> None:  # type: ignore
+        context.metrics_start = time.perf_counter()
+
+    @sql.event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, params, context, executemany) -> None:  # type: ignore
+        sample = _SAMPLE.get()
+        if sample is not None:
+            sample.statements += 1
+            sample.db_seconds += time.perf_counter() - context.metrics_start
+
+
+def instrument_requests(client: Any) -> None:
+    """Time calls of client.request in the current sample.
+
+    Used with the bot's HTTPClient and the webhook adapter interactions are
+    responded through, which between them make all Discord API requests.
+    """
+    request: Callable[..., Awaitable[Any]] = client.request
+    if getattr(request, "_instrumented", False):
+        return
+
+    @functools.wraps(request)
+    async def timed_request(*args: Any, **kwargs: Any) -> Any:
+        sample = _SAMPLE.get()
+        if sample is None:
+            return await request(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await request(*args, **kwargs)
+        finally:
+            sample.api_requests += 1
+            sample.api_seconds += time.perf_counter() - start
+
+    timed_request._instrumented = True  # type: ignore[attr-defined]
+    client.request = timed_request
+
+
+REGISTRY = Registry()
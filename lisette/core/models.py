@@ -1,25 +1,33 @@
 # Copyright (c) 2023 Amelia Froemming
 # SPDX-License-Identifier: MIT
 """ORM models for Lisette"""
+import difflib
+import functools
 import logging
-from typing import Any, List, Optional, Self, Sequence, Type, TypeVar, overload
+from typing import (
+    Any,
+    Iterable,
+    List,
+    Optional,
+    Self,
+    Sequence,
+    Type,
+    TypeVar,
+    overload,
+)
 
 import sqlalchemy as sql
 import sqlalchemy.ext.asyncio as sqlaio
 import sqlalchemy.orm as sqlorm
 
-from lisette.core import exceptions
+from lisette.core import codec, exceptions
 
 T = TypeVar("T")
 
 DISCORD_MAX_CHARS = 2000
+LIST_MAX_CHARS = 10 * DISCORD_MAX_CHARS  # Lists span messages, up to this long
 LIST_NAME_MAX = 38  # To fit in modal title
 
-CHECKED_CHAR = "!"
-INDENT_CHAR = "-"
-META_END_CHAR = "\\"
-META_CHARS = (CHECKED_CHAR, INDENT_CHAR)
-
 log = logging.getLogger(__name__)
 
 
@@ -28,7 +36,9 @@ class Base(sqlorm.DeclarativeBase, sqlorm.MappedAsDataclass, sqlaio.AsyncAttrs):
     """Internal base class for model objects"""
 
     def __post_init__(self) -> None:
-        log.debug("new %r", self)
+        # repr of a new object is costly, and objects are made on hot paths
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("new %r", self)
 
 
 class TaskList(Base):
@@ -39,7 +49,10 @@ class TaskList(Base):
         name: Name of this list.
         guild_id: Discord id of the guild this list is associated with.
         tasks: List of associated tasks, automatically populated.
-        msg_id: Discord id of the message this list is output to.
+        msg_id: Discord id of the message the list's first page is output to.
+        channel_id: Discord id of the channel the list's messages are in, or
+            None for lists made before this was saved.
+        messages: Messages the list's other pages are output to, by page.
 
     Args:
         name: As above.
@@ -51,7 +64,7 @@ class TaskList(Base):
 
     id: sqlorm.Mapped[int] = sqlorm.mapped_column(init=False, primary_key=True)
     name: sqlorm.Mapped[str]
-    guild_id: sqlorm.Mapped[int]
+    guild_id: sqlorm.Mapped[int] = sqlorm.mapped_column(sql.BigInteger)
     tasks: sqlorm.Mapped[List["Task"]] = sqlorm.relationship(
         default_factory=list,
         back_populates="parent_list",
@@ -59,9 +72,23 @@ class TaskList(Base):
         order_by="Task.local_id",
         lazy="selectin",
     )
-    msg_id: sqlorm.Mapped[int] = sqlorm.mapped_column(default=None)
+    msg_id: sqlorm.Mapped[int] = sqlorm.mapped_column(sql.BigInteger, default=None)
+    channel_id: sqlorm.Mapped[Optional[int]] = sqlorm.mapped_column(
+        sql.BigInteger, default=None
+    )
+    messages: sqlorm.Mapped[List["ListMessage"]] = sqlorm.relationship(
+        default_factory=list,
+        cascade="save-update, merge, expunge, delete, delete-orphan",
+        order_by="ListMessage.page",
+        # Most lists have no extra messages, joining them saves a query
+        lazy="joined",
+    )
 
-    __table_args__ = (sql.UniqueConstraint("name", "guild_id"),)
+    __table_args__ = (
+        sql.UniqueConstraint("name", "guild_id"),
+        # Unique constraint index can't serve lookups of all lists in a guild
+        sql.Index("ix_task_list_guild_id_name", "guild_id", "name"),
+    )
 
     def pretty_name(self) -> str:
         """Returns list name formatted for display"""
@@ -69,20 +96,70 @@ class TaskList(Base):
 
     def pretty_print(self) -> str:
         """Returns entire list formatted for display"""
-        txt = self.pretty_name()
-        for task in self.tasks:
-            txt += task.pretty_txt()
-        return txt
+        lines = [self.pretty_name()]
+        lines.extend(task.pretty_txt() for task in self.tasks)
+        return "".join(lines)
+
+    def pages(self) -> list[str]:
+        """Returns entire list formatted for display, split into messages"""
+        return paginate([self.pretty_name(), *(t.pretty_txt() for t in self.tasks)])
+
+    def msg_ids(self) -> list[int]:
+        """Returns Discord ids of the messages the list is output to, by page"""
+        return [self.msg_id, *(msg.msg_id for msg in self.messages)]
 
     def _len_tasks(self) -> int:
-        return sum(map(len, self.tasks))
+        """Returns summed length of tasks.
+
+        This is kept as a running total, which is only recounted when the tasks
+        collection object itself is replaced (eg. when loaded from database).
+        """
+        self._track_tasks()
+        return self._tasks_len
+
+    def _track_tasks(self) -> None:
+        """Recount running length if tasks collection was replaced."""
+        tasks = self.tasks
+        if self.__dict__.get("_tracked") is tasks:
+            return
+        self._tracked = tasks
+        self._task_lens: dict[int, int] = {}
+        self._tasks_len = 0
+        for task in tasks:
+            self._count_task(task, len(task))
+
+    def _count_task(self, task: "Task", length: int) -> None:
+        """Set the length counted for task in the running length."""
+        self._tasks_len += length - self._task_lens.get(id(task), 0)
+        self._task_lens[id(task)] = length
+        task._set_owner(self)
+
+    def _uncount_task(self, task: "Task") -> None:
+        """Remove task from the running length, if counted."""
+        self._tasks_len -= self._task_lens.pop(id(task), 0)
+
+    def _recount_task(self, task: "Task", length: int) -> None:
+        """Update counted length of an edited task.
+
+        Raises:
+            ValueError
+        """
+        self._track_tasks()
+        if id(task) not in self._task_lens:
+            return
+        if length > DISCORD_MAX_CHARS:
+            raise ValueError("Task edit would make task too long for a message")
+        new_length = len(self) - self._task_lens[id(task)] + length
+        if new_length > LIST_MAX_CHARS:
+            raise ValueError("Task edit would make list too long")
+        self._count_task(task, length)
 
     def insert(self, task: "Task") -> None:
         """Insert a new task into this list."""
         # Get next free short id
         task.local_id = len(self.tasks)
         self.tasks.append(task)
-        log.debug("inserted %r into %r", task, self)
+        log.debug("inserted task %s into %s", task.local_id, self.name)
 
     def insert_all(self, *tasks: "Task") -> None:
         """Insert serveral new tasks into this list."""
@@ -90,7 +167,7 @@ class TaskList(Base):
         for task in tasks:
             task.local_id = len(self.tasks)
             self.tasks.append(task)
-            log.debug("inserted %r into %r", task, self)
+        log.debug("inserted %s tasks into %s", len(tasks), self.name)
 
     def clear(self) -> None:
         """Clear all tasks from self"""
@@ -101,22 +178,89 @@ class TaskList(Base):
         for i, task in enumerate(self.tasks):
             task.local_id = i
 
+    def apply_edit(self, txt: str) -> list["Task"]:
+        """Make tasks match encoded text, changing as few tasks as possible.
+
+        Tasks on lines that are unchanged are kept as is, changed lines are
+        applied to existing tasks in place, and only lines that were added get
+        new tasks, so unchanged tasks keep their ids.
+
+        Returns:
+            Tasks removed from this list, which should be deleted.
+
+        Raises:
+            ValueError
+        """
+        old = list(self.tasks)
+        new = codec.decode_many(txt)
+        matcher = difflib.SequenceMatcher(
+            None,
+            [task.encode() for task in old],
+            [codec.encode(*fields) for fields in new],
+            autojunk=False,
+        )
+        result: list[Task] = []
+        removed: list[Task] = []
+        edits: list[tuple[Task, codec.TaskFields]] = []
+        for op, i1, i2, j1, j2 in matcher.get_opcodes():
+            if op == "equal":
+                result.extend(old[i1:i2])
+                continue
+            # Pair up replaced lines, extra ones are inserts or deletes.
+            n_paired = min(i2 - i1, j2 - j1)
+            for task, edited in zip(old[i1 : i1 + n_paired], new[j1 : j1 + n_paired]):
+                edits.append((task, edited))
+                result.append(task)
+            removed.extend(old[i1 + n_paired : i2])
+            result.extend(map(Task.from_fields, new[j1 + n_paired : j2]))
+
+        # Remove, then shrink tasks before growing any, so the length check only
+        # fails if the final list would be too long.
+        if removed:
+            removed_ids = {id(task) for task in removed}
+            self.tasks = [task for task in old if id(task) not in removed_ids]
+        # Display length grows with content and indents alike
+        edits.sort(
+            key=lambda pair: len(pair[1].content)
+            + pair[1].indents
+            - len(pair[0].content)
+            - pair[0].indents
+        )
+        for task, edited in edits:
+            task.content = edited.content
+            task.checked = edited.checked
+            task.indents = edited.indents
+        self.tasks = result
+        self.renumber()
+        return removed
+
     @sqlorm.validates("name")
     def _valid_name_length(self, cb_key: str, name: str) -> str:
         """Ensure new list name doesn't make message/ edit modal title too long"""
         if len(name) > LIST_NAME_MAX:
             raise ValueError("Max list name length is 38 characters")
         new_length = len(name) + self._len_tasks()
-        if new_length > DISCORD_MAX_CHARS:
-            raise ValueError("List name would make message too long.")
+        if new_length > LIST_MAX_CHARS:
+            raise ValueError("List name would make list too long.")
         return name
 
-    @sqlorm.validates("tasks")
-    def _valid_list_length(self, cb_key: str, task: "Task") -> "Task":
+    @sqlorm.validates("tasks", include_removes=True)
+    def _valid_list_length(self, cb_key: str, task: "Task", is_remove: bool) -> "Task":
         """Ensure list will not be too long when adding task."""
-        new_length = len(self) + len(task)
-        if new_length > DISCORD_MAX_CHARS:
-            raise ValueError("Task would make message too long")
+        self._track_tasks()
+        if is_remove:
+            self._uncount_task(task)
+            return task
+        if id(task) in self._task_lens:
+            # Already in list, eg. kept when the collection is replaced
+            return task
+        task_length = len(task)
+        if task_length > DISCORD_MAX_CHARS:
+            raise ValueError("Task is too long for a message")
+        new_length = len(self) + task_length
+        if new_length > LIST_MAX_CHARS:
+            raise ValueError("Task would make list too long")
+        self._count_task(task, task_length)
         return task
 
     def encode_tasks(self) -> str:
@@ -177,17 +321,14 @@ class TaskList(Base):
             sql.orm.exc.NoResultFound
             ValueError
         """
-        if attr:
-            entity = getattr(cls, attr)
-        else:
-            entity = cls
-
-        stmt = sql.select(entity).where(cls.guild_id == guild_id)
         if name:
-            stmt = stmt.where(cls.name == name)
-            return (await session.scalars(stmt)).one()
+            stmt = _list_lookup_stmt(attr, by_name=True)
+            params = {"guild_id": guild_id, "name": name}
+            return (await session.scalars(stmt, params)).unique().one()
         else:
-            return (await session.scalars(stmt)).all()
+            stmt = _list_lookup_stmt(attr, by_name=False)
+            params = {"guild_id": guild_id}
+            return (await session.scalars(stmt, params)).unique().all()
 
     def __len__(self) -> int:
         sum_ = 0
@@ -229,6 +370,10 @@ class Task(Base):
     checked: sqlorm.Mapped[bool] = sqlorm.mapped_column(default=False)
     indents: sqlorm.Mapped[int] = sqlorm.mapped_column(default=0)
 
+    __table_args__ = (
+        sql.Index("ix_task_parent_list_id_local_id", "parent_list_id", "local_id"),
+    )
+
     @classmethod
     def _format_unchecked(cls, content: str, indents: int):
         full_txt: list[str] = []
@@ -246,14 +391,45 @@ class Task(Base):
     @classmethod
     def _format_content(cls, content: str, checked: bool, indents: int = 0) -> str:
         """Returns content formatted for display based on bool checked"""
-        log.debug(f"indents: {indents}, content: '{content}'")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("indents: %s, content: %r", indents, content)
         if checked:
             return cls._format_checked(content, indents)
         return cls._format_unchecked(content, indents)
 
     def pretty_txt(self) -> str:
-        """Returns content formatted for display"""
-        return Task._format_content(self.content, self.checked, self.indents)
+        """Returns content formatted for display
+
+        The result is cached until content, checked, or indents change.
+        """
+        txt: Optional[str] = self.__dict__.get("_pretty")
+        if txt is None:
+            txt = Task._format_content(self.content, self.checked, self.indents)
+            self._pretty = txt
+        return txt
+
+    def _set_owner(self, owner: TaskList) -> None:
+        """Set the list whose running length counts this task.
+
+        Tasks loaded from the database have none until their list counts them.
+        """
+        self._owner = owner
+
+    @sqlorm.validates("content", "checked", "indents")
+    def _drop_pretty(self, cb_key: str, val: T) -> T:
+        """Drop cached display text when an attribute it depends on changes.
+
+        Edits to content or indents also update the parent list's running
+        length, raising ValueError if the list would become too long.
+        """
+        self.__dict__.pop("_pretty", None)
+        owner: Optional[TaskList] = self.__dict__.get("_owner")
+        if owner is not None and cb_key != "checked":
+            content = val if cb_key == "content" else self.content
+            indents = val if cb_key == "indents" else self.indents
+            max_txt = Task._format_content(content, True, indents)  # type: ignore
+            owner._recount_task(self, len(max_txt))
+        return val
 
     # async def delete(self, session: sqlaio.AsyncSession, commit: bool = False) -> None:
     #     """Deletes a Task from its parent and renumbers Tasks w/ higher local_id
@@ -297,76 +473,41 @@ class Task(Base):
 
     def encode(self) -> str:
         """Return representation of this task as markup text."""
-        chars: list[str] = []
-        # Handle special chars
-        if self.checked:
-            chars.append(CHECKED_CHAR)
-        if self.indents > 0:
-            chars.append(INDENT_CHAR * self.indents)
+        return codec.encode(self.content, self.checked, self.indents)
 
-        # Handle putting in escape if necessary.
-        if self.content[0] in META_CHARS:
-            chars.append(META_END_CHAR)
-
-        # Add content
-        chars.extend(self.content)
-        return "".join(chars)
+    @classmethod
+    def from_fields(cls, fields: codec.TaskFields) -> Self:
+        """Returns a Task with decoded fields."""
+        return cls(fields.content, checked=fields.checked, indents=fields.indents)
 
     @classmethod
     def decode(cls, txt: str) -> Self:
         """Returns a Task from encoded text."""
-        chars = list(txt)
-        meta_end = 0
-        checked = False
-        indents = 0
-        for c in chars:
-            # Special case, next char is start of content, don't continue.
-            if c == META_END_CHAR:
-                meta_end += 1
-                break
-            elif c == INDENT_CHAR:
-                indents += 1
-            elif c == CHECKED_CHAR:
-                checked = True
-            # If not special, this is the first char of content
-            else:
-                break
-            meta_end += 1
-
-        content = "".join(chars[meta_end:])
-        return Task(content, checked=checked, indents=indents)
+        return cls.from_fields(codec.decode(txt))
 
     @classmethod
-    def decode_many(cls, txt) -> list[Self]:
-        lines = txt.splitlines()
-        tasks: list[Self] = []
+    def decode_many(cls, txt: str) -> list[Self]:
+        """Returns Tasks from encoded text, one per line.
 
-        for line in lines:
-            tasks.append(Task.decode(line))
-
-        return tasks
+        See codec.decode_many to decode without making Task objects.
+        """
+        return [cls.from_fields(fields) for fields in codec.decode_many(txt)]
 
     @classmethod
     async def lookup(
         cls, session: sqlaio.AsyncSession, guild_id: int, lst_name: str, local_id: int
-    ) -> Self:
+    ) -> "Task":
         """Returns task which matches arguments
 
         Raises:
             sqlalchemy.exc.MultipleResultsFound
             sqlalchemy.exc.NoResultsFound
         """
-        stmt = (
-            sql.select(cls)
-            .join(TaskList)
-            .where(TaskList.guild_id == guild_id)
-            .where(TaskList.name == lst_name)
-            .where(cls.local_id == local_id)
-        )
-        return (await session.scalars(stmt)).one()
+        params = {"guild_id": guild_id, "name": lst_name, "local_id": local_id}
+        return (await session.scalars(_task_lookup_stmt(), params)).one()
 
     def __len__(self) -> int:
-        max_txt = Task._format_content(self.content, True)
+        max_txt = Task._format_content(self.content, True, self.indents)
         return len(max_txt)
 
     def __repr__(self) -> str:
@@ -380,3 +521,84 @@ class Task(Base):
             attrs_descs.append(f"{key}={val!r}")
         attr_txt = ", ".join(attrs_descs)
         return f"Task({attr_txt})"
+
+
+class ListMessage(Base):
+    """Model class for a message showing a page of a list, after its first
+
+    Lists start out in one message, made by /tasks lists new, and get a message
+    for each page they grow to after that.
+
+    Attributes:
+        list_id: Database id of the task list shown (Foreign key).
+        page: Position of the page shown, from 1.
+        msg_id: Discord id of the message.
+
+    Args:
+        page: As above.
+        msg_id: As above.
+    """
+
+    __tablename__ = "list_message"
+
+    list_id: sqlorm.Mapped[int] = sqlorm.mapped_column(
+        sql.ForeignKey("task_list.id"), primary_key=True, init=False
+    )
+    page: sqlorm.Mapped[int] = sqlorm.mapped_column(primary_key=True)
+    msg_id: sqlorm.Mapped[int] = sqlorm.mapped_column(sql.BigInteger)
+
+
+def paginate(parts: Iterable[str], length: int = DISCORD_MAX_CHARS) -> list[str]:
+    """Pack display text into as few messages of up to length chars as fit it.
+
+    Parts, eg. a list's name and the lines of its tasks, are kept whole, so
+    pages only break between tasks. Parts must each fit in a message.
+    """
+    pages: list[str] = []
+    page: list[str] = []
+    size = 0
+    for part in parts:
+        if size + len(part) > length and page:
+            pages.append("".join(page))
+            page = []
+            size = 0
+        page.append(part)
+        size += len(part)
+    pages.append("".join(page))
+    return pages
+
+
+def format_task(content: str, checked: bool, indents: int = 0) -> str:
+    """Returns task fields formatted for display, as Task.pretty_txt."""
+    return Task._format_content(content, checked, indents)
+
+
+# Lookups are built once, with bind parameters for their values, so each call
+# reuses a statement whose cache key is already generated.
+@functools.cache
+def _list_lookup_stmt(attr: Optional[str], by_name: bool) -> sql.Select[Any]:
+    entity = getattr(TaskList, attr) if attr else TaskList
+    stmt = sql.select(entity).where(TaskList.guild_id == sql.bindparam("guild_id"))
+    if by_name:
+        stmt = stmt.where(TaskList.name == sql.bindparam("name"))
+    return stmt
+
+
+@functools.cache
+def _task_lookup_stmt() -> sql.Select[tuple[Task]]:
+    return (
+        sql.select(Task)
+        .join(TaskList)
+        .where(TaskList.guild_id == sql.bindparam("guild_id"))
+        .where(TaskList.name == sql.bindparam("name"))
+        .where(Task.local_id == sql.bindparam("local_id"))
+    )
+
+
+@sql.event.listens_for(Task, "refresh")
+@sql.event.listens_for(Task, "expire")
+def _task_reloaded(target: Optional[Task], *args: Any) -> None:
+    """Drop cached display text when a task's state is reloaded from database"""
+    # Target may already be garbage collected when expired on rollback
+    if target is not None:
+        target.__dict__.pop("_pretty", None)
@@ -1,7 +1,7 @@
 # Copyright (c) 2023 Amelia Froemming
 # SPDX-License-Identifier: MIT
 """Module providing options list for Lisette"""
-from lisette.lib import config, logging
+from lisette.lib import config, logging, util
 
 lis_options = [
     config.Option(
@@ -12,11 +12,100 @@ lis_options = [
         },
         post_load=logging.get_numeric,
     ),
+    config.Option(
+        "log_format",
+        arguments={
+            "help": "Format to log messages in, one JSON object per line for json.",
+            "choices": logging.FORMATS,
+        },
+    ),
     config.Option(
         "token", arguments={"help": "Discord bot token to use."}, required=True
     ),
     config.Option(
-        "db_path", arguments={"help": "Path to sqlite db file."}, required=True
+        "db_url",
+        arguments={
+            "help": "SQLAlchemy URL of database, eg. 'postgresql://host/db'."
+            " Takes precedence over db_path."
+        },
+    ),
+    config.Option("db_path", arguments={"help": "Path to sqlite db file."}),
+    config.Option(
+        "db_pool_size",
+        arguments={"help": "Number of database connections to keep open."},
+        post_load=int,
+    ),
+    config.Option(
+        "db_max_overflow",
+        arguments={"help": "Extra database connections to open under load."},
+        post_load=int,
+    ),
+    config.Option(
+        "db_pool_recycle",
+        arguments={"help": "Seconds after which to replace a database connection."},
+        post_load=int,
+    ),
+    config.Option(
+        "db_wal",
+        arguments={"help": "Use SQLite write-ahead logging (true/false)."},
+        post_load=util.str_to_bool,
+    ),
+    config.Option(
+        "db_synchronous",
+        arguments={
+            "help": "SQLite synchronous level.",
+            "choices": ("OFF", "NORMAL", "FULL", "EXTRA"),
+        },
+    ),
+    config.Option(
+        "db_busy_timeout",
+        arguments={"help": "Milliseconds to wait on a locked database."},
+        post_load=int,
+    ),
+    config.Option(
+        "db_mmap_size",
+        arguments={"help": "Bytes of the SQLite database file to memory map."},
+        post_load=int,
+    ),
+    config.Option(
+        "db_cache_size",
+        arguments={"help": "KiB of SQLite page cache per connection."},
+        post_load=int,
+    ),
+    config.Option(
+        "db_write_behind",
+        arguments={
+            "help": "Milliseconds to batch SQLite writes for before committing them."
+        },
+        post_load=int,
+    ),
+    config.Option(
+        "cache_size",
+        arguments={"help": "Memory cap for the task list cache, in KiB."},
+        post_load=int,
+    ),
+    config.Option(
+        "edit_delay",
+        arguments={
+            "help": "Seconds to wait to combine edits of the same list message."
+        },
+        post_load=float,
+    ),
+    config.Option(
+        "shard_count",
+        arguments={
+            "help": "Total number of gateway shards to run. 0 lets Discord"
+            " recommend a count. Unsharded if not set."
+        },
+        post_load=int,
+    ),
+    config.Option(
+        "shard_processes",
+        arguments={
+            "help": "Number of worker processes to split shards between."
+            " Needs shard_count to be set."
+        },
+        post_load=int,
     ),
     config.Option(
         "env_file", arguments={"help": "Path to env file to load enviroment from"}
@@ -0,0 +1,151 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Runs the bot, in this process or split between shard worker processes."""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import sys
+from types import FrameType
+from typing import Optional
+
+import sqlalchemy.ext.asyncio as sqlaio
+
+import lisette.cogs.tasks
+import lisette.cogs.util
+import lisette.lib.logging
+from lisette.core import bot, cache, database, edits
+from lisette.lib import config
+
+log = logging.getLogger(__name__)
+
+
+def exit_handler(signum: int, tasks: set[asyncio.Task]) -> None:  # type: ignore
+    signame = signal.Signals(signum).name
+    log.info(f"Signal handler called with signal {signame} ({signum})")
+    if signal.SIGINT or signal.SIGTERM:
+        log.info("Cancelling background tasks. .  .")
+        for task in tasks:
+            task.cancel()
+
+
+async def init_database(cfg: config.Cfg) -> sqlaio.AsyncEngine:
+    """Initalize the configured database, exiting if none is."""
+    db_url: str | None = cfg.get("db_url", cfg.get("db_path"))
+    if db_url is None:
+        log.critical("Missing required setting db_url or db_path")
+        sys.exit(1)
+    return await database.initalize(db_url, **database.engine_options(cfg))
+
+
+async def create_tables(cfg: config.Cfg) -> None:
+    engine = await init_database(cfg)
+    await engine.dispose()
+
+
+async def run(cfg: config.Cfg, shard_ids: Optional[list[int]] = None) -> None:
+    """Run the bot until cancelled by a signal.
+
+    Arguments:
+        cfg: Configuration.
+        shard_ids: Shards to run, if running a subset of cfg.shard_count.
+    """
+    bot_ = bot.make_bot(cfg.get("shard_count"), shard_ids)
+
+    bot_.add_cog(lisette.cogs.tasks.TasksCog(bot_))
+    bot_.add_cog(lisette.cogs.util.UtilCog(bot_))
+
+    engine = await init_database(cfg)
+    if "cache_size" in cfg:
+        cache.LISTS.resize(cfg.cache_size * 1024)
+    if "edit_delay" in cfg:
+        edits.EDITS.delay = cfg.edit_delay
+    tasks: set[asyncio.Task] = set()  # type: ignore
+
+    async with asyncio.TaskGroup() as tg:
+        # Add signal handlers
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(
+            signal.SIGINT, functools.partial(exit_handler, signal.SIGINT, tasks)
+        )
+        loop.add_signal_handler(
+            signal.SIGTERM, functools.partial(exit_handler, signal.SIGTERM, tasks)
+        )
+        bot_task = tg.create_task(bot_.begin(cfg.token))
+        tasks.add(bot_task)
+        if cfg.get("db_write_behind"):
+            # Commits what's pending when cancelled, before the engine closes
+            interval = cfg.db_write_behind / 1000
+            writes = tg.create_task(database.WRITES.run(interval))
+            tasks.add(writes)
+            # Runs until cancelled, so it's stopped if the bot stops by itself
+            bot_task.add_done_callback(lambda _task: writes.cancel())
+
+    # Commit anything written since the write-behind task stopped
+    await database.WRITES.stop()
+    log.info("Closing database engine.")
+    await engine.dispose()
+    log.info("Shutdown complete")
+
+
+def worker(cfg: config.Cfg, shard_ids: list[int], debug: bool) -> None:
+    """Run the bot for some shards, in a worker process."""
+    lisette.lib.logging.initalize(cfg, "lisette", debug)
+    log.info("Worker %s running shards %s", os.getpid(), shard_ids)
+    asyncio.run(run(cfg, shard_ids))
+
+
+def supervise(cfg: config.Cfg, n_workers: int, debug: bool) -> int:
+    """Run shards split between worker processes, returning an exit status.
+
+    SIGINT and SIGTERM are passed on to the workers, which shut down as a
+    single process would. If a worker exits by itself, the rest are stopped
+    too, so that a process manager can restart the whole bot.
+    """
+    shard_count: int | None = cfg.get("shard_count")
+    if not shard_count:
+        log.critical("shard_count must be set to run shards in worker processes")
+        return 1
+    try:
+        ranges = bot.shard_ranges(shard_count, n_workers)
+    except ValueError as err:
+        log.critical(err)
+        return 1
+
+    # Workers starting together would race to create missing tables
+    asyncio.run(create_tables(cfg))
+
+    # Fork isn't safe with the threads logging and aiosqlite may start
+    ctx = multiprocessing.get_context("spawn")
+    procs = [
+        ctx.Process(target=worker, args=(cfg, shard_ids, debug), name=f"lisette-{i}")
+        for i, shard_ids in enumerate(ranges)
+    ]
+
+    def stop(signum: int, _frame: Optional[FrameType]) -> None:
+        log.info("Stopping workers on signal %s", signal.Signals(signum).name)
+        for proc in procs:
+            if proc.is_alive() and proc.pid is not None:
+                os.kill(proc.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for proc in procs:
+        proc.start()
+
+    status = 0
+    remaining = {proc.sentinel: proc for proc in procs}
+    while remaining:
+        for sentinel in multiprocessing.connection.wait(list(remaining)):
+            # wait returns those it was given, which are all ints
+            assert isinstance(sentinel, int)
+            proc = remaining.pop(sentinel)
+            proc.join()
+            log.info("Worker %s exited with %s", proc.name, proc.exitcode)
+            if proc.exitcode != 0 and status == 0:
+                status = 1
+                stop(signal.SIGTERM, None)
+    return status
@@ -8,6 +8,8 @@ from lisette.cogs import helpers
 from lisette.core import exceptions, models
 from lisette.core.database import SESSION
 
+MODAL_MAX_CHARS = 4000  # Longest text Discord allows in a modal's input
+
 
 async def ephm_respond(ctx: discord.ApplicationContext, msg: str) -> None:
     await ctx.respond(msg, ephemeral=True, delete_after=10)
@@ -57,11 +59,8 @@ class Confirm(discord.ui.View):
 
 
 class TasksEdit(discord.ui.Modal):
-    def __init__(
-        self, name: str, txt: str, msg: discord.Message, *args: Any, **kwargs: Any
-    ) -> None:
+    def __init__(self, name: str, txt: str, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
-        self.msg = msg
         self.name = name
 
         self.add_item(
@@ -69,7 +68,7 @@ class TasksEdit(discord.ui.Modal):
                 label="Tasks (one per line, ! prefix marks checked.)",
                 style=discord.InputTextStyle.long,
                 value=txt,
-                max_length=2000,
+                max_length=MODAL_MAX_CHARS,
                 required=True,
             )
         )
@@ -85,16 +84,10 @@ class TasksEdit(discord.ui.Modal):
         assert input_ is not None
         assert isinstance(channel, discord.TextChannel)
 
-        async with SESSION() as session:
-            msg_id: int = await models.TaskList.lookup(
-                session, guild.id, name, attr="msg_id"
-            )
-            msg = await channel.fetch_message(msg_id)
-
         # Make tasks
-        update: str = await helpers.put_edit(guild.id, name, input_)
+        update = await helpers.put_edit(guild.id, name, input_)
 
-        await msg.edit(content=update)
+        await helpers.edit_list_msg(interaction, update)
         await interaction.response.send_message(
             content="Made edit :-)", ephemeral=True, delete_after=10
         )
@@ -0,0 +1,102 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+"""Immutable read-only views of lists, for commands that don't change them.
+
+Views are plain tuples loaded with Core selects, so reading a list doesn't
+build ORM objects, track them in an identity map, or run model hooks.
+"""
+from typing import NamedTuple, Optional, Self
+
+import sqlalchemy as sql
+import sqlalchemy.exc as sqlexc
+import sqlalchemy.ext.asyncio as sqlaio
+
+from lisette.core import codec, models
+
+# Built once, with bind parameters, so lookups reuse its generated cache key
+_LOOKUP = (
+    sql.select(
+        models.TaskList.id,
+        models.TaskList.msg_id,
+        models.TaskList.channel_id,
+        models.Task.local_id,
+        models.Task.content,
+        models.Task.checked,
+        models.Task.indents,
+    )
+    .outerjoin(models.Task, models.Task.parent_list_id == models.TaskList.id)
+    .where(
+        models.TaskList.guild_id == sql.bindparam("guild_id"),
+        models.TaskList.name == sql.bindparam("name"),
+    )
+    .order_by(models.Task.local_id)
+)
+
+
+class TaskView(NamedTuple):
+    """Read-only task, with the fields of Task that are shown to users."""
+
+    local_id: int
+    content: str
+    checked: bool = False
+    indents: int = 0
+
+    def pretty_txt(self) -> str:
+        """Returns content formatted for display"""
+        return models.format_task(self.content, self.checked, self.indents)
+
+    def encode(self) -> str:
+        """Return representation of this task as markup text."""
+        return codec.encode(self.content, self.checked, self.indents)
+
+    @classmethod
+    def from_model(cls, task: models.Task) -> Self:
+        return cls(task.local_id or 0, task.content, task.checked, task.indents)
+
+
+class ListView(NamedTuple):
+    """Read-only task list, with its tasks in order."""
+
+    id: int
+    name: str
+    guild_id: int
+    msg_id: int
+    tasks: tuple[TaskView, ...] = ()
+    channel_id: Optional[int] = None
+
+    def pretty_name(self) -> str:
+        """Returns list name formatted for display"""
+        return models.TaskList.NAME_FRMT.format(self.name)
+
+    def pretty_print(self) -> str:
+        """Returns entire list formatted for display"""
+        lines = [self.pretty_name()]
+        lines.extend(task.pretty_txt() for task in self.tasks)
+        return "".join(lines)
+
+    def encode_tasks(self) -> str:
+        return "\n".join(task.encode() for task in self.tasks)
+
+    @classmethod
+    def from_model(cls, lst: models.TaskList) -> Self:
+        """Return a view of a list's current state."""
+        tasks = tuple(TaskView.from_model(task) for task in lst.tasks)
+        return cls(lst.id, lst.name, lst.guild_id, lst.msg_id, tasks, lst.channel_id)
+
+    @classmethod
+    async def lookup(
+        cls, session: sqlaio.AsyncSession, guild_id: int, name: str
+    ) -> Self:
+        """Load a list and its tasks in one query.
+
+        Raises:
+            sqlalchemy.exc.NoResultFound
+        """
+        params = {"guild_id": guild_id, "name": name}
+        rows = (await session.execute(_LOOKUP, params)).all()
+        if not rows:
+            raise sqlexc.NoResultFound("No list found when one was required")
+        list_id, msg_id, channel_id = rows[0][:3]
+        # A list without tasks is one row of NULL task columns
+        tasks = tuple(TaskView._make(row[3:]) for row in rows if row[4] is not None)
+        return cls(list_id, name, guild_id, msg_id, tasks, channel_id)
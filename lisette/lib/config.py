@@ -101,7 +101,6 @@ def get_cli_args(options: list[Option]) -> Cfg:
 
 def get_env_vars(options: list[Option], env_prefix: str | None = None) -> Cfg:
     """Load env vars"""
-    log.debug("Env: %s", os.environ)
     env_vars = Cfg()
     for option in options:
         env_name = option.name.upper()
@@ -110,7 +109,8 @@ def get_env_vars(options: list[Option], env_prefix: str | None = None) -> Cfg:
         log.debug("Trying to load %s", env_name)
         if env_name in os.environ:
             env_vars.set(option.name, os.environ[env_name])
-            log.debug("got %s", env_vars.get(option.name))
+            # Only the name, values can be secrets, eg. the token
+            log.debug("got %s", env_name)
         else:
             log.debug("%s not found in environment", option.name)
     env_vars.transform(options)
@@ -160,7 +160,7 @@ def get_cfg(
     """Return a complete configuration from a list of options"""
     # load cli args first, so we can see if we are given an env file
     cli_args = get_cli_args(options)
-    log.debug(": got %s", cli_args)
+    log.debug("got cli args for %s", sorted(vars(cli_args)))
     if "env_file" in cli_args:
         log.info("loading env vars from %s", cli_args.env_file)
         dotenv.load_dotenv(cli_args.env_file, verbose=True)
@@ -171,7 +171,7 @@ def get_cfg(
 
     # Make sure required options are loaded
     try:
-        log.debug("got cfg: %r", cfg)
+        log.debug("got cfg for %s", sorted(vars(cfg)))
         validate_required(options, cfg)
     except ConfigurationError as err:
         log.critical(err.message)
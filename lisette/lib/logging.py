@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: MIT
 """Logging helper functions"""
 import functools
+import json
 import logging
 import sys
 from typing import Any, Callable, Final, Generic, ParamSpec, TypeVar
@@ -16,6 +17,32 @@ LEVELS: Final = {
     'CRITICAL': 50 
 }
 
+FORMATS: Final = ('text', 'json')
+# LogRecord attributes, anything else on a record was passed in extra
+RECORD_ATTRS: Final = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line.
+
+    Fields passed with extra= are included as keys of the object.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        out: dict[str, Any] = {
+            'time': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, val in vars(record).items():
+            if key not in RECORD_ATTRS:
+                out[key] = val
+        if record.exc_info:
+            out['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            out['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(out, default=repr)
+
+
 def fallback_logger(name: str) -> logging.Logger:
     """Setup basic logger with log level DEBUG"""
     logging.basicConfig()
@@ -34,11 +61,15 @@ def initalize(cfg: config.Cfg, pkg_name: str, debug: bool = False) -> logging.Lo
         logging.warning("Log level not configured. Using default WARNING")
     log: logging.Logger = logging.getLogger(pkg_name)
     log.setLevel(log_level)
-    log.info("Using log level %r")
+    log.info("Using log level %r", logging.getLevelName(log_level))
 
-    fmt: str = "%(asctime)s - %(levelname)s - %(message)s"
-    datefmt: str = "%b %d %H:%M:%S"
-    formatter: logging.Formatter = logging.Formatter(fmt, datefmt)
+    formatter: logging.Formatter
+    if cfg.get("log_format") == 'json':
+        formatter = JsonFormatter()
+    else:
+        fmt: str = "%(asctime)s - %(levelname)s - %(message)s"
+        datefmt: str = "%b %d %H:%M:%S"
+        formatter = logging.Formatter(fmt, datefmt)
 
     stream_handler: logging.Handler = logging.StreamHandler(sys.stdout)
     stream_handler.setFormatter(fmt=formatter)
@@ -1,14 +1,88 @@
 # Copyright (c) 2023 Amelia Froemming
 # SPDX-License-Identifier: MIT
 """Various utility functions"""
+from typing import AsyncIterable, AsyncIterator
+
+
+class Pager:
+    """Packs lines into pages of up to length chars.
+
+    Lines on a page are joined by newlines. Lines are kept whole unless longer
+    than a page, in which case they're split across pages.
+    """
+
+    def __init__(self, length: int = 2000) -> None:
+        self.length = length
+        self._lines: list[str] = []
+        self._size = -1  # Length of the page, less the missing separator
+
+    def add(self, line: str) -> list[str]:
+        """Add a line, returning any pages it fills."""
+        if len(line) > self.length:
+            return self._add_long(line)
+        size = self._size + 1 + len(line)
+        if size <= self.length:
+            self._lines.append(line)
+            self._size = size
+            return _NO_PAGES
+        pages = self.flush()
+        self._lines.append(line)
+        self._size = len(line)
+        return pages
+
+    def _add_long(self, line: str) -> list[str]:
+        pages = self.flush()
+        step = self.length
+        pages.extend(line[i : i + step] for i in range(0, len(line) - step, step))
+        rest = len(line) % step or step
+        self._lines.append(line[-rest:])
+        self._size = rest
+        return pages
+
+    def flush(self) -> list[str]:
+        """Return the current page, if it has any lines, and start a new one."""
+        if not self._lines:
+            return []
+        page = "\n".join(self._lines)
+        self._lines = []
+        self._size = -1
+        return [page]
+
+
+_NO_PAGES: list[str] = []
+
+
+async def apaginate(
+    lines: AsyncIterable[str], length: int = 2000
+) -> AsyncIterator[str]:
+    """Yield pages packed from lines as they arrive, see Pager."""
+    pager = Pager(length)
+    async for line in lines:
+        for page in pager.add(line):
+            yield page
+    for page in pager.flush():
+        yield page
 
 
 def split_len(txt: str, length: int = 2000) -> list[str]:
-    """Splits a long string into a list of strings of a certain length or less"""
+    """Splits a long string into a list of strings of a certain length or less
+
+    Splits are made at the last newline that fits, which is dropped, or mid
+    line if a line is longer than length.
+    """
     out = []
-    while len(txt) > 0:
-        out.append(txt[:length])
-        txt = txt[length:]
+    start = 0
+    while len(txt) - start > length:
+        cut = txt.rfind("\n", start, start + length + 1)
+        if cut == -1:
+            out.append(txt[start : start + length])
+            start += length
+        else:
+            if cut > start:
+                out.append(txt[start:cut])
+            start = cut + 1
+    if start < len(txt):
+        out.append(txt[start:])
     return out
 
 
@@ -21,3 +95,17 @@ def split_int(txt: str) -> list[int]:
     strings = txt.split()
     ints = [int(x) for x in strings]
     return ints
+
+
+def str_to_bool(txt: str) -> bool:
+    """Convert a str like 'true', 'yes', '1', or 'false', 'no', '0' to a bool
+
+    Raises:
+        ValueError
+    """
+    val = txt.strip().lower()
+    if val in ("1", "true", "yes", "on"):
+        return True
+    if val in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"Invalid boolean '{txt}'")
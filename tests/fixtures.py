@@ -2,13 +2,23 @@
 # Copyright (c) 2023 Amelia Froemming
 # SPDX-License-Identifier: MIT
 import logging
+import os
+from types import SimpleNamespace
+from typing import Any, NamedTuple
 
+import discord
 import pytest
+import sqlalchemy as sql
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from lisette.cogs import helpers
 from lisette.core import database, models
 from lisette.core.database import SESSION
 
+# Database to run tests against, eg. a local PostgreSQL server. Defaults to an
+# in memory SQLite database.
+TEST_DB_URL = os.getenv("LISETTE_TEST_DB_URL", "")
+
 
 @pytest.fixture()
 async def dbglog(caplog):
@@ -21,11 +31,52 @@ async def db_session():
     """
     Get a database session
     """
-    engine = await database.initalize("")
+    engine = await database.initalize(TEST_DB_URL)
     session = SESSION()
     yield session
     await session.rollback()
     await session.close()
+    if TEST_DB_URL:
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.drop_all)
+    await engine.dispose()
+
+
+class Executed(NamedTuple):
+    """A statement sent to the database."""
+
+    statement: str
+    parameters: Any
+    context: Any
+
+
+@pytest.fixture()
+def statements(db_session):
+    """Statements sent to the test database, as they're sent."""
+    stmts: list[Executed] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        stmts.append(Executed(statement, parameters, context))
+
+    engine = db_session.bind.sync_engine
+    sql.event.listen(engine, "before_cursor_execute", record)
+    yield stmts
+    sql.event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture()
+async def file_db(tmp_path):
+    """Initalize a database that concurrent sessions can share.
+
+    In memory SQLite databases are a single connection, so this uses a file
+    unless LISETTE_TEST_DB_URL is set.
+    """
+    url = TEST_DB_URL or "/" + str(tmp_path / "test.sqlite")
+    engine = await database.initalize(url, busy_timeout=30000)
+    yield engine
+    if TEST_DB_URL:
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.drop_all)
     await engine.dispose()
 
 
@@ -47,3 +98,64 @@ async def task_lists():
         models.TaskList("list 3", 1, msg_id=0),
     )
     return lsts
+
+
+class FakeMessage:
+    def __init__(self, id: int, content: str) -> None:
+        self.id = id
+        self.content = content
+
+    async def edit(self, *, content=None):
+        self.content = content
+
+    async def delete(self):
+        self.deleted = True
+
+    async def fetch(self):
+        return self
+
+
+class GoneMessage:
+    """A message that was deleted, or is in a channel that was."""
+
+    def __init__(self, id: int) -> None:
+        self.id = id
+
+    async def edit(self, *, content=None):
+        raise self._not_found()
+
+    async def delete(self):
+        raise self._not_found()
+
+    async def fetch(self):
+        raise self._not_found()
+
+    @staticmethod
+    def _not_found():
+        response = SimpleNamespace(status=404, reason="Not Found")
+        return discord.NotFound(response, "Unknown Message")
+
+
+class FakeChannel:
+    def __init__(self) -> None:
+        self.id = 7
+        self.messages: dict[int, FakeMessage] = {}
+
+    async def send(self, content):
+        msg = FakeMessage(len(self.messages) + 1, content)
+        self.messages[msg.id] = msg
+        return msg
+
+    def get_partial_message(self, id):
+        return self.messages.get(id) or GoneMessage(id)
+
+
+@pytest.fixture
+async def channel(db_session, monkeypatch):
+    """A channel list messages are sent to and edited in."""
+    # Coalescers are bound to the event loop they're first used in
+    monkeypatch.setattr(helpers.edits, "EDITS", helpers.edits.EditCoalescer(0))
+    helpers.cache.MESSAGES.clear()
+    yield FakeChannel()
+    # Don't leave edits pending past this test's event loop
+    await helpers.edits.EDITS.flush()
@@ -0,0 +1,172 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+# pylint: skip-file
+import json
+from types import SimpleNamespace
+
+import pytest
+import sqlalchemy as sql
+
+from lisette.cogs import helpers
+from lisette.core import archive, models
+from tests.fixtures import FakeChannel, FakeMessage, channel, db_session
+
+
+@pytest.fixture
+async def lists(db_session):
+    lst = models.TaskList("chores", 0, msg_id=10, channel_id=5)
+    lst.insert(models.Task("sweep", checked=True))
+    lst.insert(models.Task("-mop", indents=2))
+    lst.messages.append(models.ListMessage(1, 11))
+    db_session.add_all([lst, models.TaskList("empty", 0, msg_id=12)])
+    db_session.add(models.TaskList("elsewhere", 1, msg_id=13))
+    await db_session.commit()
+
+
+async def export(session, guild_id):
+    return [line async for line in archive.export_guild(session, guild_id)]
+
+
+async def test_export(db_session, lists):
+    lines = await export(db_session, 0)
+    assert [json.loads(line) for line in lines] == [
+        {"lisette_archive": 1, "guild_id": 0},
+        {
+            "name": "chores",
+            "channel_id": 5,
+            "msg_ids": [10, 11],
+            "tasks": ["!sweep", "--\\-mop"],
+        },
+        {"name": "empty", "channel_id": None, "msg_ids": [12], "tasks": []},
+    ]
+
+
+async def test_round_trip(db_session, lists):
+    lines = await export(db_session, 0)
+    lists_ = archive.read(lines)
+    assert lists_.guild_id == 0
+    await archive.import_guild(db_session, 2, lists_.lists, chunk_rows=1)
+    await db_session.commit()
+    assert (await export(db_session, 2))[1:] == lines[1:]
+
+    lst = await models.TaskList.lookup(db_session, 2, "chores")
+    assert [(t.local_id, t.content) for t in lst.tasks] == [(0, "sweep"), (1, "-mop")]
+    assert lst.msg_ids() == [10, 11]
+
+
+async def test_import_without_returning(db_session, lists, monkeypatch):
+    dialect = db_session.bind.dialect
+    monkeypatch.setattr(
+        dialect, "insert_executemany_returning_sort_by_parameter_order", False
+    )
+    lines = await export(db_session, 0)
+    await archive.import_guild(db_session, 2, archive.read(lines).lists, chunk_rows=1)
+    await db_session.commit()
+    assert (await export(db_session, 2))[1:] == lines[1:]
+
+
+async def test_import_name_clash(db_session, lists):
+    lists_ = archive.read(await export(db_session, 0))
+    with pytest.raises(ValueError, match="chores, empty"):
+        await archive.import_guild(db_session, 0, lists_.lists)
+    record = archive.ListRecord("new", None, (1,))
+    with pytest.raises(ValueError, match="new"):
+        await archive.import_guild(db_session, 0, [record, record])
+
+
+@pytest.mark.parametrize(
+    "lines,error",
+    [
+        ([], "Not a list archive"),
+        (['{"name": "chores"}'], "Not a list archive"),
+        (['{"lisette_archive": 2, "guild_id": 0}'], "version"),
+        (['{"lisette_archive": 1, "guild_id": 0}', "[]"], "Line 2"),
+        (
+            ['{"lisette_archive": 1, "guild_id": 0}', '{"name": "a", "msg_ids": []}'],
+            "no messages",
+        ),
+        (
+            [
+                '{"lisette_archive": 1, "guild_id": 0}',
+                json.dumps({"name": "a", "msg_ids": [1], "tasks": ["a" * 2000]}),
+            ],
+            "too long",
+        ),
+        (
+            [
+                '{"lisette_archive": 1, "guild_id": 0}',
+                json.dumps({"name": "a", "msg_ids": [1], "tasks": ["a" * 1900] * 11}),
+            ],
+            "'a' is too long",
+        ),
+    ],
+)
+def test_read_invalid(lines, error):
+    with pytest.raises(ValueError, match=error):
+        archive.read(lines)
+
+
+class TestImportLists:
+    @pytest.fixture
+    def origin(self, channel):
+        return SimpleNamespace(guild_id=3, channel=channel, channel_id=channel.id)
+
+    async def test_from_other_guild(self, db_session, lists, channel, origin):
+        lists_ = archive.read([line async for line in helpers.export_lists(0)])
+        assert await helpers.import_lists(origin, lists_) == 2
+        await helpers.edits.EDITS.flush()
+
+        lst = await models.TaskList.lookup(db_session, 3, "chores")
+        assert lst.channel_id == channel.id
+        assert lst.msg_ids() == [1]
+        assert channel.messages[1].content == lst.pretty_print()
+
+    async def test_clash_sends_nothing(self, db_session, lists, channel, origin):
+        lists_ = archive.read([line async for line in helpers.export_lists(0)])
+        await helpers.import_lists(origin, lists_)
+        sent = len(channel.messages)
+        with pytest.raises(ValueError):
+            await helpers.import_lists(origin, lists_)
+        assert len(channel.messages) == sent
+        n_lists = await db_session.scalar(
+            sql.select(sql.func.count()).select_from(models.TaskList)
+        )
+        assert n_lists == 5
+
+    async def test_same_guild_messages_gone(self, db_session, lists, channel):
+        lists_ = archive.read([line async for line in helpers.export_lists(0)])
+        await helpers.del_list(0, "chores")
+        await helpers.del_list(0, "empty")
+        # The message of 'empty' is still there, those of 'chores' aren't
+        channel.messages[12] = FakeMessage(12, "## old empty\n")
+        gone = FakeChannel()
+        gone.id = 5
+        origin = SimpleNamespace(
+            guild_id=0,
+            channel=channel,
+            channel_id=channel.id,
+            bot=SimpleNamespace(get_partial_messageable={5: gone}.get),
+        )
+        assert await helpers.import_lists(origin, lists_) == 2
+        await helpers.edits.EDITS.flush()
+
+        lst = await models.TaskList.lookup(db_session, 0, "chores")
+        assert lst.channel_id == channel.id
+        assert lst.msg_ids() == [2]
+        assert channel.messages[2].content == lst.pretty_print()
+        lst = await models.TaskList.lookup(db_session, 0, "empty")
+        assert (lst.channel_id, lst.msg_ids()) == (None, [12])
+        assert channel.messages[12].content == "## empty\n"
+        assert len(channel.messages) == 2
+
+    async def test_same_guild_page_gone(self, db_session, channel):
+        first = await channel.send("## pages\n")
+        tasks = tuple(f"do {i} " + "a" * 90 for i in range(30))
+        record = archive.ListRecord("pages", channel.id, (first.id, 99), tasks)
+        origin = SimpleNamespace(guild_id=0, channel=channel, channel_id=channel.id)
+        await helpers.import_lists(origin, archive.Archive(0, [record]))
+
+        lst = await models.TaskList.lookup(db_session, 0, "pages")
+        assert lst.msg_ids() == [2, 3]
+        assert [channel.messages[i].content for i in (2, 3)] == lst.pages()
+        assert first.deleted
@@ -0,0 +1,29 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+# pylint: skip-file
+import pytest
+
+from lisette.core import bot
+
+
+def test_shard_ranges():
+    assert bot.shard_ranges(4, 2) == [[0, 1], [2, 3]]
+    assert bot.shard_ranges(5, 3) == [[0, 1], [2, 3], [4]]
+    assert bot.shard_ranges(1, 1) == [[0]]
+
+
+@pytest.mark.parametrize("count,workers", [(2, 3), (2, 0), (0, 1)])
+def test_shard_ranges_invalid(count, workers):
+    with pytest.raises(ValueError):
+        bot.shard_ranges(count, workers)
+
+
+async def test_make_bot():
+    assert type(bot.make_bot()) is bot.Bot
+    sharded = bot.make_bot(4, [2, 3])
+    assert isinstance(sharded, bot.ShardedBot)
+    assert sharded.shard_count == 4
+    assert sharded.shard_ids == [2, 3]
+    auto = bot.make_bot(0)
+    assert isinstance(auto, bot.ShardedBot)
+    assert auto.shard_count is None
@@ -0,0 +1,231 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+# pylint: skip-file
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import sqlalchemy.exc as sqlexc
+
+from lisette.cogs import helpers
+from lisette.core import cache, models, views
+from tests.fixtures import db_session, file_db, task_list, task_lists
+
+
+def mk_lst(name: str, guild_id: int = 0) -> views.ListView:
+    return views.ListView(0, name, guild_id, 0, (views.TaskView(0, "do a"),))
+
+
+class TestListCache:
+    def test_get_put(self):
+        lst_cache = cache.ListCache()
+        lst = mk_lst("a")
+        lst_cache.put(lst)
+        assert lst_cache.get(0, "a") is lst
+        assert lst_cache.get(1, "a") is None
+
+    def test_invalidate(self):
+        lst_cache = cache.ListCache()
+        lst_cache.put(mk_lst("a"))
+        lst_cache.invalidate(0, "a")
+        assert lst_cache.get(0, "a") is None
+        assert lst_cache.size == 0
+
+    def test_evicts_lru(self):
+        size = cache.entry_size(mk_lst("a"))
+        lst_cache = cache.ListCache(max_size=size * 2)
+        lst_cache.put(mk_lst("a"))
+        lst_cache.put(mk_lst("b"))
+        lst_cache.get(0, "a")
+        lst_cache.put(mk_lst("c"))
+        assert (0, "a") in lst_cache
+        assert (0, "b") not in lst_cache
+        assert (0, "c") in lst_cache
+        assert lst_cache.size <= lst_cache.max_size
+
+    def test_resize(self):
+        lst_cache = cache.ListCache()
+        lst_cache.put(mk_lst("a"))
+        lst_cache.put(mk_lst("b"))
+        lst_cache.resize(cache.entry_size(mk_lst("b")))
+        assert len(lst_cache) == 1
+        assert (0, "b") in lst_cache
+
+
+async def test_write_through(db_session, task_list):
+    db_session.add(task_list)
+    await db_session.commit()
+    await db_session.close()
+
+    await helpers.get_edit_txt(0, "list 1")
+    assert (0, "list 1") in cache.LISTS
+    await helpers.mk_task(0, "list 1", "do d")
+    await helpers.check_tasks(0, "list 1", 0)
+    await helpers.del_tasks(0, "list 1", 1)
+
+    cached = cache.LISTS.get(0, "list 1")
+    fresh = await models.TaskList.lookup(db_session, 0, "list 1")
+    assert cached.encode_tasks() == fresh.encode_tasks()
+    assert isinstance(cached, views.ListView)
+    assert await helpers.get_edit_txt(0, "list 1") == (
+        "!do something\n" "do a third thing\n" "do d"
+    )
+
+
+async def test_invalidated_on_list_changes(db_session, task_lists):
+    db_session.add_all(task_lists)
+    await db_session.commit()
+    await db_session.close()
+
+    await helpers.get_list(0, "list 1")
+    await helpers.put_list_edit(0, "list 1", "list a")
+    assert (0, "list 1") not in cache.LISTS
+    assert (await helpers.get_list(0, "list a")).name == "list a"
+
+    await helpers.del_list(0, "list a")
+    with pytest.raises(sqlexc.NoResultFound):
+        await helpers.get_list(0, "list a")
+
+
+class TestNameIndex:
+    @pytest.fixture
+    def index(self):
+        index = cache.NameIndex()
+        index.load(0, ["Groceries", "garden", "chores", "gifts", "Big game"])
+        return index
+
+    def test_prefix(self, index):
+        index.load(0, ["Groceries", "garden", "chores", "gifts"])
+        assert index.search(0, "g") == ["garden", "gifts", "Groceries"]
+        assert index.search(0, "GR") == ["Groceries"]
+
+    def test_contains_after_prefix(self, index):
+        assert index.search(0, "ga") == ["garden", "Big game"]
+
+    def test_empty_query(self, index):
+        assert len(index.search(0, "")) == 5
+
+    def test_limit(self):
+        index = cache.NameIndex()
+        index.load(0, [f"list {i}" for i in range(100)])
+        assert len(index.search(0, "list")) == cache.MAX_CHOICES
+
+    def test_add_remove(self, index):
+        index.add(0, "groats")
+        index.remove(0, "gifts")
+        index.remove(0, "not there")
+        assert index.search(0, "g") == ["garden", "groats", "Groceries", "Big game"]
+
+    def test_changes_while_loading(self):
+        index = cache.NameIndex()
+        index.begin_load(0)
+        index.add(0, "new")
+        index.remove(0, "gone")
+        index.add(0, "kept")
+        # Names read before or after the changes
+        index.load(0, ["gone", "kept"])
+        assert index.search(0, "") == ["kept", "new"]
+        index.load(0, ["kept", "new"])
+        assert index.search(0, "") == ["kept", "new"]
+
+    def test_unloaded_guild(self, index):
+        index.add(1, "a")
+        assert not index.loaded(1)
+        assert index.search(1, "") == []
+
+
+class FakeAutocompleteCtx:
+    def __init__(self, guild_id: int, value: str) -> None:
+        guild = type("Guild", (), {"id": guild_id})
+        self.interaction = type("Interaction", (), {"guild": guild})
+        self.value = value
+
+
+async def test_name_index_in_sync(db_session, task_lists):
+    db_session.add_all(task_lists)
+    await db_session.commit()
+    await db_session.close()
+
+    ctx = FakeAutocompleteCtx(0, "list")
+    assert await helpers.get_list_names(ctx) == ["list 1", "list 2"]
+    await helpers.mk_list(0, "list 0", 5)
+    await helpers.put_list_edit(0, "list 2", "other list")
+    await helpers.del_list(0, "list 1")
+    assert await helpers.get_list_names(ctx) == ["list 0", "other list"]
+
+
+class TestMessageCache:
+    class Channel:
+        def __init__(self) -> None:
+            self.made = 0
+
+        def get_partial_message(self, msg_id):
+            self.made += 1
+            return SimpleNamespace(id=msg_id)
+
+    def test_reuses_handles(self):
+        msgs, channel = cache.MessageCache(), self.Channel()
+        assert msgs.get(channel, 1) is msgs.get(channel, 1)
+        assert channel.made == 1
+
+    def test_bounded_lru(self):
+        msgs, channel = cache.MessageCache(max_entries=2), self.Channel()
+        msgs.get(channel, 1)
+        msgs.get(channel, 2)
+        msgs.get(channel, 1)
+        msgs.get(channel, 3)
+        assert 1 in msgs and 3 in msgs
+        assert 2 not in msgs
+        assert len(msgs) == 2
+
+    def test_invalidate(self):
+        msgs, channel = cache.MessageCache(), self.Channel()
+        msgs.get(channel, 1)
+        msgs.invalidate(1)
+        msgs.invalidate(2)
+        assert len(msgs) == 0
+
+
+async def test_fill_doesnt_overwrite_write(file_db, monkeypatch):
+    await helpers.mk_list(0, "list", 0)
+    cache.LISTS.clear()
+    read, release = asyncio.Event(), asyncio.Event()
+    lookup = views.ListView.lookup
+
+    async def slow_lookup(session, guild_id, name):
+        lst = await lookup(session, guild_id, name)
+        read.set()
+        await release.wait()
+        return lst
+
+    monkeypatch.setattr(views.ListView, "lookup", slow_lookup)
+    fill = asyncio.create_task(helpers.get_list(0, "list"))
+    await read.wait()
+    write = asyncio.create_task(helpers.mk_task(0, "list", "do a"))
+    await asyncio.sleep(0.05)
+    release.set()
+    await fill
+    await write
+    assert await helpers.get_edit_txt(0, "list") == "do a"
+
+
+async def test_name_index_load_sees_write(file_db, monkeypatch):
+    await helpers.mk_list(0, "a", 0)
+    cache.NAMES.clear()
+    read, release = asyncio.Event(), asyncio.Event()
+    lookup = models.TaskList.lookup
+
+    async def slow_lookup(session, guild_id, name=None, *, attr=None):
+        names = await lookup(session, guild_id, name, attr=attr)
+        read.set()
+        await release.wait()
+        return names
+
+    monkeypatch.setattr(models.TaskList, "lookup", slow_lookup)
+    names = asyncio.create_task(helpers.get_list_names(FakeAutocompleteCtx(0, "")))
+    await read.wait()
+    monkeypatch.undo()
+    await helpers.mk_list(0, "b", 0)
+    release.set()
+    await names
+    assert await helpers.get_list_names(FakeAutocompleteCtx(0, "")) == ["a", "b"]
@@ -0,0 +1,79 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+# pylint: skip-file
+import random
+
+import pytest
+
+from lisette.core import codec
+
+# Weighted towards meta chars, to hit prefixes and escapes often
+ALPHABET = "!!--\\\\ ab\t☑~é"
+N_CASES = 2000
+
+
+def random_fields(rng: random.Random) -> codec.TaskFields:
+    content = "".join(rng.choices(ALPHABET, k=rng.randrange(8)))
+    return codec.TaskFields(content, rng.random() < 0.5, rng.randrange(4))
+
+
+def reference_decode(line: str) -> codec.TaskFields:
+    """Char by char decoder, as Task.decode was before codec."""
+    meta_end = 0
+    checked = False
+    indents = 0
+    for c in line:
+        if c == codec.META_END_CHAR:
+            meta_end += 1
+            break
+        elif c == codec.INDENT_CHAR:
+            indents += 1
+        elif c == codec.CHECKED_CHAR:
+            checked = True
+        else:
+            break
+        meta_end += 1
+    return codec.TaskFields(line[meta_end:], checked, indents)
+
+
+@pytest.fixture
+def rng():
+    return random.Random(22)
+
+
+def test_round_trip(rng):
+    for _ in range(N_CASES):
+        fields = random_fields(rng)
+        assert codec.decode(codec.encode(*fields)) == fields
+
+
+def test_round_trip_many(rng):
+    fields = [random_fields(rng) for _ in range(N_CASES)]
+    txt = "\n".join(codec.encode(*f) for f in fields)
+    assert codec.decode_many(txt) == fields
+
+
+def test_matches_reference(rng):
+    for _ in range(N_CASES):
+        line = "".join(rng.choices(ALPHABET, k=rng.randrange(8)))
+        assert codec.decode(line) == reference_decode(line)
+
+
+@pytest.mark.parametrize(
+    "fields,line",
+    [
+        (("do a",), "do a"),
+        (("do a", True, 2), "!--do a"),
+        (("!do a",), "\\!do a"),
+        (("-do a", False, 1), "-\\-do a"),
+        (("\\do a",), "\\\\do a"),
+        (("", True), "!"),
+    ],
+)
+def test_encode(fields, line):
+    assert codec.encode(*fields) == line
+    assert codec.decode(line) == codec.TaskFields(*fields)
+
+
+def test_decode_prefix_in_any_order():
+    assert codec.decode("-!-do a") == codec.TaskFields("do a", True, 2)
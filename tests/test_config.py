@@ -1,7 +1,9 @@
 # Copyright (c) 2023 Amelia Froemming
 # SPDX-License-Identifier: MIT
 # pylint: skip-file
+import logging
 import os
+import sys
 
 import pytest
 
@@ -65,3 +67,13 @@ def test_validate_required_raises(options_required):
 def test_get_cfg(options_required):
     with pytest.raises(ConfigurationError):
         cfg = get_cfg(options_required, exit_on_error=False)
+
+
+def test_values_not_logged(options, caplog, monkeypatch):
+    monkeypatch.setenv("TEST1", "secret-token")
+    monkeypatch.setattr(sys, "argv", ["lisette", "--test2", "secret-arg"])
+    with caplog.at_level(logging.DEBUG, logger="lisette.lib.config"):
+        cfg = get_cfg(options)
+    assert cfg.test1 == "secret-token"
+    assert "test1" in caplog.text
+    assert "secret" not in caplog.text
@@ -0,0 +1,105 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+# pylint: skip-file
+import pytest
+import sqlalchemy as sql
+
+from lisette.core import database, models
+from lisette.lib import config
+from tests.fixtures import db_session, statements, task_lists
+
+
+async def pragma(engine, name):
+    async with engine.connect() as conn:
+        return (await conn.execute(sql.text(f"PRAGMA {name}"))).scalar()
+
+
+async def test_pragmas_applied(tmp_path):
+    engine = await database.initalize(
+        "/" + str(tmp_path / "db.sqlite"),
+        synchronous="full",
+        busy_timeout=1234,
+        cache_size=4000,
+    )
+    try:
+        assert (await pragma(engine, "journal_mode")).lower() == "wal"
+        assert await pragma(engine, "synchronous") == 2  # FULL
+        assert await pragma(engine, "busy_timeout") == 1234
+        assert await pragma(engine, "cache_size") == -4000
+    finally:
+        await engine.dispose()
+
+
+async def test_no_wal(tmp_path):
+    engine = await database.initalize("/" + str(tmp_path / "db.sqlite"), wal=False)
+    try:
+        assert (await pragma(engine, "journal_mode")).lower() == "delete"
+    finally:
+        await engine.dispose()
+
+
+async def test_invalid_synchronous():
+    with pytest.raises(ValueError):
+        await database.initalize("", synchronous="sometimes")
+
+
+def test_engine_options():
+    cfg = config.Cfg(db_path="", db_wal=False, db_busy_timeout=10, token="a")
+    assert database.engine_options(cfg) == {"wal": False, "busy_timeout": 10}
+
+
+@pytest.mark.parametrize(
+    "url, correct",
+    [
+        ("", "sqlite+aiosqlite://"),
+        ("//data/db.sqlite", "sqlite+aiosqlite:////data/db.sqlite"),
+        ("sqlite:///db.sqlite", "sqlite+aiosqlite:///db.sqlite"),
+        ("postgresql://u@host/db", "postgresql+asyncpg://u@host/db"),
+        ("mysql://u@host/db", "mysql+aiomysql://u@host/db"),
+        ("postgresql+psycopg://u@host/db", "postgresql+psycopg://u@host/db"),
+    ],
+)
+def test_make_url(url, correct):
+    assert database.make_url(url).render_as_string() == correct
+
+
+class TestIndexes:
+    """Check hot lookup queries are served by indexes, not table scans."""
+
+    @pytest.fixture
+    async def statements(self, db_session, task_lists, statements):
+        if db_session.bind.dialect.name != "sqlite":
+            pytest.skip("Query plans are checked on SQLite only")
+        db_session.add_all(task_lists)
+        task_lists[0].insert(models.Task("do a"))
+        await db_session.commit()
+        db_session.expunge_all()
+        statements.clear()
+        return statements
+
+    async def plan(self, session, stmt):
+        conn = await session.connection()
+        result = await conn.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {stmt.statement}", tuple(stmt.parameters)
+        )
+        return " ".join(row[-1] for row in result)
+
+    async def test_lookup_list(self, db_session, statements):
+        await models.TaskList.lookup(db_session, 0, "list 1")
+        plans = [await self.plan(db_session, stmt) for stmt in list(statements)]
+        # Either the new index or the unique constraint's serves this one
+        assert "USING INDEX" in plans[0] or "USING COVERING INDEX" in plans[0]
+        assert "SCAN" not in plans[0]
+        # selectin load of tasks
+        assert "ix_task_parent_list_id_local_id" in plans[1]
+
+    async def test_lookup_names(self, db_session, statements):
+        await models.TaskList.lookup(db_session, 0, attr="name")
+        plan = await self.plan(db_session, statements[0])
+        assert "ix_task_list_guild_id_name" in plan
+
+    async def test_lookup_task(self, db_session, statements):
+        await models.Task.lookup(db_session, 0, "list 1", 0)
+        plan = await self.plan(db_session, statements[0])
+        assert "ix_task_parent_list_id_local_id" in plan
+        assert "SCAN task " not in plan + " "
@@ -0,0 +1,58 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+# pylint: skip-file
+import asyncio
+
+import pytest
+
+from lisette.core import edits
+
+
+class FakeMessage:
+    def __init__(self, id: int) -> None:
+        self.id = id
+        self.edits: list[str] = []
+
+    async def edit(self, *, content=None):
+        self.edits.append(content)
+
+
+@pytest.fixture
+def coalescer():
+    return edits.EditCoalescer(delay=0.05)
+
+
+async def test_coalesces_to_latest(coalescer):
+    msg = FakeMessage(1)
+    for i in range(5):
+        coalescer.submit(msg, f"v{i}")
+    await asyncio.sleep(0.1)
+    assert msg.edits == ["v4"]
+    assert len(coalescer) == 0
+
+
+async def test_keyed_by_message(coalescer):
+    msgs = FakeMessage(1), FakeMessage(2)
+    coalescer.submit(msgs[0], "a")
+    coalescer.submit(msgs[1], "b")
+    await asyncio.sleep(0.1)
+    assert msgs[0].edits == ["a"]
+    assert msgs[1].edits == ["b"]
+
+
+async def test_later_edit_gets_new_window(coalescer):
+    msg = FakeMessage(1)
+    coalescer.submit(msg, "a")
+    await asyncio.sleep(0.1)
+    coalescer.submit(msg, "b")
+    await asyncio.sleep(0.1)
+    assert msg.edits == ["a", "b"]
+
+
+async def test_flush(coalescer):
+    coalescer.delay = 60
+    msg = FakeMessage(1)
+    coalescer.submit(msg, "a")
+    coalescer.submit(msg, "b")
+    await asyncio.wait_for(coalescer.flush(), 1)
+    assert msg.edits == ["b"]
@@ -4,6 +4,7 @@
 import asyncio
 import logging
 from pprint import pprint
+from types import SimpleNamespace
 
 import pytest
 import sqlalchemy as sql
@@ -12,7 +13,14 @@ import sqlalchemy.ext.asyncio as sqlaio
 
 from lisette.cogs import helpers
 from lisette.core import models
-from tests.fixtures import db_session, dbglog, task_list, task_lists
+from tests.fixtures import (
+    channel,
+    db_session,
+    dbglog,
+    statements,
+    task_list,
+    task_lists,
+)
 
 
 async def test_mk_list(db_session: sqlaio.AsyncSession) -> None:
@@ -62,7 +70,8 @@ async def test_mk_task(db_session: sqlaio.AsyncSession) -> None:
         )
     )
 
-    assert up == correct
+    assert up.content == correct
+    assert up.msg_id == 99
 
 
 async def test_chk_task_one(
@@ -74,7 +83,7 @@ async def test_chk_task_one(
     # when checking
     await db_session.close()
     lst_name = "list 1"
-    up: str = await helpers.check_tasks(0, lst_name, 1)
+    up = await helpers.check_tasks(0, lst_name, 1)
 
     tsks: list[models.Task] = [
         await models.Task.lookup(db_session, 0, lst_name, 0),
@@ -96,7 +105,8 @@ async def test_chk_task_one(
         )
     )
 
-    assert up == correct
+    assert up.content == correct
+    assert up.msg_id == 0
 
 
 async def test_del_task_one(db_session, task_list, dbglog) -> None:
@@ -107,7 +117,7 @@ async def test_del_task_one(db_session, task_list, dbglog) -> None:
     list_name = "list 1"
 
     status = await helpers.del_tasks(0, "list 1", 1)
-    up = status[2]
+    up = status[2].content
 
     lst: models.TaskList = await models.TaskList.lookup(db_session, 0, "list 1")
     tasks: list[models.Task] = await lst.awaitable_attrs.tasks
@@ -134,7 +144,7 @@ async def test_chk_task_many(db_session, task_list) -> None:
     await db_session.commit()
     await db_session.close()
 
-    update: str = await helpers.check_tasks(0, "list 1", 0, 1, 2)
+    update = await helpers.check_tasks(0, "list 1", 0, 1, 2)
 
     lst: models.TaskList = await models.TaskList.lookup(db_session, 0, "list 1")
     tasks: list[models.Task] = await lst.awaitable_attrs.tasks
@@ -152,7 +162,7 @@ async def test_chk_task_many(db_session, task_list) -> None:
         )
     )
 
-    assert update
+    assert update.content == correct
 
 
 async def test_del_task_many(db_session, task_list, dbglog) -> None:
@@ -160,8 +170,8 @@ async def test_del_task_many(db_session, task_list, dbglog) -> None:
     await db_session.commit()
     await db_session.close()
 
-    status: str = await helpers.del_tasks(0, "list 1", 0, 1, 2)
-    update = status[2]
+    status = await helpers.del_tasks(0, "list 1", 0, 1, 2)
+    update = status[2].content
     lst: models.TaskList = await models.TaskList.lookup(db_session, 0, "list 1")
     tasks: list[models.Task] = await lst.awaitable_attrs.tasks
 
@@ -194,7 +204,7 @@ async def test_put_edit(db_session, task_list, dbglog):
     full_text = "!do a\n" "do b\n" "do c"
     update = await helpers.put_edit(0, "list 1", full_text)
 
-    assert update == "".join(
+    assert update.content == "".join(
         [
             "## list 1\n",
             models.Task.CHECKED_FRMT.format("do a"),
@@ -228,7 +238,8 @@ async def test_put_list_edit(db_session, task_lists):
     await db_session.commit()
     await db_session.close()
 
-    await helpers.put_list_edit(0, "list 1", "list a")
+    update = await helpers.put_list_edit(0, "list 1", "list a")
+    assert update.content == models.TaskList.NAME_FRMT.format("list a")
     lsts = await models.TaskList.lookup(db_session, 0)
     names = [x.name for x in lsts]
 
@@ -243,8 +254,8 @@ async def test_del_checked(db_session, task_list, dbglog):
     await db_session.commit()
     await db_session.close()
 
-    msg = await helpers.del_checked(0, "list 1")
-    assert msg == "".join(
+    update = await helpers.del_checked(0, "list 1")
+    assert update.content == "".join(
         (
             models.TaskList.NAME_FRMT.format("list 1"),
             models.Task.UNCHECKED_FRMT.format("do something else"),
@@ -257,3 +268,220 @@ async def test_del_checked(db_session, task_list, dbglog):
     assert lst.tasks[0].local_id == 0
     assert lst.tasks[1].content == "do a third thing"
     assert lst.tasks[1].local_id == 1
+
+
+async def test_put_list_edit_used_name(db_session, task_lists):
+    db_session.add_all(task_lists)
+    await db_session.commit()
+    await db_session.close()
+
+    with pytest.raises(ValueError):
+        await helpers.put_list_edit(0, "list 1", "list 2")
+    names = await models.TaskList.lookup(db_session, 0, attr="name")
+    assert "list 1" in names
+
+
+async def test_failed_op_rolls_back(db_session, task_list):
+    db_session.add(task_list)
+    await db_session.commit()
+    await db_session.close()
+
+    with pytest.raises(ValueError):
+        async with helpers.list_txn(0, "list 1") as (_session, lst):
+            lst.insert(models.Task("do d"))
+            raise ValueError()
+
+    lst = await models.TaskList.lookup(db_session, 0, "list 1")
+    assert len(lst.tasks) == 3
+
+
+def writes(statements) -> list[str]:
+    """Return statements that changed rows."""
+    return [
+        stmt.statement
+        for stmt in statements
+        if stmt.statement.startswith(("DELETE", "UPDATE", "INSERT"))
+    ]
+
+
+async def test_del_tasks_set_based(db_session, statements):
+    lst = models.TaskList("big", 0, msg_id=0)
+    lst.insert_all(*(models.Task(str(i)) for i in range(120)))
+    db_session.add(lst)
+    await db_session.commit()
+    await db_session.close()
+    statements.clear()
+
+    positions = list(range(0, 120, 6))
+    deleted, ignored, update = await helpers.del_tasks(0, "big", *positions, 500)
+
+    assert len(writes(statements)) == 2
+    assert sorted(deleted) == positions
+    assert ignored == [500]
+
+    lst = await models.TaskList.lookup(db_session, 0, "big")
+    contents = [str(i) for i in range(120) if i % 6]
+    assert [t.content for t in lst.tasks] == contents
+    assert [t.local_id for t in lst.tasks] == list(range(100))
+    assert update.content == lst.pretty_print()
+
+
+class TestPutEditDiff:
+    @pytest.fixture
+    async def lst(self, db_session, statements):
+        lst = models.TaskList("list", 0, msg_id=0)
+        lst.insert_all(*(models.Task(f"do {i}") for i in range(50)))
+        db_session.add(lst)
+        await db_session.commit()
+        ids = [task.id for task in lst.tasks]
+        await db_session.close()
+        statements.clear()
+        return ids
+
+    async def edit(self, db_session, lines):
+        update = await helpers.put_edit(0, "list", "\n".join(lines))
+        lst = await models.TaskList.lookup(db_session, 0, "list")
+        assert update.content == lst.pretty_print()
+        assert [t.local_id for t in lst.tasks] == list(range(len(lines)))
+        return lst
+
+    async def test_one_line_changed(self, db_session, lst, statements):
+        lines = [f"do {i}" for i in range(50)]
+        lines[7] = "!do 7 later"
+        result = await self.edit(db_session, lines)
+
+        assert [stmt.split()[0] for stmt in writes(statements)] == ["UPDATE"]
+        assert [t.id for t in result.tasks] == lst
+        assert result.tasks[7].checked
+        assert result.tasks[7].content == "do 7 later"
+
+    async def test_insert_and_delete(self, db_session, lst, statements):
+        lines = [f"do {i}" for i in range(50)]
+        del lines[10]
+        lines.insert(0, "do first")
+        result = await self.edit(db_session, lines)
+
+        assert [t.encode() for t in result.tasks] == lines
+        assert [t.id for t in result.tasks[1:]] == lst[:10] + lst[11:]
+        # Insert, delete, and renumbering of shifted tasks
+        assert len(writes(statements)) == 3
+        orphans = await db_session.scalars(
+            sql.select(models.Task).where(models.Task.parent_list_id == None)
+        )
+        assert orphans.all() == []
+
+
+async def test_get_lists_info_pages(db_session):
+    db_session.add_all(models.TaskList(f"list {i:04}", 0, msg_id=0) for i in range(300))
+    await db_session.commit()
+
+    pages = [page async for page in helpers.get_lists_info(0, "guild")]
+    assert len(pages) > 1
+    assert all(len(page) <= 2000 for page in pages)
+    lines = "\n".join(pages).splitlines()
+    assert lines[0] == "Lists in guild guild:"
+    assert [line.split(": ")[1] for line in lines[1:]] == [
+        f"'list {i:04}'" for i in range(300)
+    ]
+
+
+async def test_get_lists_info_none(db_session):
+    pages = [page async for page in helpers.get_lists_info(0, "guild")]
+    assert pages == ["Lists in guild guild:\nNone"]
+
+
+async def test_get_tasks_info(db_session, task_list):
+    db_session.add(task_list)
+    await db_session.commit()
+    pages = [page async for page in helpers.get_tasks_info(0, "list 1")]
+    assert pages == [
+        "Tasks in list 1:\n"
+        "0: 'do something', checked=False\n"
+        "1: 'do something else', checked=False\n"
+        "2: 'do a third thing', checked=False"
+    ]
+
+
+async def test_get_tasks_info_pages(db_session):
+    lst = models.TaskList("big", 0, msg_id=0)
+    lst.insert_all(*(models.Task(f"do {i} " + "a" * 50) for i in range(200)))
+    db_session.add_all([lst, models.TaskList("empty", 0, msg_id=0)])
+    await db_session.commit()
+
+    for _ in range(2):
+        pages = [page async for page in helpers.get_tasks_info(0, "big")]
+        assert len(pages) > 1
+        assert all(len(page) <= 2000 for page in pages)
+        lines = "\n".join(pages).splitlines()
+        assert lines[0] == "Tasks in big:"
+        assert [line.split(":")[0] for line in lines[1:]] == [
+            str(i) for i in range(200)
+        ]
+        # Then from the cache
+        await helpers.get_list(0, "big")
+
+    pages = [page async for page in helpers.get_tasks_info(0, "empty")]
+    assert pages == ["Tasks in empty:"]
+    with pytest.raises(sqlexc.NoResultFound):
+        [page async for page in helpers.get_tasks_info(0, "missing")]
+
+
+class TestMultiMessage:
+    @pytest.fixture(autouse=True)
+    async def lst(self, channel):
+        msg = await channel.send("Making list...")
+        await helpers.mk_list(0, "list", msg.id, channel.id)
+
+    @pytest.fixture
+    def origin(self, channel):
+        return SimpleNamespace(channel=channel, channel_id=channel.id)
+
+    @staticmethod
+    async def shown(channel):
+        await helpers.edits.EDITS.flush()
+        msgs = [msg for msg in channel.messages.values() if not hasattr(msg, "deleted")]
+        return "".join(msg.content for msg in msgs)
+
+    async def test_grows_and_shrinks(self, db_session, channel, origin):
+        for i in range(30):
+            update = await helpers.mk_task(0, "list", f"do {i} " + "a" * 90)
+            await helpers.edit_list_msg(origin, update)
+        assert len(update.pages) > 1
+        lst = await models.TaskList.lookup(db_session, 0, "list")
+        assert len(lst.msg_ids()) == len(update.pages)
+        assert await self.shown(channel) == lst.pretty_print()
+
+        update = await helpers.del_tasks(0, "list", *range(1, 30))
+        await helpers.edit_list_msg(origin, update[2])
+        db_session.expire_all()
+        lst = await models.TaskList.lookup(db_session, 0, "list")
+        assert lst.msg_ids() == [1]
+        assert await self.shown(channel) == lst.pretty_print()
+
+    async def test_only_changed_pages(self, db_session, origin):
+        for i in range(30):
+            update = await helpers.mk_task(0, "list", f"do {i} " + "a" * 90)
+            await helpers.edit_list_msg(origin, update)
+        update = await helpers.check_tasks(0, "list", 29)
+        assert update.changed == (len(update.pages) - 1,)
+        update = await helpers.check_tasks(0, "list", 0)
+        assert update.changed == (0,)
+
+    async def test_del_list_returns_msgs(self, db_session, origin):
+        for i in range(30):
+            update = await helpers.mk_task(0, "list", f"do {i} " + "a" * 90)
+            await helpers.edit_list_msg(origin, update)
+        lst = await models.TaskList.lookup(db_session, 0, "list")
+        msgs = await helpers.del_list(0, "list")
+        assert msgs == (7, tuple(lst.msg_ids()))
+        assert len(msgs.msg_ids) > 1
+        assert (await db_session.scalars(sql.select(models.ListMessage))).all() == []
+
+    async def test_list_in_other_channel(self, db_session, channel, origin):
+        other = SimpleNamespace(channel=None, channel_id=8, bot=SimpleNamespace())
+        other.bot.get_partial_messageable = {channel.id: channel}.get
+        await helpers.mk_task(0, "list", "do a")
+        update = await helpers.check_tasks(0, "list", 0)
+        await helpers.edit_list_msg(other, update)
+        await helpers.edits.EDITS.flush()
+        assert channel.messages[1].content == update.content
@@ -0,0 +1,121 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+# pylint: skip-file
+import asyncio
+import gc
+import random
+
+import pytest
+
+from lisette.cogs import helpers
+from lisette.core import cache, locks, models
+from lisette.core.database import SESSION
+from tests.fixtures import file_db
+
+
+class TestKeyedLocks:
+    async def test_same_key_serialized(self):
+        keyed = locks.KeyedLocks()
+        order: list[str] = []
+
+        async def hold(name: str) -> None:
+            async with keyed.hold((0, "a")):
+                order.append(f"{name} in")
+                await asyncio.sleep(0.01)
+                order.append(f"{name} out")
+
+        await asyncio.gather(hold("x"), hold("y"))
+        assert order == ["x in", "x out", "y in", "y out"]
+
+    async def test_other_keys_parallel(self):
+        keyed = locks.KeyedLocks()
+        inside = 0
+        most = 0
+
+        async def hold(name: str) -> None:
+            nonlocal inside, most
+            async with keyed.hold((0, name)):
+                inside += 1
+                most = max(most, inside)
+                await asyncio.sleep(0.01)
+                inside -= 1
+
+        await asyncio.gather(*(hold(str(i)) for i in range(5)))
+        assert most == 5
+
+    async def test_many_keys_no_deadlock(self):
+        keyed = locks.KeyedLocks()
+        a, b = (0, "a"), (0, "b")
+
+        async def hold(*keys) -> None:
+            async with keyed.hold(*keys):
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(
+            asyncio.gather(hold(a, b), hold(b, a), hold(a, a)), timeout=1
+        )
+
+    async def test_unused_locks_dropped(self):
+        keyed = locks.KeyedLocks()
+        async with keyed.hold((0, "a")):
+            assert len(keyed) == 1
+        gc.collect()
+        assert len(keyed) == 0
+
+
+N_LISTS = 3
+N_OPS = 300
+N_START = 20
+
+
+async def test_concurrent_mutations_consistent(file_db):
+    """Hundreds of concurrent mutations leave every list consistent.
+
+    Changes to a list are serialized, and nothing is awaited between one
+    finishing and its effect being added to expected here, so expected
+    follows the order changes were made in.
+    """
+    rng = random.Random(0)
+    names = [f"list {i}" for i in range(N_LISTS)]
+    expected = dict.fromkeys(names, N_START)
+    for name in names:
+        await helpers.mk_list(0, name, 0)
+        for i in range(N_START):
+            await helpers.mk_task(0, name, f"t{i}")
+
+    async def op(kind: str, name: str, pos: int) -> None:
+        if kind == "new":
+            await helpers.mk_task(0, name, "new")
+            expected[name] += 1
+        elif kind == "del":
+            deleted, _ignored, _update = await helpers.del_tasks(0, name, pos)
+            expected[name] -= len(deleted)
+        elif kind == "chk":
+            try:
+                await helpers.check_tasks(0, name, pos)
+            except ValueError:
+                pass  # list shrank below pos first
+        elif kind == "edit":
+            # Like a modal, the edit replaces the list with possibly stale text
+            txt = await helpers.get_edit_txt(0, name) + "\nedited"
+            await helpers.put_edit(0, name, txt)
+            expected[name] = len(txt.splitlines())
+
+    ops = [
+        op(
+            rng.choice(["new", "del", "chk", "edit"]),
+            rng.choice(names),
+            rng.randrange(N_START),
+        )
+        for _ in range(N_OPS)
+    ]
+    await asyncio.gather(*ops)
+
+    async with SESSION() as session:
+        for name in names:
+            lst = await models.TaskList.lookup(session, 0, name)
+            assert len(lst.tasks) == expected[name]
+            assert [task.local_id for task in lst.tasks] == list(range(len(lst.tasks)))
+            cached = cache.LISTS.get(0, name)
+            assert cached is not None
+            assert cached.encode_tasks() == lst.encode_tasks()
@@ -1,9 +1,11 @@
 # Copyright (c) 2023 Amelia Froemming
 # SPDX-License-Identifier: MIT
 # pylint: skip-file
+import json
 import logging
+import sys
 
-from lisette.lib.logging import logfn
+from lisette.lib.logging import JsonFormatter, logfn
 
 
 @logfn
@@ -11,6 +13,31 @@ def example(a, b):
     return [a, b]
 
 
+def test_json_formatter():
+    record = logging.makeLogRecord(
+        {"name": "lisette", "levelno": 20, "levelname": "INFO", "msg": "a %s"}
+    )
+    record.args = ("b",)
+    record.guild_id = 1
+    out = json.loads(JsonFormatter().format(record))
+    assert out["message"] == "a b"
+    assert out["level"] == "INFO"
+    assert out["logger"] == "lisette"
+    assert out["guild_id"] == 1
+    assert "msg" not in out and "args" not in out
+
+
+def test_json_formatter_exc():
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        record = logging.getLogger("lisette").makeRecord(
+            "lisette", 40, __file__, 1, "failed", (), sys.exc_info()
+        )
+    out = json.loads(JsonFormatter().format(record))
+    assert "ValueError: bad" in out["exc_info"]
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
     example(1, 2)
@@ -0,0 +1,75 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+# pylint: skip-file
+import asyncio
+import json
+
+import pytest
+
+from lisette.cogs import helpers
+from lisette.core import metrics
+from tests.fixtures import db_session
+
+
+@pytest.fixture
+def registry():
+    return metrics.Registry()
+
+
+class FakeClient:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def request(self, route):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return route
+
+
+async def test_measure_counts(registry):
+    async with registry.measure("a"):
+        assert metrics.current() is not None
+    async with registry.measure("a") as sample:
+        sample.failed = True
+    with pytest.raises(ValueError):
+        async with registry.measure("b"):
+            raise ValueError
+    assert metrics.current() is None
+    assert registry.commands["a"].count == 2
+    assert registry.commands["a"].errors == 1
+    assert registry.commands["b"].errors == 1
+    assert sum(registry.commands["a"].buckets) == 2
+
+
+async def test_counts_statements(db_session, registry):
+    async with registry.measure("tasks new"):
+        await helpers.mk_list(0, "a", 0)
+    # Statements outside a command aren't counted
+    await helpers.mk_task(0, "a", "do a")
+    stats = registry.commands["tasks new"]
+    assert stats.statements > 0
+    assert stats.db_seconds > 0
+    assert list(registry.commands) == ["tasks new"]
+
+
+async def test_times_requests(registry):
+    client = FakeClient()
+    metrics.instrument_requests(client)
+    metrics.instrument_requests(client)
+    async with registry.measure("a"):
+        assert await client.request("route") == "route"
+    await client.request("route")
+    stats = registry.commands["a"]
+    assert client.calls == 2
+    assert stats.api_requests == 1
+    assert stats.api_seconds >= 0.01
+
+
+async def test_dumps(registry):
+    async with registry.measure('a "b"'):
+        pass
+    assert json.loads(registry.to_json())["commands"]['a "b"']["count"] == 1
+    prom = registry.to_prometheus()
+    assert 'lisette_command_seconds_count{command="a \\"b\\""} 1' in prom
+    assert 'lisette_command_seconds_bucket{command="a \\"b\\"",le="+Inf"} 1' in prom
+    assert "# TYPE lisette_command_statements_total counter" in prom
@@ -3,6 +3,7 @@
 import pytest
 import sqlalchemy as sql
 import sqlalchemy.exc as sqlexc
+from sqlalchemy.engine import default as sqldefault
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import lisette.core.database as database
@@ -11,7 +12,7 @@ import lisette.core.models as models
 # import lisette.cogs.helpers as helpers
 from lisette.core.database import SESSION
 from lisette.core import exceptions
-from tests.fixtures import db_session, task_list, task_lists, dbglog
+from tests.fixtures import db_session, statements, task_list, task_lists, dbglog
 
 
 async def test_lookup_task_list(
@@ -34,6 +35,20 @@ async def test_lookup_task(db_session: AsyncSession, task_list) -> None:
     assert tsk.content == "do something"
 
 
+async def test_lookups_hit_compiled_cache(
+    db_session: AsyncSession, task_lists: tuple[models.TaskList], statements
+) -> None:
+    db_session.add_all(task_lists)
+    await db_session.commit()
+    statements.clear()
+    for name in ("list 1", "list 2", "list 1"):
+        await models.TaskList.lookup(db_session, 0, name)
+        db_session.expunge_all()
+    hits = [stmt.context.cache_hit == sqldefault.CACHE_HIT for stmt in statements]
+    # Warmed up by the first lookup
+    assert hits[-1] and hits[-2]
+
+
 async def test_task_pretty_txt() -> None:
     tsk = models.Task(content="do something")
     answer = "\\☐  {0}\n".format("do something")
@@ -142,3 +157,156 @@ class TestSubtasks:
         correct = "\t" + models.Task.UNCHECKED_FRMT.format("do a")
         ans = task.pretty_txt()
         assert ans == correct
+
+
+@pytest.fixture
+def format_calls(monkeypatch):
+    """Contents of tasks formatted, as they're formatted."""
+    calls = []
+    orig = models.Task._format_content.__func__
+
+    def counting(cls, content, checked, indents=0):
+        calls.append(content)
+        return orig(cls, content, checked, indents)
+
+    monkeypatch.setattr(models.Task, "_format_content", classmethod(counting))
+    return calls
+
+
+class TestRenderCache:
+    def test_only_changed_rerendered(self, task_list, format_calls):
+        task_list.pretty_print()
+        assert len(format_calls) == 3
+
+        task_list.tasks[1].checked = True
+        task_list.tasks[2].content = "do another thing"
+        format_calls.clear()
+        txt = task_list.pretty_print()
+        assert sorted(format_calls) == ["do another thing", "do something else"]
+        assert txt == "".join(
+            (
+                "## list 1\n",
+                models.Task.UNCHECKED_FRMT.format("do something"),
+                models.Task.CHECKED_FRMT.format("do something else"),
+                models.Task.UNCHECKED_FRMT.format("do another thing"),
+            )
+        )
+
+    def test_indents_rerendered(self):
+        task = models.Task("do a")
+        task.pretty_txt()
+        task.indents = 2
+        assert task.pretty_txt() == "\t\t" + models.Task.UNCHECKED_FRMT.format("do a")
+
+    async def test_reload_rerendered(self, db_session, task_list):
+        db_session.add(task_list)
+        await db_session.commit()
+        task = task_list.tasks[0]
+        task.pretty_txt()
+
+        await db_session.execute(
+            sql.update(models.Task)
+            .where(models.Task.id == task.id)
+            .values(content="changed")
+            .execution_options(synchronize_session=False)
+        )
+        await db_session.refresh(task)
+        assert task.pretty_txt() == models.Task.UNCHECKED_FRMT.format("changed")
+
+
+class TestRunningLength:
+    @staticmethod
+    def full_len(lst: models.TaskList) -> int:
+        return len(lst.pretty_name()) + sum(
+            len(models.Task._format_content(t.content, True, t.indents))
+            for t in lst.tasks
+        )
+
+    @pytest.mark.parametrize("n", [10, 100])
+    def test_bulk_insert_linear(self, n, format_calls):
+        lst = models.TaskList("list", 0, msg_id=0)
+        lst.insert_all(*(models.Task(f"do {i}") for i in range(n)))
+        assert len(format_calls) == n
+        assert len(lst) == self.full_len(lst)
+
+    def test_len_tracks_changes(self, task_list):
+        task_list.tasks[0].content = "do something much longer"
+        task_list.tasks[1].indents = 2
+        task_list.tasks[2].checked = True
+        assert len(task_list) == self.full_len(task_list)
+
+        del task_list.tasks[0]
+        assert len(task_list) == self.full_len(task_list)
+
+        task_list.tasks = [task_list.tasks[1], models.Task("new")]
+        assert len(task_list) == self.full_len(task_list)
+
+    def test_edit_too_long_raises(self, task_list):
+        with pytest.raises(ValueError):
+            task_list.tasks[0].content = "a" * models.DISCORD_MAX_CHARS
+        assert task_list.tasks[0].content == "do something"
+
+    def test_replace_keeps_counted_tasks(self):
+        lst = models.TaskList("list", 0, msg_id=0)
+        lst.insert_all(models.Task("a" * 900), models.Task("b" * 900))
+        lst.tasks = [lst.tasks[1]]
+        assert len(lst) == self.full_len(lst)
+
+    async def test_loaded_list(self, db_session, task_list):
+        db_session.add(task_list)
+        await db_session.commit()
+        await db_session.close()
+
+        lst = await models.TaskList.lookup(db_session, 0, "list 1")
+        lst.insert(models.Task("do d"))
+        lst.tasks[0].content = "do e"
+        assert len(lst) == self.full_len(lst)
+
+
+class TestPages:
+    def test_paginate_keeps_parts_whole(self):
+        parts = ["a" * 600, "b" * 600, "c" * 600, "d" * 600]
+        assert models.paginate(parts, 1300) == [
+            parts[0] + parts[1],
+            parts[2] + parts[3],
+        ]
+
+    def test_paginate_empty(self):
+        assert models.paginate([]) == [""]
+
+    def test_list_pages(self):
+        lst = models.TaskList("list", 0, msg_id=0)
+        lst.insert_all(*(models.Task(f"do {i} " + "a" * 90) for i in range(50)))
+        pages = lst.pages()
+        assert len(pages) > 1
+        assert all(len(page) <= models.DISCORD_MAX_CHARS for page in pages)
+        assert "".join(pages) == lst.pretty_print()
+        # Pages break between tasks
+        assert all(page.endswith("\n") for page in pages)
+
+    def test_list_past_one_message(self):
+        lst = models.TaskList("list", 0, msg_id=0)
+        lst.insert_all(*(models.Task("a" * 900) for i in range(5)))
+        assert len(lst) > models.DISCORD_MAX_CHARS
+
+    def test_list_too_long(self):
+        lst = models.TaskList("list", 0, msg_id=0)
+        with pytest.raises(ValueError):
+            lst.insert_all(*(models.Task("a" * 1900) for i in range(11)))
+
+    def test_task_too_long(self):
+        lst = models.TaskList("list", 0, msg_id=0)
+        with pytest.raises(ValueError):
+            lst.insert(models.Task("a" * models.DISCORD_MAX_CHARS))
+
+    async def test_messages_saved(self, db_session, task_list):
+        task_list.messages.append(models.ListMessage(1, 11))
+        db_session.add(task_list)
+        await db_session.commit()
+        await db_session.close()
+
+        lst = await models.TaskList.lookup(db_session, 0, "list 1")
+        assert lst.msg_ids() == [0, 11]
+        await db_session.delete(lst)
+        await db_session.commit()
+        assert (await db_session.scalars(sql.select(models.ListMessage))).all() == []
@@ -13,3 +13,37 @@ def test_split_len() -> None:
     assert t[1] == "bb"
     assert t[2] == "cc"
     assert len(t) == 3
+
+
+def test_split_len_between_lines() -> None:
+    assert util.split_len("aa\nbb\ncc", 5) == ["aa\nbb", "cc"]
+    assert util.split_len("a\nbbbbbbb\nc", 3) == ["a", "bbb", "bbb", "b\nc"]
+
+
+def test_split_len_fills_pages() -> None:
+    lines = [f"line {i:03}" for i in range(1000)]
+    pages = util.split_len("\n".join(lines), 2000)
+    assert all(len(page) <= 2000 for page in pages)
+    assert "\n".join(pages).split("\n") == lines
+    # Each page but the last has no room for another line
+    assert all(len(page) + 9 > 2000 for page in pages[:-1])
+
+
+async def test_apaginate() -> None:
+    lines = [str(i) for i in range(300)] + ["x" * 250, "y"]
+
+    async def aiter_lines():
+        for line in lines:
+            yield line
+
+    pages = [page async for page in util.apaginate(aiter_lines(), 100)]
+    assert pages == util.split_len("\n".join(lines), 100)
+    assert all(len(page) <= 100 for page in pages)
+
+
+def test_str_to_bool() -> None:
+    assert util.str_to_bool("True")
+    assert util.str_to_bool("1")
+    assert not util.str_to_bool("no")
+    with pytest.raises(ValueError):
+        util.str_to_bool("maybe")
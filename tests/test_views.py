@@ -0,0 +1,59 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+# pylint: skip-file
+import pytest
+import sqlalchemy.exc as sqlexc
+
+from lisette.core import models, views
+from tests.fixtures import db_session, task_list
+
+
+@pytest.fixture
+def mixed_list(task_list):
+    task_list.tasks[0].checked = True
+    task_list.tasks[1].indents = 2
+    task_list.insert(models.Task("!starts with a meta char"))
+    return task_list
+
+
+def test_from_model_matches(mixed_list):
+    view = views.ListView.from_model(mixed_list)
+    assert view.pretty_print() == mixed_list.pretty_print()
+    assert view.encode_tasks() == mixed_list.encode_tasks()
+    assert [task.local_id for task in view.tasks] == [0, 1, 2, 3]
+
+
+def test_immutable(mixed_list):
+    view = views.ListView.from_model(mixed_list)
+    with pytest.raises(AttributeError):
+        view.name = "other"
+    with pytest.raises(AttributeError):
+        view.tasks[0].checked = False
+
+
+async def test_lookup(db_session, mixed_list):
+    db_session.add(mixed_list)
+    await db_session.commit()
+    # Tasks are loaded in local_id order, not insertion order
+    mixed_list.tasks[0].local_id, mixed_list.tasks[1].local_id = 1, 0
+    await db_session.commit()
+    await db_session.refresh(mixed_list, ["tasks"])
+
+    view = await views.ListView.lookup(db_session, 0, "list 1")
+    assert view == views.ListView.from_model(mixed_list)
+    assert view.tasks[0].content == "do something else"
+    assert view.pretty_print() == mixed_list.pretty_print()
+
+
+async def test_lookup_empty(db_session):
+    db_session.add(models.TaskList("empty", 0, msg_id=3))
+    await db_session.commit()
+    view = await views.ListView.lookup(db_session, 0, "empty")
+    assert view.tasks == ()
+    assert view.msg_id == 3
+    assert view.pretty_print() == "## empty\n"
+
+
+async def test_lookup_missing(db_session):
+    with pytest.raises(sqlexc.NoResultFound):
+        await views.ListView.lookup(db_session, 0, "missing")
@@ -0,0 +1,297 @@
+# Copyright (c) 2023 Amelia Froemming
+# SPDX-License-Identifier: MIT
+# pylint: skip-file
+import asyncio
+import contextlib
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sql
+
+from lisette.cogs import helpers
+from lisette.core import cache, database, models, runner
+from lisette.core.database import SESSION
+from lisette.lib import config
+from tests.fixtures import file_db
+
+INTERVAL = 0.2
+ROOT = Path(__file__).parent.parent
+
+# Makes tasks as fast as it can, printing the time each was acknowledged, until
+# killed. Shuts down on SIGTERM the same way the bot does.
+WRITER = """
+import asyncio, functools, signal, sys, time
+from lisette.cogs import helpers
+from lisette.core import database, runner
+
+async def write():
+    await helpers.mk_list(0, "list", 0)
+    for i in range(1_000_000):
+        await helpers.mk_task(0, "list", f"task {i}")
+        print(i, time.monotonic(), flush=True)
+        if len(helpers.cache.LISTS.get(0, "list").tasks) > 500:
+            # Keep list under its max length
+            await helpers.del_tasks(0, "list", *range(400))
+
+async def main(url, interval):
+    await database.initalize(url)
+    tasks = set()
+    async with asyncio.TaskGroup() as tg:
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(
+            signal.SIGTERM,
+            functools.partial(runner.exit_handler, signal.SIGTERM, tasks),
+        )
+        tasks.add(tg.create_task(database.WRITES.run(interval)))
+        # Like command handlers, the writer isn't cancelled on shutdown
+        writer = asyncio.create_task(write())
+
+asyncio.run(main(sys.argv[1], float(sys.argv[2])))
+"""
+
+
+@pytest.fixture
+async def writes(file_db):
+    if file_db.dialect.name != "sqlite":
+        pytest.skip("Writes are only group committed with SQLite")
+    task = asyncio.create_task(database.WRITES.run(INTERVAL))
+    while not database.WRITES.running:
+        await asyncio.sleep(0)
+    yield database.WRITES
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+
+
+async def committed_contents() -> list[str]:
+    async with SESSION() as session:
+        return list((await session.scalars(sql.select(models.Task.content))).all())
+
+
+async def test_group_commits(writes):
+    await helpers.mk_list(0, "list", 0)
+    await helpers.mk_task(0, "list", "do a")
+    await helpers.mk_task(0, "list", "do b")
+    assert await committed_contents() == []
+    await asyncio.sleep(INTERVAL * 2)
+    assert await committed_contents() == ["do a", "do b"]
+
+
+async def test_failed_unit_rolled_back(writes):
+    await helpers.mk_list(0, "list", 0)
+    await helpers.mk_task(0, "list", "do a")
+    with pytest.raises(ValueError):
+        async with helpers.list_txn(0, "list") as (_session, lst):
+            lst.insert(models.Task("do b"))
+            raise ValueError()
+    await helpers.mk_task(0, "list", "do c")
+    await writes.commit()
+    assert await committed_contents() == ["do a", "do c"]
+
+
+async def test_failed_unit_expires_list(writes):
+    await helpers.mk_list(0, "list", 0)
+    await helpers.mk_task(0, "list", "do a")
+    await helpers.mk_task(0, "list", "do b")
+    with pytest.raises(ValueError):
+        async with helpers.list_txn(0, "list") as (session, lst):
+            await helpers._delete_positions(session, lst, [0])
+            raise ValueError()
+    async with helpers.list_txn(0, "list") as (_session, lst):
+        tasks = [(task.local_id, task.content) for task in lst.tasks]
+    assert tasks == [(0, "do a"), (1, "do b")]
+
+
+async def test_failed_first_unit_ends_batch(writes):
+    with pytest.raises(ValueError):
+        async with writes.session():
+            raise ValueError()
+    # Another connection can write without waiting on the batch
+    async with SESSION() as session, session.begin():
+        session.add(models.TaskList("list", 0, msg_id=0))
+    assert await helpers.get_list(0, "list")
+
+
+async def test_cancelled_unit_rolled_back(writes):
+    await helpers.mk_list(0, "list", 0)
+    await helpers.mk_task(0, "list", "do a")
+
+    started = asyncio.Event()
+
+    async def unit():
+        async with helpers.list_txn(0, "list") as (_session, lst):
+            lst.insert(models.Task("do b"))
+            started.set()
+            await asyncio.sleep(10)
+
+    task = asyncio.create_task(unit())
+    # Cancelled between queries, rather than during one
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await helpers.mk_task(0, "list", "do c")
+    await writes.commit()
+    assert await committed_contents() == ["do a", "do c"]
+
+
+async def test_cancelled_while_beginning_batch(writes, file_db):
+    await helpers.mk_list(0, "list", 0)
+    await writes.commit()
+    # Another connection holds the lock, so the batch waits to begin
+    other = await file_db.connect()
+    await other.exec_driver_sql("BEGIN IMMEDIATE")
+    task = asyncio.create_task(helpers.mk_task(0, "list", "do a"))
+    await asyncio.sleep(0.1)
+    task.cancel()
+    await other.exec_driver_sql("COMMIT")
+    await other.close()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await helpers.mk_task(0, "list", "do b")
+    await writes.commit()
+    assert await committed_contents() == ["do b"]
+
+
+async def test_stop_commits_pending(writes):
+    await helpers.mk_list(0, "list", 0)
+    await helpers.mk_task(0, "list", "do a")
+    await writes.stop()
+    assert not writes.running
+    assert await committed_contents() == ["do a"]
+
+
+async def test_reads_see_pending(writes):
+    await helpers.mk_list(0, "list", 0)
+    await helpers.mk_task(0, "list", "do a")
+    cache.LISTS.clear()
+    lst = await helpers.get_list(0, "list")
+    assert [task.content for task in lst.tasks] == ["do a"]
+
+
+async def test_not_running(file_db):
+    assert not database.WRITES.running
+    with pytest.raises(RuntimeError):
+        async with database.WRITES.session():
+            pass
+    # Nothing to do
+    await database.WRITES.commit()
+
+
+async def test_only_sqlite(file_db, monkeypatch):
+    monkeypatch.setattr(file_db.dialect, "name", "postgresql")
+    await database.WRITES.start(INTERVAL)
+    assert not database.WRITES.running
+    # Each unit commits by itself
+    await helpers.mk_list(0, "list", 0)
+    await helpers.mk_task(0, "list", "do a")
+    assert await committed_contents() == ["do a"]
+
+
+async def test_run_ends_with_bot(tmp_path, monkeypatch):
+    class FakeBot:
+        def add_cog(self, cog):
+            pass
+
+        async def begin(self, token):
+            # Closes by itself, eg. on a failed login
+            while not database.WRITES.running:
+                await asyncio.sleep(0)
+            await helpers.mk_list(0, "list", 0)
+
+    monkeypatch.setattr(runner.bot, "make_bot", lambda *args: FakeBot())
+    url = "/" + str(tmp_path / "run.sqlite")
+    cfg = config.Cfg(db_path=url, token="a", db_write_behind=60_000)
+    loop = asyncio.get_running_loop()
+    try:
+        await asyncio.wait_for(runner.run(cfg), 5)
+    finally:
+        loop.remove_signal_handler(signal.SIGINT)
+        loop.remove_signal_handler(signal.SIGTERM)
+
+    engine = await database.initalize(url)
+    try:
+        async with SESSION() as session:
+            assert await models.TaskList.lookup(session, 0, "list")
+    finally:
+        await engine.dispose()
+
+
+def run_writer(url: str, sig: signal.Signals, min_acks: int = 200):
+    """Run WRITER until it's acknowledged min_acks writes, then signal it.
+
+    Returns:
+        Acknowledged writes, with their times, and the time of the signal.
+    """
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    proc = subprocess.Popen(
+        [sys.executable, "-c", WRITER, url, str(INTERVAL)],
+        stdout=subprocess.PIPE,
+        text=True,
+        cwd=ROOT,
+        env=env,
+    )
+    acks: dict[int, float] = {}
+    assert proc.stdout is not None
+    start = time.monotonic()
+    for line in proc.stdout:
+        i, acked = line.split()
+        acks[int(i)] = float(acked)
+        # Run for a few intervals, to kill it with some writes committed
+        if len(acks) >= min_acks and time.monotonic() - start > INTERVAL * 5:
+            break
+    killed = time.monotonic()
+    proc.send_signal(sig)
+    for line in proc.stdout:
+        i, acked = line.split()
+        acks[int(i)] = float(acked)
+    proc.wait(timeout=30)
+    return acks, killed
+
+
+async def written() -> set[int]:
+    """Return numbers of the tasks written by WRITER, including deleted ones."""
+    async with SESSION() as session:
+        contents = (await session.scalars(sql.select(models.Task.content))).all()
+    numbers = {int(content.split()[1]) for content in contents}
+    # The oldest tasks are deleted, so everything below the lowest was written
+    low = min(numbers, default=0)
+    return numbers | set(range(low))
+
+
+@pytest.mark.skipif(
+    bool(os.getenv("LISETTE_TEST_DB_URL")), reason="Needs a SQLite file database"
+)
+async def test_crash_loses_only_window(tmp_path):
+    url = "/" + str(tmp_path / "crash.sqlite")
+    acks, killed = await asyncio.to_thread(run_writer, url, signal.SIGKILL)
+
+    engine = await database.initalize(url)
+    try:
+        found = await written()
+    finally:
+        await engine.dispose()
+    # Commits take a moment after the interval runs out
+    must_have = {i for i, acked in acks.items() if acked < killed - INTERVAL - 0.25}
+    assert must_have
+    assert must_have <= found
+
+
+@pytest.mark.skipif(
+    bool(os.getenv("LISETTE_TEST_DB_URL")), reason="Needs a SQLite file database"
+)
+async def test_shutdown_loses_nothing(tmp_path):
+    url = "/" + str(tmp_path / "shutdown.sqlite")
+    acks, _killed = await asyncio.to_thread(run_writer, url, signal.SIGTERM)
+
+    engine = await database.initalize(url)
+    try:
+        found = await written()
+    finally:
+        await engine.dispose()
+    assert set(acks) <= found